@@ -3,7 +3,6 @@
 
 from heppy.framework.analyzer import Analyzer
 from heppy.particles.genbrowser import GenBrowser
-from heppy.particles.pdgcodes import hasBottom
 
 class ChargedHadronsFromB(Analyzer):
     '''Select stable generated charged hadrons from b-quark decay'''
@@ -36,11 +35,8 @@ class ChargedHadronsFromB(Analyzer):
                 event.hadrons_not_from_b.append(hadron)
 
 def is_ptc_from_b(event, hadron, browser):
-    ancestors = browser.ancestors(hadron)
-    is_from_b = False 
-    for ancestor in ancestors:
-        if hasBottom(ancestor.pdgid() ):
-            is_from_b = True
-    return is_from_b
+    '''returns True if the hadron has an ancestor containing a b quark.
+    the flags are computed for all particles in the browser at the first call.'''
+    return browser.has_ancestor(hadron, 'b')
             
         
@@ -59,18 +59,18 @@ class ImpactParameterJetTag(Analyzer):
         jets = getattr(event, self.cfg_ana.jets)
 
         for i, jet in enumerate(jets):
-            for id, ptcs in jet.constituents.iteritems():
-                for ptc in ptcs:
-                    if ptc.q() == 0:
-                        continue
-                    #COLIN simple method seems bugged, see test_path.py
-                    if self.cfg_ana.method == 'simple':
-                        #COLIN replace this by a call to Helix.compute_IP
-                        compute_IP(ptc.path, primary_vertex, jet.p3())
-                    #COLIN complex not used, can remove method flag
-                    elif self.cfg_ana.method == 'complex':
-                        compute_IP_wrt_direction(ptc.path, primary_vertex, jet.p3())
-                    self.smearing_significance_IP(ptc)
+            charged = [ptc for ptcs in jet.constituents.itervalues()
+                       for ptc in ptcs if ptc.q() != 0]
+            helices = [ptc.path for ptc in charged]
+            #COLIN simple method seems bugged, see test_path.py
+            if self.cfg_ana.method == 'simple':
+                #COLIN replace this by a call to Helix.compute_IP
+                compute_IPs(helices, primary_vertex, jet.p3())
+            #COLIN complex not used, can remove method flag
+            elif self.cfg_ana.method == 'complex':
+                compute_IPs_wrt_direction(helices, primary_vertex, jet.p3())
+            for ptc in charged:
+                self.smearing_significance_IP(ptc)
 
             #COLIN do jet tagging in a separate analyzer
             self.jet_tag(jet)
@@ -1,5 +1,5 @@
 from heppy.framework.analyzer import Analyzer
-from heppy.papas.path import ImpactParameter
+from heppy.papas.path import impact_parameters
 from ROOT import TVector3, TLorentzVector, TFile, TTree
 # from heppy.papas.path import Helix
 import math
@@ -25,18 +25,17 @@ class ImpactParameterSmearer(Analyzer):
         primary_vertex = TVector3(0, 0, 0)
         jets = getattr(event, self.cfg_ana.jets)
         for jet in jets:
-            for ptcs in jet.constituents.values():
-                for ptc in ptcs:
-                    if ptc.q() == 0:
-                        continue
-                    ptc.path.impact_parameter = ImpactParameter(ptc.path,
-                                                                primary_vertex,
-                                                                jet.p3())
-                    resolution = self.cfg_ana.resolution(ptc)
-                    ptc.path.IP_resolution = resolution
-                    gx = random.gauss(0, ptc.path.IP_resolution)
-                    gy = random.gauss(0, ptc.path.IP_resolution)
-                    smear_IP(ptc.path, gx, gy)
+            charged = [ptc for ptcs in jet.constituents.values()
+                       for ptc in ptcs if ptc.q() != 0]
+            ips = impact_parameters([ptc.path for ptc in charged],
+                                    primary_vertex, jet.p3())
+            for ptc, ip in zip(charged, ips):
+                ptc.path.impact_parameter = ip
+                resolution = self.cfg_ana.resolution(ptc)
+                ptc.path.IP_resolution = resolution
+                gx = random.gauss(0, ptc.path.IP_resolution)
+                gy = random.gauss(0, ptc.path.IP_resolution)
+                smear_IP(ptc.path, gx, gy)
 
 
 def smear_IP(path, gx, gy):
@@ -1,7 +1,9 @@
 '''Compute particle-based isolation'''
 
 from heppy.framework.analyzer import Analyzer
-from heppy.particles.isolation import IsolationComputer, IsolationInfo
+from heppy.particles.isolation import IsolationComputer, IsolationInfo, \
+    IsolationEngine
+from heppy.utils.pdebug import Lazy
 
 import pprint 
 
@@ -50,17 +52,29 @@ class IsolationAnalyzer(Analyzer):
     
     @param iso_area: area where to look for isolation particles around the candidate
 
+    @param isolations: optional dictionary {name: IsolationComputer} of 
+      additional isolation definitions, e.g. with other cone sizes, veto
+      (off) areas, or thresholds. They are computed in the same pass
+      over the particles. For each name, the attributes
+      candidate.iso_<name>_211, ..., and candidate.iso_<name> are attached
+      to each candidate. For example::
+      
+        isolations = {
+          'r03': IsolationComputer([EtaPhiCircle(0.3)], [EtaPhiCircle(0.01)])
+        }
     '''
     
     def beginLoop(self, setup):
         super(IsolationAnalyzer, self).beginLoop(setup)
         # now using same isolation definition for all pdgids
         self.iso_computers = dict()
-        for pdgid in pdgids:
-            self.iso_computers[pdgid] = IsolationComputer(
-                [self.cfg_ana.iso_area],
-                label='iso{pdgid}'.format(pdgid=str(pdgid))
+        if hasattr(self.cfg_ana, 'iso_area'):
+            self.iso_computers[None] = IsolationComputer(
+                [self.cfg_ana.iso_area]
             )
+        self.iso_computers.update(getattr(self.cfg_ana, 'isolations', dict()))
+        self.engine = IsolationEngine(self.iso_computers, pdgids,
+                                      lambda ptc: abs(self.pdgid(ptc)))
             
     def process(self, event):
         '''process event.
@@ -72,19 +86,24 @@ class IsolationAnalyzer(Analyzer):
         '''
         particles = getattr(event, self.cfg_ana.particles)
         candidates = getattr(event, self.cfg_ana.candidates)
-        for candidate in candidates:
-            isosum = IsolationInfo('all', candidate)
-            self.logger.info(str(candidate))
-            for pdgid in pdgids:
-                sel_ptcs = [ptc for ptc in particles if abs(self.pdgid(ptc))==pdgid]
-                iso = self.iso_computers[pdgid].compute(candidate, sel_ptcs)
-                isosum += iso 
-                setattr(candidate, 'iso_{pdgid}'.format(pdgid=pdgid), iso)
-                self.logger.info(str(iso))
-                if iso.num:
-                    self.logger.info(pprint.pformat(iso.particles))
-            candidate.iso = isosum
-            self.logger.info(str(isosum))
+        results = self.engine.compute(candidates, particles)
+        for candidate, result in zip(candidates, results):
+            self.logger.info('%s', candidate)
+            for name in self.iso_computers:
+                prefix = 'iso' if name is None else 'iso_{}'.format(name)
+                isosum = IsolationInfo('all', candidate)
+                for pdgid in pdgids:
+                    iso = result[(name, pdgid)]
+                    attname = '{prefix}_{pdgid}'.format(prefix=prefix,
+                                                        pdgid=pdgid)
+                    iso.label = attname if name else 'iso{}'.format(pdgid)
+                    isosum += iso 
+                    setattr(candidate, attname, iso)
+                    self.logger.info('%s', iso)
+                    if iso.num:
+                        self.logger.info('%s', Lazy(pprint.pformat, iso.particles))
+                setattr(candidate, prefix, isosum)
+                self.logger.info('%s', isosum)
         
     def pdgid(self, ptc): 
         '''returns summary pdg id:
@@ -1,6 +1,8 @@
 from heppy.framework.analyzer import Analyzer
 from heppy.particles.isolation import EtaPhiCircle
 from heppy.particles.tlv.particle import Particle
+from heppy.utils.deltar import EtaPhiIndex
+from heppy.particles.tlv.lorentzvector import new_like
 from ROOT import TLorentzVector
 import pprint 
 
@@ -33,14 +35,15 @@ class LeptonFsrDresser(Analyzer):
         particles = getattr(event, self.cfg_ana.particles)
         leptons = getattr(event, self.cfg_ana.leptons)
         
+        # the area is defined in eta, phi
+        particles = EtaPhiIndex(particles, use_theta=False)
         dressed = []
         for lepton in leptons:
-            sump4 = TLorentzVector()
+            sump4 = new_like(lepton.p4())
              
-            for particle in particles:
-                if self.cfg_ana.area.is_inside(lepton.eta(), lepton.phi(),
-                                  particle.eta(), particle.phi() ):
-                    sump4 += particle.p4()
+            for particle in self.cfg_ana.area.select(lepton.eta(), lepton.phi(),
+                                                     particles):
+                sump4 += particle.p4()
 
             sump4 += lepton.p4()
             dressed.append( Particle(lepton.pdgid(), lepton.q(), sump4) )
@@ -3,6 +3,7 @@
 from heppy.framework.analyzer import Analyzer
 
 from heppy.particles.tlv.met import MET
+from heppy.particles.tlv.lorentzvector import new_like
 from ROOT import TLorentzVector 
 
 class METBuilder(Analyzer):
@@ -32,7 +33,8 @@ class METBuilder(Analyzer):
          - event.<self.instance_label> : output L{MET<heppy.particles.tlv.met.MET>}
         '''
         particles = getattr(event, self.cfg_ana.particles)
-        missingp4 = TLorentzVector()
+        missingp4 = new_like(particles[0].p4()) if particles \
+                    else TLorentzVector()
         sumpt = 0 
         for ptc in particles:
             missingp4 += ptc.p4()
@@ -1,7 +1,7 @@
 '''Particle matcher.
 '''
 from heppy.framework.analyzer import Analyzer
-from heppy.utils.deltar import matchObjectCollection, deltaR
+from heppy.utils.deltar import matchObjectCollection, deltaR, EtaPhiIndex
 
 import collections
 
@@ -102,7 +102,8 @@ class Matcher(Analyzer):
             if pdgid is not None:
                 match_ptcs_filtered = [ptc for ptc in match_ptcs
                                        if ptc.pdgid()==pdgid]
-            pairs = matchObjectCollection(particles, match_ptcs_filtered,
+            pairs = matchObjectCollection(particles,
+                                          EtaPhiIndex(match_ptcs_filtered),
                                           self.cfg_ana.delta_r)
             for ptc in particles:
                 matchname = 'match'
@@ -5,6 +5,7 @@ from heppy.particles.tlv.particle import Particle
 from heppy.particles.tlv.jet import Jet
 from heppy.particles.jet import JetConstituents
 
+from heppy.particles.tlv.lorentzvector import new_like
 from ROOT import TLorentzVector
 
 mass = {23: 91, 25: 125}
@@ -36,10 +37,10 @@ class P4SumBuilder(Analyzer):
         The event must contain:
          - self.cfg_ana.particles: the input collection of particles.
         '''
-        p4 = TLorentzVector()
         charge = 0
         pdgid = 0
         ptcs = getattr(event, self.cfg_ana.particles)
+        p4 = new_like(ptcs[0].p4()) if ptcs else TLorentzVector()
         jet = Jet(p4)
         constituents = JetConstituents()
         for ptc in ptcs:
@@ -19,6 +19,8 @@ class PDebugger(Analyzer):
         log file,
         stdout
 
+    The physics debug output is restored if it was removed with pdebug.compile_out.
+
     Example:
     from heppy.analyzers.PDebugger import PDebugger
     pdebug = cfg.Analyzer(
@@ -38,11 +40,13 @@ class PDebugger(Analyzer):
         if hasattr(self.cfg_ana, 'output_to_stdout') and self.cfg_ana.output_to_stdout:
             pdebug.set_stream(sys.stdout,level=logging.INFO)
             pdebug.pdebugger.setLevel(logging.INFO)
+            pdebug.compile_in()
 
         #turn on output to file if requested, if filename is None then no output is produced
         if hasattr(self.cfg_ana, 'debug_filename') and self.cfg_ana.debug_filename:
             pdebug.set_file(self.cfg_ana.debug_filename)
             pdebug.pdebugger.setLevel(logging.INFO)
+            pdebug.compile_in()
 
     def process(self, event):
-        pdebug.pdebugger.info(str('Event: {}'.format(event.iEv)))
+        pdebug.pdebugger.info('Event: %s', event.iEv)
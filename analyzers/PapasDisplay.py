@@ -4,7 +4,8 @@ from heppy.framework.analyzer import Analyzer
 from heppy.display.core import Display
 from heppy.display.geometry import GDetector
 from heppy.display.pfobjects import GTrajectories, Blob
-#todo save
+from heppy.display.primitives import Scene, detector_shapes, cluster_shapes, trajectory_shapes
+from heppy.display.renderer import Renderer
 
 class PapasDisplay(Analyzer):
     '''Plots a PAPAS event display
@@ -51,6 +52,24 @@ class PapasDisplay(Analyzer):
     @param detector: the detector to be plotted
     @param save: boolean, if True will save graph to png file.
     @param display: boolean, if True will plot graph to screen.
+    
+    Optional parameters to save the displays without ROOT graphics in the event loop::
+        save = True,
+        events = [0, 12, 42],
+        filetypes = ['png', 'svg', 'json'],
+        offload = True,
+        outdir = 'display'
+    
+    @param events: list of the indices of the events to save. All events by default.
+    @param filetypes: list of the output file types, ['png'] by default.
+           The 'svg' and 'json' files are written without ROOT,
+           the other types with ROOT in batch mode.
+           See L{renderer<heppy.display.renderer>}.
+    @param offload: boolean, if True the displays are drawn and written by
+           a separate renderer process, so that the event loop does not wait for them.
+           False by default.
+    @param outdir: output directory, the analyzer directory by default.
+           The files are named eg event_12_xy.png
  '''
 
 
@@ -65,6 +84,15 @@ class PapasDisplay(Analyzer):
             raise Exception("Inconsistent display options: screennames, particles_type_and_subtypes and clusters_type_and_subtypes argument lists must have same length")
         if self.cfg_ana.do_display:
             self.init_display()
+        self.renderer = None
+        if getattr(self.cfg_ana, 'save', False):
+            self.events = getattr(self.cfg_ana, 'events', None)
+            if self.events is not None:
+                self.events = set(self.events)
+            self.detector_shapes = detector_shapes(self.cfg_ana.detector)
+            self.renderer = Renderer(getattr(self.cfg_ana, 'outdir', self.dirName),
+                                     getattr(self.cfg_ana, 'filetypes', ['png']),
+                                     offload=getattr(self.cfg_ana, 'offload', False))
 
     def init_display(self):
         '''Set up the display'''
@@ -75,6 +103,8 @@ class PapasDisplay(Analyzer):
     def process(self, event):
         '''Selects the required particles and clusters and registers them on the display
         @param event: event that must contain a papasevent'''
+        if self.renderer:
+            self.save_scene(event)
         if not self.cfg_ana.do_display:
             return
         self.display.clear()
@@ -87,6 +117,37 @@ class PapasDisplay(Analyzer):
                 if clusters:
                     self.register_clusters(clusters.values(), i)
  
+    def save_scene(self, event):
+        '''Describes the event display with plain geometry primitives,
+        and hands it to the renderer.
+        @param event: event that must contain a papasevent'''
+        if self.events is not None and event.iEv not in self.events:
+            return
+        scene = Scene('event_{}'.format(event.iEv),
+                      self.cfg_ana.projections, self.cfg_ana.screennames)
+        scene.register(self.detector_shapes, layer=0)
+        for i in range(len(self.cfg_ana.screennames)):
+            particles = event.papasevent.get_collection(self.cfg_ana.particles_type_and_subtypes[i])
+            particles = particles.values() if particles else []
+            clusters = []
+            for type_and_subtype in self.cfg_ana.clusters_type_and_subtypes[i]:
+                collection = event.papasevent.get_collection(type_and_subtype)
+                if collection:
+                    clusters.extend(collection.values())
+            scene.register(trajectory_shapes(particles), layer=2, sides=[i])
+            scene.register(cluster_shapes(clusters), layer=2, sides=[i])
+            if self.compare:
+                otherside = (i + 1)%2
+                scene.register(trajectory_shapes(particles, grey=True), layer=1, sides=[otherside])
+                scene.register(cluster_shapes(clusters, grey=True), layer=1, sides=[otherside])
+        self.renderer.submit(scene)
+
+    def write(self, setup):
+        '''Waits for the renderer to write the saved displays'''
+        super(PapasDisplay, self).write(setup)
+        if self.renderer:
+            self.renderer.close()
+
     def register_particles(self, particles, side=0):
         '''
         Adds list of particles into the display
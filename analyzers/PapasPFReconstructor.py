@@ -39,12 +39,20 @@ class PapasPFReconstructor(Analyzer):
         hcal_type_and_subtype = which hcals collection in papasevent to use 
         block_type_and_subtype = 'which blocks collection in papasevent to use 
         output_particles_list =  Name for reconstructed particles (as list)
+        nprocesses = optional number of processes used to reconstruct the blocks
+                     in parallel, default 1
+        parallel_threshold = optional minimum number of blocks for a parallel
+                     reconstruction, default 200
+        see L{PFReconstructor<heppy.papas.pfalgo.pfreconstructor.PFReconstructor>}
     '''
     
     def __init__(self, *args, **kwargs):
         super(PapasPFReconstructor, self).__init__(*args, **kwargs)  
 
-        self.reconstructor = PFReconstructor(self.cfg_ana.detector, self.logger) 
+        self.reconstructor = PFReconstructor(
+            self.cfg_ana.detector, self.logger,
+            nprocesses=getattr(self.cfg_ana, 'nprocesses', 1),
+            parallel_threshold=getattr(self.cfg_ana, 'parallel_threshold', 200))
         
 ##        self.output_particleslistname = '_'.join([self.instance_label,
 ##                                                  self.cfg_ana.output_particles_list])
@@ -24,7 +24,8 @@ class PapasSim(Analyzer):
         detector = CMS(),
         gen_particles = 'gen_particles_stable',
         sim_particles = 'sim_particles',
-        verbose = True
+        verbose = True,
+        batch_smearing = False
     )
     detector:      Detector model to be used.
     gen_particles: Name of the input gen particle collection
@@ -33,6 +34,13 @@ class PapasSim(Analyzer):
                    Therefore, in this particular case, the name of the output
                    sim particle collection is "papas_sim_particles".
     verbose      : Enable the detailed printout.
+    batch_smearing : optional, False by default. If True, the tracks and clusters
+                   of each event are smeared at once, at the end of the simulation
+                   of the event (see L{Simulator<heppy.papas.simulator.Simulator>}).
+                   The calorimeter responses are then interpolated in lookup tables.
+                   The results are statistically equivalent, but not identical.
+                   The simulation is a few percent faster for events with several
+                   hundred clusters, and slightly slower for small events.
 
         event must contain
           gen_particles
@@ -43,7 +51,8 @@ class PapasSim(Analyzer):
 
     def __init__(self, *args, **kwargs):
         super(PapasSim, self).__init__(*args, **kwargs)
-        self.simulator = Simulator(self.cfg_ana.detector, self.mainLogger)
+        self.simulator = Simulator(self.cfg_ana.detector, self.mainLogger,
+                                   batch=getattr(self.cfg_ana, 'batch_smearing', False))
         self.simname = '_'.join([self.instance_label,  self.cfg_ana.sim_particles])
 
     def process(self, event):
@@ -60,7 +69,7 @@ class PapasSim(Analyzer):
             charge = ptc.q()
             pid = ptc.pdgid()
             simptc = Particle(tp4, vertex, charge, pid, index)
-            pdebugger.info(" ".join(("Made", simptc.__str__())))
+            pdebugger.info('Made %s', simptc)
             simptc.gen_ptc = ptc
             return simptc
         simptcs = [simparticle(ptc, index)
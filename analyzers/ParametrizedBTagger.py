@@ -1,6 +1,5 @@
 '''Applies parametrized b tagging to a collection of jets.'''
 from heppy.framework.analyzer import Analyzer
-from heppy.papas.data.historyhelper import HistoryHelper
 from heppy.analyzers.ChargedHadronsFromB import is_ptc_from_b
 from heppy.particles.genbrowser import GenBrowser
 
@@ -19,7 +18,7 @@ def is_matched_to_b(jet):
 def is_from_b(jet, event, fraction=0.01):
     '''returns true if more than a fraction of the jet energy
     is from a b.'''
-    history = HistoryHelper(event.papasevent)
+    history = event.papasevent.get_history_helper()
     if not hasattr(event, 'genbrowser'):
         event.genbrowser = GenBrowser(event.gen_particles,
                                       event.gen_vertices)       
@@ -3,6 +3,7 @@
 from heppy.framework.analyzer import Analyzer
 from heppy.particles.tlv.particle import Particle as Recoil
 
+from heppy.particles.tlv.lorentzvector import new_like
 from ROOT import TLorentzVector
 
 mass = {23: 91, 25: 125}
@@ -40,7 +41,10 @@ class RecoilBuilder(Analyzer):
         '''
         sqrts = self.cfg_ana.sqrts
         to_remove = getattr(event, self.cfg_ana.to_remove) 
-        recoil_p4 = TLorentzVector(0, 0, 0, sqrts)
+        if to_remove:
+            recoil_p4 = new_like(to_remove[0].p4(), 0, 0, 0, sqrts)
+        else:
+            recoil_p4 = TLorentzVector(0, 0, 0, sqrts)
         for ptc in to_remove:
             recoil_p4 -= ptc.p4()
         recoil = Recoil(0, 0, recoil_p4, 1) 
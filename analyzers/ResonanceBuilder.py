@@ -2,9 +2,9 @@
 
 from heppy.framework.analyzer import Analyzer
 from heppy.particles.tlv.resonance import Resonance2 as Resonance
+from heppy.particles.combinatorics import Combinations
 
-import pprint 
-import itertools
+import numpy as np
 
 mass = {23: 91, 25: 125}
 
@@ -31,6 +31,20 @@ class ResonanceBuilder(Analyzer):
     @param leg_collection: Collection of particles that will be combined into resonances.
 
     @param pdgid: Pythia code for the target resonance. 
+
+    Optional parameters, applied before any resonance is built:
+
+    @param charge: if set, only the pairs with this total charge are kept,
+      e.g. 0.
+
+    @param same_flavour: if True, only the pairs of legs with the same
+      absolute pdgid are kept.
+
+    @param mass_window: if set to (mmin, mmax), only the pairs with
+      mmin <= mass < mmax are kept.
+
+    @param max_resonances: if set, only the max_resonances pairs closest
+      to the nominal mass are kept.
     '''
     
     def process(self, event):
@@ -44,12 +58,25 @@ class ResonanceBuilder(Analyzer):
          - event.<self.cfg_ana.output>_legs: the two legs of the best resonance.
         '''
         legs = getattr(event, self.cfg_ana.leg_collection)
-        resonances = []
-        for leg1, leg2 in itertools.combinations(legs,2):
-            resonances.append( Resonance(leg1, leg2, self.cfg_ana.pdgid) )
+        pairs = Combinations(legs, 2)
+        charge = getattr(self.cfg_ana, 'charge', None)
+        if charge is not None:
+            pairs.select(pairs.charges() == charge)
+        if getattr(self.cfg_ana, 'same_flavour', False):
+            pairs.select(pairs.same_flavour())
+        masses = pairs.m()
+        mass_window = getattr(self.cfg_ana, 'mass_window', None)
+        if mass_window is not None:
+            mmin, mmax = mass_window
+            in_window = (masses >= mmin) & (masses < mmax)
+            pairs.select(in_window)
+            masses = masses[in_window]
         # sorting according to distance to nominal mass
         nominal_mass = mass[self.cfg_ana.pdgid]
-        resonances.sort(key=lambda x: abs(x.m()-nominal_mass))
+        best_pairs = pairs.best(np.abs(masses - nominal_mass),
+                                getattr(self.cfg_ana, 'max_resonances', None))
+        resonances = [Resonance(leg1, leg2, self.cfg_ana.pdgid)
+                      for leg1, leg2 in best_pairs]
         setattr(event, self.cfg_ana.output, resonances)
         # getting legs of best resonance
         legs = []
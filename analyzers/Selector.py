@@ -1,6 +1,7 @@
 '''Select objects'''
 
 from heppy.framework.analyzer import Analyzer
+from heppy.particles.particlearray import ParticleArray
 import collections
 
 class Selector(Analyzer):
@@ -33,6 +34,16 @@ class Selector(Analyzer):
     * filter_func : a function object.
     IMPORTANT NOTE: lambda statements should not be used, as they
     do not work in multiprocessing mode. looking for a solution...
+
+    If the input collection is a L{ParticleArray<heppy.particles.particlearray.ParticleArray>},
+    the output collection is a ParticleArray as well, and a vectorized 
+    selection function taking the array and returning a boolean array 
+    can be given instead of filter_func: 
+
+    * mask_func : e.g.
+    
+    def is_lepton(ptcs):
+      return (ptcs.e() > 5.) & np.in1d(np.abs(ptcs.pdgid), [11, 13])
     
     '''
 
@@ -45,7 +56,13 @@ class Selector(Analyzer):
         '''
         input_collection = getattr(event, self.cfg_ana.input_objects)
         output_collection = None
-        if isinstance(input_collection, collections.Mapping):
+        if isinstance(input_collection, ParticleArray):
+            mask_func = getattr(self.cfg_ana, 'mask_func', None)
+            if mask_func is None:
+                mask_func = lambda ptcs: [self.cfg_ana.filter_func(ptc)
+                                          for ptc in ptcs]
+            output_collection = input_collection.select(mask_func)
+        elif isinstance(input_collection, collections.Mapping):
             output_collection = dict( [(key, val) for key, val in input_collection.iteritems()
                                        if self.cfg_ana.filter_func(val)] ) 
         else:
@@ -4,10 +4,15 @@ from heppy.framework.analyzer import Analyzer
 
 from heppy.particles.tlv.jet import Jet
 from heppy.particles.jet import JetConstituents
+from heppy.particles.tlv.lorentzvector import new_like
+from heppy.particles.particlearray import ParticleArray
+from heppy.particles.combinatorics import p4_array
+from heppy.utils.jetclustering import ClusterSequence
 
 import os 
+import numpy as np
 
-from ROOT import gSystem
+from ROOT import gSystem, TLorentzVector
 CCJetClusterizer = None
 if os.environ.get('FCCPHYSICS'):
     gSystem.Load("libfccphysics-tools")
@@ -23,6 +28,9 @@ class JetClusterizer(Analyzer):
     
     This analyzer, specific to the FCC,
     makes use of the JetClusterizer class compiled in the fcc-physics package.
+    If this package is not available, the jets are clustered with
+    L{heppy.utils.jetclustering}, which also provides
+    the kt, anti-kt, and Cambridge/Aachen algorithms.
 
     Example configuration::
 
@@ -33,6 +41,21 @@ class JetClusterizer(Analyzer):
           particles = 'particles_not_zed',
           fastjet_args = dict(njets = 2)  
         )
+
+    Several jet collections can be made from a single clustering of the
+    particles, with the outputs parameter::
+
+        jets = cfg.Analyzer(
+          JetClusterizer,
+          particles = 'particles_not_zed',
+          fastjet_args = dict(algorithm = 'ee_kt'),
+          outputs = dict(
+            jets2 = dict(njets = 2),
+            jets4 = dict(njets = 4),
+            jets_pt5 = dict(ptmin = 5.),
+            jets_dcut = dict(dcut = 25.)
+          )
+        )
     
     @param output: name of the output collection of L{jets<heppy.particles.jet.Jet>}. 
       Each jet is attached a L{JetConstituents<heppy.particles.jet.JetConstituents>} object
@@ -40,34 +63,119 @@ class JetClusterizer(Analyzer):
 
     @param particles: name of the input collection of particle-like objects. 
       These objects should have a p4(). 
+      A L{ParticleArray<heppy.particles.particlearray.ParticleArray>} can also be used.
     
     @param fastjet_args: fastjet arguments. 
       you should provide either one or the other of the following arguments:
-       - ptmin : pt threshold in GeV for exclusive jet reconstruction 
-       - njets : number of jets for inclusive jet reconstruction 
+       - ptmin : pt threshold in GeV for inclusive jet reconstruction 
+       - njets : number of jets for exclusive jet reconstruction 
+      With the python backend, you may also provide
+      (with the fastjet backend, a ValueError is raised):
+       - algorithm : 'ee_kt' (default), 'kt', 'antikt', or 'cambridge' 
+       - R : radius parameter for the kt, antikt, and cambridge algorithms (default 1.)
+
+    @param outputs: optional, replaces output. Dictionary
+      {output name : arguments}, in which the arguments are
+      a dictionary with ptmin, njets, or, for the python backend,
+      dcut (exclusive jet reconstruction stopped when all distances are above dcut).
+      The particles are clustered only once for all outputs.
+
+    @param backend: 'fastjet' to use the compiled library,
+      'python' to use L{heppy.utils.jetclustering}.
+      Defaults to 'fastjet' if the compiled library is available.
+
+    @param njets_required: if False, events with less particles than
+      the requested number of jets are kept, with no jet.
+      Otherwise (default), they are discarded.
        
     '''
 
+    modes = ['ptmin', 'njets', 'dcut']
+
     def __init__(self, *args, **kwargs):
         super(JetClusterizer, self).__init__(*args, **kwargs)
-        args = self.cfg_ana.fastjet_args
-        self.clusterize = None
-        self.njets = 0
-        if 'ptmin' in args and 'njets' in args:
-            raise ValueError('cannot specify both ptmin and njets arguments')
-        if 'ptmin' in args:
-            self.clusterizer = CCJetClusterizer(0)
-            def clusterize():
-                return self.clusterizer.make_inclusive_jets(args['ptmin']) 
-            self.clusterize = clusterize
-        elif 'njets' in args:
-            self.njets = args['njets']
-            self.clusterizer = CCJetClusterizer(1)
-            def clusterize():
-                return self.clusterizer.make_exclusive_jets(self.njets) 
-            self.clusterize = clusterize
+        args = getattr(self.cfg_ana, 'fastjet_args', dict())
+        self.backend = getattr(self.cfg_ana, 'backend',
+                               'fastjet' if CCJetClusterizer else 'python')
+        if self.backend not in ['fastjet', 'python']:
+            raise ValueError('backend should be fastjet or python')
+        if self.backend == 'fastjet' and CCJetClusterizer is None:
+            raise ValueError('the fastjet backend is not available')
+        outputs = getattr(self.cfg_ana, 'outputs', None)
+        if outputs is None:
+            outputs = {self.cfg_ana.output: args}
+        # list of (output, mode, value), mode being one of self.modes
+        self.outputs = []
+        for output, output_args in sorted(outputs.iteritems()):
+            modes = [mode for mode in self.modes if mode in output_args]
+            if len(modes) > 1:
+                raise ValueError(
+                    'cannot specify several of {} for {}'.format(modes, output)
+                )
+            elif not modes:
+                raise ValueError('specify either ptmin or njets') 
+            mode = modes[0]
+            self.outputs.append( (output, mode, output_args[mode]) )
+        if self.backend == 'fastjet':
+            if args.get('algorithm', 'ee_kt') != 'ee_kt' or 'R' in args:
+                raise ValueError('the fastjet backend only provides the ee_kt algorithm, '
+                                 'algorithm and R are only available with the python backend')
+            self.clusterizers = dict()
+            for output, mode, value in self.outputs:
+                if mode == 'dcut':
+                    raise ValueError('dcut is only available with the python backend')
+                if mode not in self.clusterizers:
+                    self.clusterizers[mode] = CCJetClusterizer(int(mode == 'njets'))
+            self.clusterize = self.clusterize_fastjet
         else:
-            raise ValueError('specify either ptmin or njets') 
+            self.algorithm = args.get('algorithm', 'ee_kt')
+            self.R = args.get('R', 1.)
+            self.clusterize = self.clusterize_python
+
+    def clusterize_fastjet(self, particles, mode, value):
+        '''clusters the particles with the compiled library.
+        The particles are given to each clusterizer once per event. 
+        returns a list of (4-momentum, indices of the constituents)'''
+        clusterizer = self.clusterizers[mode]
+        if mode not in self.filled:
+            clusterizer.clear()
+            for ptc in particles:
+                clusterizer.add_p4( ptc.p4() )
+            self.filled.add(mode)
+        if mode == 'njets':
+            clusterizer.make_exclusive_jets(value)
+        else:
+            clusterizer.make_inclusive_jets(value)
+        results = []
+        for jeti in range(clusterizer.n_jets()):
+            indices = [clusterizer.constituent_index(jeti, consti)
+                       for consti in range(clusterizer.n_constituents(jeti))]
+            results.append( (clusterizer.jet(jeti), indices) )
+        return results
+
+    def clusterize_python(self, particles, mode, value):
+        '''clusters the particles with L{heppy.utils.jetclustering}.
+        The cluster sequence is computed once per event. 
+        returns a list of (4-momentum, indices of the constituents)'''
+        if self.sequence is None:
+            self.sequence = ClusterSequence(p4_array(particles),
+                                            self.algorithm, self.R)
+        sequence = self.sequence
+        if mode == 'njets':
+            jets = sequence.exclusive_jets(value)
+        elif mode == 'dcut':
+            jets = sequence.exclusive_jets_dcut(value)
+        else:
+            jets = sequence.inclusive_jets(value)
+        return [(self.make_p4(particles, sequence.p4(jet)),
+                 sequence.constituents(jet))
+                for jet in jets]
+
+    def make_p4(self, particles, p4):
+        '''4-momentum with the type of the particle 4-momenta'''
+        if len(particles) and not isinstance(particles, ParticleArray):
+            return new_like(particles[0].p4(), *p4)
+        return TLorentzVector(*p4)
         
     def validate(self, jet):
         constits = jet.constituents
@@ -93,39 +201,40 @@ class JetClusterizer(Analyzer):
          
         This method creates:
          - event.<self.cfg_ana.output>: the list of L{jets<heppy.particles.jet.Jet>}. 
+           or, if self.cfg_ana.outputs is provided, one such list for each output.
         '''
         particles = getattr(event, self.cfg_ana.particles)
         # removing neutrinos
-        particles = [ptc for ptc in particles if abs(ptc.pdgid()) not in [12,14,16]]
-        if len(particles) < self.njets:
-            if hasattr(self.cfg_ana, 'njets_required') and self.cfg_ana.njets_required == False:
-                # not enough particles for the required number of jets,
-                # making no jet
-                setattr(event, self.cfg_ana.output, [])
-                return True                
-
-            else:
-                # njets_required not provided, or njets_required set to True
-                err = 'Cannot make {} jets with {} particles -> Event discarded'.format(
-                    self.njets, len(particles)
-                )
-                self.mainLogger.error(err)
-                # killing the sequence, as the user requests exactly njets
-                return False
-        # enough particles to make the required number of jets
-        self.clusterizer.clear()
-        for ptc in particles:
-            self.clusterizer.add_p4( ptc.p4() )
-        self.clusterize()
-        jets = []
-        for jeti in range(self.clusterizer.n_jets()):
-            jet = Jet( self.clusterizer.jet(jeti) )
-            jet.constituents = JetConstituents()
-            jets.append( jet )
-            for consti in range(self.clusterizer.n_constituents(jeti)):
-                constituent_index = self.clusterizer.constituent_index(jeti, consti)
-                constituent = particles[constituent_index]
-                jet.constituents.append(constituent)
-            jet.constituents.sort()
-            self.validate(jet)
-        setattr(event, self.cfg_ana.output, jets)
+        if isinstance(particles, ParticleArray):
+            particles = particles[~np.in1d(np.abs(particles.pdgid), [12,14,16])]
+        else:
+            particles = [ptc for ptc in particles if abs(ptc.pdgid()) not in [12,14,16]]
+        self.sequence = None
+        self.filled = set()
+        for output, mode, value in self.outputs:
+            if mode == 'njets' and len(particles) < value:
+                if hasattr(self.cfg_ana, 'njets_required') and self.cfg_ana.njets_required == False:
+                    # not enough particles for the required number of jets,
+                    # making no jet
+                    setattr(event, output, [])
+                    continue
+                else:
+                    # njets_required not provided, or njets_required set to True
+                    err = 'Cannot make {} jets with {} particles -> Event discarded'.format(
+                        value, len(particles)
+                    )
+                    self.mainLogger.error(err)
+                    # killing the sequence, as the user requests exactly njets
+                    return False
+            # enough particles to make the required number of jets
+            jets = []
+            for p4, indices in self.clusterize(particles, mode, value):
+                jet = Jet( p4 )
+                jet.constituents = JetConstituents()
+                jets.append( jet )
+                for constituent_index in indices:
+                    constituent = particles[constituent_index]
+                    jet.constituents.append(constituent)
+                jet.constituents.sort()
+                self.validate(jet)
+            setattr(event, output, jets)
@@ -0,0 +1,97 @@
+import unittest
+import shutil
+import tempfile
+import math
+from JetClusterizer import JetClusterizer, CCJetClusterizer
+from heppy.framework.event import Event
+from heppy.particles.tlv.particle import Particle
+from heppy.particles.tlv.lorentzvector import LorentzVector
+import heppy.framework.config as cfg
+
+class JetClusterizerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.event = Event(0)
+        self.event.particles = []
+        for pt, eta, phi, pdgid in [(10., 0.1, 0., 211), (5., 0., 0.2, 22),
+                                    (8., -0.1, math.pi, 211), (6., 0., 3., 130),
+                                    (1., 2., 1.5, 22), (3., 0., 1., 12)]:
+            p4 = LorentzVector()
+            p4.SetPtEtaPhiM(pt, eta, phi, 0.)
+            charge = 1 if pdgid == 211 else 0
+            self.event.particles.append(Particle(pdgid, charge, p4))
+        self.cfg_comp = cfg.Component(
+            'test',
+            files = []
+            )
+    
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_outputs(self):
+        cfg_ana = cfg.Analyzer(
+            JetClusterizer,
+            particles = 'particles',
+            backend = 'python',
+            outputs = dict(
+                jets2 = dict(njets=2),
+                jets5 = dict(njets=5),
+                jets6 = dict(njets=6),
+                jets_pt = dict(ptmin=1.),
+                ),
+            njets_required = False
+            )
+        clusterizer = JetClusterizer(cfg_ana, self.cfg_comp, self.outdir)
+        clusterizer.process(self.event)
+        event = self.event
+        self.assertEqual(len(event.jets2), 2)
+        self.assertEqual(len(event.jets5), 5)
+        # the neutrino is not clustered
+        self.assertEqual(event.jets6, [])
+        self.assertEqual(len(event.jets_pt), 1)
+        sume = sum(ptc.e() for ptc in event.particles[:-1])
+        self.assertAlmostEqual(sum(jet.e() for jet in event.jets2), sume)
+        self.assertAlmostEqual(event.jets2[0].constituents[211].e(),
+                               event.particles[0].e())
+        self.assertTrue(isinstance(event.jets2[0].p4(), LorentzVector))
+
+    def test_njets_required(self):
+        cfg_ana = cfg.Analyzer(
+            JetClusterizer,
+            output = 'jets',
+            particles = 'particles',
+            backend = 'python',
+            fastjet_args = dict(njets=6)
+            )
+        clusterizer = JetClusterizer(cfg_ana, self.cfg_comp, self.outdir)
+        self.assertFalse(clusterizer.process(self.event))
+
+    def test_args(self):
+        cfg_ana = cfg.Analyzer(
+            JetClusterizer,
+            output = 'jets',
+            particles = 'particles',
+            backend = 'python',
+            fastjet_args = dict(njets=2, ptmin=5.)
+            )
+        self.assertRaises(ValueError, JetClusterizer,
+                          cfg_ana, self.cfg_comp, self.outdir)
+
+    def test_fastjet_args(self):
+        '''the fastjet backend only provides the ee_kt algorithm'''
+        if CCJetClusterizer is None:
+            return
+        for args in [dict(algorithm='antikt'), dict(R=0.4)]:
+            cfg_ana = cfg.Analyzer(
+                JetClusterizer,
+                output = 'jets',
+                particles = 'particles',
+                backend = 'fastjet',
+                fastjet_args = dict(njets=2, **args)
+                )
+            self.assertRaises(ValueError, JetClusterizer,
+                              cfg_ana, self.cfg_comp, self.outdir)
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+'''Microbenchmark of the delta R matching engine in heppy.utils.deltar.
+
+The vectorized engine is compared to the nested loops calling deltaR2
+for each pair, for collections of increasing size.
+
+Usage::
+
+  python -m heppy.benchmarks.bench_deltar
+'''
+
+import random
+import math
+from ROOT import TLorentzVector
+
+from heppy.particles.tlv.particle import Particle
+from heppy.utils.deltar import deltaR2, matchObjectCollection, \
+    matchObjectCollection2, cleanObjectCollection
+from heppy.benchmarks.timing import best_time, print_table
+
+SIZES = [5, 10, 50, 100, 500]
+
+
+def make_particles(n):
+    '''Returns n massless particles uniformly distributed in eta, phi.'''
+    ptcs = []
+    for i in range(n):
+        tlv = TLorentzVector()
+        tlv.SetPtEtaPhiM(random.uniform(1, 100),
+                         random.uniform(-3, 3),
+                         random.uniform(-math.pi, math.pi), 0)
+        ptcs.append(Particle(211, 1, tlv))
+    return ptcs
+
+
+def loop_best_matches(ptcs, others):
+    '''Reference: one call to deltaR2 per pair.'''
+    results = []
+    for ptc in ptcs:
+        dR2min = float('+inf')
+        bm = None
+        for other in others:
+            dR2 = deltaR2(ptc, other)
+            if dR2 < dR2min:
+                dR2min = dR2
+                bm = other
+        results.append(bm)
+    return results
+
+
+def loop_unique_match(ptcs, others):
+    '''Reference: greedy unique matching on the sorted list of all pairs.'''
+    all_pairs = [(deltaR2(ptc, other), i, j)
+                 for i, ptc in enumerate(ptcs)
+                 for j, other in enumerate(others)]
+    all_pairs.sort()
+    return all_pairs
+
+
+def loop_clean(ptcs, masks, deltaRMax=0.3):
+    '''Reference: cleaning with one call to deltaR2 per pair.'''
+    return [ptc for ptc in ptcs
+            if all(deltaR2(ptc, mask) >= deltaRMax ** 2 for mask in masks)]
+
+
+def run(sizes=SIZES, repeat=3):
+    random.seed(0xdeadbeef)
+    rows = []
+    for size in sizes:
+        ptcs = make_particles(size)
+        others = make_particles(size)
+        masks = others[:max(1, size // 10)]
+        for name, loop, vectorized in [
+            ('best match',
+             lambda: loop_best_matches(ptcs, others),
+             lambda: matchObjectCollection(ptcs, others)),
+            ('unique match',
+             lambda: loop_unique_match(ptcs, others),
+             lambda: matchObjectCollection2(ptcs, others)),
+            ('clean',
+             lambda: loop_clean(ptcs, masks),
+             lambda: cleanObjectCollection(ptcs, masks)),
+            ]:
+            tloop = best_time(loop, repeat)
+            tvec = best_time(vectorized, repeat)
+            rows.append([name, size, tloop, tvec, tloop / tvec])
+    print_table(['matching', 'size', 'loop [s]', 'numpy [s]', 'speedup'],
+                rows)
+    return rows
+
+
+if __name__ == '__main__':
+    run()
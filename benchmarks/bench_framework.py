@@ -0,0 +1,204 @@
+'''Benchmark of the overhead of the heppy framework, and of a few core analyzers.
+
+Three measurements are done:
+ - looper: time per event of Looper.process, for a sequence of analyzers
+   that do nothing, with two inputs: heppy.framework.eventsgen (no input data),
+   and a local synthetic ROOT file read with heppy.framework.chain,
+   see heppy.utils.testtree. For the ROOT file, each analyzer reads a variable
+   of the tree.
+ - event: time to get an attribute of an Event, compared to a plain object.
+ - analyzers: time per event of the process method of Selector, Matcher,
+   JetClusterizer (python backend), IsolationAnalyzer, and ParticleTreeProducer,
+   for several particle multiplicities.
+
+The results can be written to a JSON file, to be compared across heppy versions.
+
+Usage::
+
+  python -m heppy.benchmarks.bench_framework -o framework.json
+'''
+
+import os
+import sys
+import math
+import json
+import random
+import shutil
+import timeit
+import logging
+import tempfile
+from optparse import OptionParser
+from ROOT import TLorentzVector
+
+import heppy.framework.config as cfg
+from heppy.framework.analyzer import Analyzer
+from heppy.framework.looper import Looper
+from heppy.framework.event import Event
+from heppy.framework.eventsgen import Events as GenEvents
+from heppy.framework.chain import Chain
+from heppy.utils.testtree import create_tree
+from heppy.particles.tlv.particle import Particle
+from heppy.particles.isolation import EtaPhiCircle
+from heppy.analyzers.Selector import Selector
+from heppy.analyzers.Matcher import Matcher
+from heppy.analyzers.fcc.JetClusterizer import JetClusterizer
+from heppy.analyzers.IsolationAnalyzer import IsolationAnalyzer
+from heppy.analyzers.ParticleTreeProducer import ParticleTreeProducer
+from heppy.benchmarks.timing import best_time, print_table
+
+NEVENTS = 1000
+NANALYZERS = [1, 5, 20]
+MULTIPLICITIES = [10, 100, 1000]
+
+
+class Nothing(Analyzer):
+    '''Does nothing, or reads var1 from the input if read_input is True.'''
+
+    def process(self, event):
+        if self.cfg_ana.read_input:
+            event.input.var1
+
+
+def has_pt_above_1(ptc):
+    return ptc.pt() > 1.
+
+
+def looper_time(workdir, events_class, fname, nanalyzers, nevents, repeat):
+    '''Returns the best time per event of Looper.process in seconds.'''
+    read_input = events_class is Chain
+    sequence = cfg.Sequence([cfg.Analyzer(Nothing, 'nothing_{}'.format(i),
+                                          read_input=read_input)
+                             for i in range(nanalyzers)])
+    component = cfg.Component('bench', files=[fname])
+    config = cfg.Config(components=[component], sequence=sequence,
+                        services=[], events_class=events_class)
+    looper = Looper(os.path.join(workdir, 'looper'), config, quiet=True)
+    def process():
+        for iev in range(nevents):
+            looper.process(iev)
+    # first pass to call beginLoop and to load the file
+    process()
+    result = best_time(process, repeat) / nevents
+    for handler in looper.logger.handlers[:]:
+        handler.close()
+        looper.logger.removeHandler(handler)
+    return result
+
+
+def run_looper(workdir, nevents=NEVENTS, nanalyzers=NANALYZERS, repeat=3):
+    fname = create_tree(os.path.join(workdir, 'bench_tree.root'), nevents)
+    results = []
+    for name, events_class in [('eventsgen', GenEvents), ('tree', Chain)]:
+        for n in nanalyzers:
+            time = looper_time(workdir, events_class, fname, n, nevents, repeat)
+            results.append(dict(input=name, nanalyzers=n, time_per_event=time))
+    print_table(['input', 'nanalyzers', 'us/event', 'us/ana/event'],
+                [[result['input'], result['nanalyzers'], result['time_per_event'] * 1e6,
+                  result['time_per_event'] * 1e6 / result['nanalyzers']]
+                 for result in results])
+    return results
+
+
+def run_event(naccess=100000, repeat=3):
+    class Plain(object):
+        pass
+    results = dict()
+    for name, obj in [('event', Event(0)), ('plain', Plain())]:
+        obj.particles = []
+        def access():
+            for i in xrange(naccess):
+                obj.particles
+        results[name] = best_time(access, repeat) / naccess
+    print_table(['object', 'ns/access'],
+                [[name, time * 1e9] for name, time in sorted(results.iteritems())])
+    return results
+
+
+def make_particles(n):
+    '''Returns n particles: charged hadrons, photons, neutral hadrons, and a few leptons.'''
+    kinds = [(211, 1), (-211, -1), (22, 0), (130, 0), (11, -1), (13, 1)]
+    ptcs = []
+    for i in range(n):
+        pdgid, charge = kinds[i % len(kinds)]
+        tlv = TLorentzVector()
+        tlv.SetPtEtaPhiM(random.expovariate(0.2) + 0.1, random.uniform(-3, 3),
+                         random.uniform(-math.pi, math.pi), 0.)
+        ptcs.append(Particle(pdgid, charge, tlv))
+    return ptcs
+
+
+def analyzer_configs():
+    '''Returns the configurations of the benchmarked analyzers.'''
+    return [
+        cfg.Analyzer(Selector, output='selected', input_objects='particles',
+                     filter_func=has_pt_above_1),
+        cfg.Analyzer(Matcher, delta_r=0.3, particles='particles',
+                     match_particles='gen_particles'),
+        cfg.Analyzer(JetClusterizer, output='jets', particles='particles',
+                     backend='python', fastjet_args=dict(njets=4)),
+        cfg.Analyzer(IsolationAnalyzer, candidates='leptons', particles='particles',
+                     iso_area=EtaPhiCircle(0.4)),
+        cfg.Analyzer(ParticleTreeProducer, particles='leptons'),
+    ]
+
+
+def run_analyzers(workdir, multiplicities=MULTIPLICITIES, repeat=3):
+    random.seed(0xdeadbeef)
+    component = cfg.Component('bench', files=[])
+    analyzers = []
+    for config in analyzer_configs():
+        analyzer = config.class_object(config, component, workdir)
+        analyzer.beginLoop(None)
+        analyzers.append(analyzer)
+    results = []
+    for n in multiplicities:
+        event = Event(0)
+        event.particles = make_particles(n)
+        event.gen_particles = make_particles(n)
+        event.leptons = [ptc for ptc in event.particles if abs(ptc.pdgid()) in [11, 13]]
+        for analyzer in analyzers:
+            time = best_time(lambda: analyzer.process(event), repeat)
+            results.append(dict(analyzer=analyzer.__class__.__name__,
+                                nparticles=n, time_per_event=time))
+    print_table(['analyzer', 'nparticles', 'ms/event'],
+                [[result['analyzer'], result['nparticles'], result['time_per_event'] * 1e3]
+                 for result in results])
+    for analyzer in analyzers:
+        analyzer.write(None)
+    return results
+
+
+def run(nevents=NEVENTS, repeat=3):
+    '''Runs all measurements in a temporary directory, and returns the results.'''
+    workdir = tempfile.mkdtemp()
+    logging.getLogger().setLevel(logging.WARNING)
+    try:
+        results = dict(benchmark='framework')
+        results['looper'] = run_looper(workdir, nevents, repeat=repeat)
+        print
+        results['event'] = run_event(repeat=repeat)
+        print
+        results['analyzers'] = run_analyzers(workdir, repeat=repeat)
+    finally:
+        shutil.rmtree(workdir)
+    return results
+
+
+def main(args=None):
+    parser = OptionParser(usage='%prog [options]')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='write the results to this JSON file')
+    parser.add_option('-n', '--nevents', dest='nevents', type='int', default=NEVENTS,
+                      help='number of events for the looper measurement')
+    parser.add_option('-r', '--repeat', dest='repeat', type='int', default=3,
+                      help='number of repetitions, the best time is kept')
+    options, args = parser.parse_args(args)
+    results = run(options.nevents, options.repeat)
+    if options.output:
+        with open(options.output, 'w') as out:
+            json.dump(results, out, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
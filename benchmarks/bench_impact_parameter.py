@@ -0,0 +1,106 @@
+'''Benchmark and accuracy check of the impact parameter calculation:
+heppy.papas.path.closest_approach_times, computing the points of closest
+approach for all tracks at once, versus the brent minimization
+of scipy.optimize.minimize_scalar previously done track by track
+in heppy.papas.path.ImpactParameter.
+
+The tracks are made with a displaced vertex of a few hundred microns
+in the transverse plane and along z, with momenta between 1 and 50 GeV.
+
+The accuracy is measured with respect to a reference brent minimization
+performed with the time expressed in ns, in a narrow bracket.
+In seconds, the absolute tolerance of the brent method of scipy (1e-11)
+is larger than the typical time of closest approach (1e-12 s), so that
+the previous calculation could be off by up to a mm, or even converge
+to the closest approach after a full loop of the helix.
+
+Usage::
+
+  python -m heppy.benchmarks.bench_impact_parameter
+'''
+
+import random
+import math
+import scipy.optimize
+from ROOT import TLorentzVector, TVector3
+
+from heppy.papas.path import Helix, closest_approach_times
+from heppy.benchmarks.timing import best_time, print_table
+
+NTRACKS = [10, 100, 1000]
+
+
+def make_helices(n, field=3.8, displacement=5e-4):
+    '''Returns n helices of charged pions from displaced vertices.'''
+    helices = []
+    for i in range(n):
+        p4 = TLorentzVector()
+        p4.SetPtEtaPhiM(random.uniform(1., 50.),
+                        random.uniform(-2.5, 2.5),
+                        random.uniform(-math.pi, math.pi), 0.139)
+        vertex = TVector3(random.gauss(0, displacement),
+                          random.gauss(0, displacement),
+                          random.gauss(0, displacement))
+        helices.append(Helix(field, random.choice([-1, 1]), p4, vertex))
+    return helices
+
+
+def brent_time(helix, origin):
+    '''time of closest approach, as previously computed in ImpactParameter'''
+    def distquad(time):
+        x, y, z = helix.coord_at_time(time)
+        return (x - origin.x())**2 + (y - origin.y())**2 + (z - origin.z())**2
+    return scipy.optimize.minimize_scalar(
+        distquad,
+        method='brent',
+        bracket=[-5e-9, 5e-9],
+        options={'xtol': 1e-20, 'maxiter': 1e5},
+        tol=None,
+    ).x
+
+
+def reference_time(helix, origin):
+    '''accurate time of closest approach, the minimization being done in ns'''
+    def distquad(time):
+        x, y, z = helix.coord_at_time(time * 1e-9)
+        return (x - origin.x())**2 + (y - origin.y())**2 + (z - origin.z())**2
+    return scipy.optimize.minimize_scalar(
+        distquad,
+        method='brent',
+        bracket=[-5e-3, 5e-3],
+        tol=1e-12,
+    ).x * 1e-9
+
+
+def impact_parameter(helix, origin, time):
+    return (helix.point_at_time(time) - origin).Mag()
+
+
+def run(ntracks=NTRACKS, repeat=3):
+    random.seed(0xdeadbeef)
+    origin = TVector3(0, 0, 0)
+    rows = []
+    for n in ntracks:
+        helices = make_helices(n)
+        tbrent = best_time(lambda: [brent_time(helix, origin)
+                                    for helix in helices], repeat)
+        tnewton = best_time(lambda: closest_approach_times(helices, origin),
+                            repeat)
+        times = closest_approach_times(helices, origin)
+        dbrent = 0.
+        dnewton = 0.
+        for helix, time in zip(helices, times):
+            ref = impact_parameter(helix, origin,
+                                   reference_time(helix, origin))
+            brent = impact_parameter(helix, origin, brent_time(helix, origin))
+            dbrent = max(dbrent, abs(brent - ref))
+            dnewton = max(dnewton, abs(impact_parameter(helix, origin, time) - ref))
+        rows.append([n, tbrent * 1e3, tnewton * 1e3, tbrent / tnewton,
+                     dbrent, dnewton])
+    print_table(['ntracks', 'brent [ms]', 'newton [ms]', 'speedup',
+                 'brent |dIP| [m]', 'newton |dIP| [m]'], rows)
+    return rows
+
+
+if __name__ == '__main__':
+    run()
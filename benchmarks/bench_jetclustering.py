@@ -0,0 +1,71 @@
+'''Benchmark of the jet clustering backends of
+heppy.analyzers.fcc.JetClusterizer: the compiled fastjet library,
+if available, and heppy.utils.jetclustering.
+
+Usage::
+
+  python -m heppy.benchmarks.bench_jetclustering
+'''
+
+import random
+import math
+from ROOT import TLorentzVector
+
+from heppy.analyzers.fcc.JetClusterizer import CCJetClusterizer
+from heppy.utils.jetclustering import ClusterSequence
+from heppy.particles.combinatorics import p4_array
+from heppy.particles.tlv.particle import Particle
+from heppy.benchmarks.timing import best_time, print_table
+
+MULTIPLICITIES = [20, 50, 100, 200, 500]
+
+
+def make_particles(n):
+    '''Returns n massless particles.'''
+    ptcs = []
+    for i in range(n):
+        tlv = TLorentzVector()
+        tlv.SetPtEtaPhiM(random.expovariate(0.2),
+                         random.uniform(-3, 3),
+                         random.uniform(-math.pi, math.pi), 0.)
+        ptcs.append(Particle(211, 1, tlv))
+    return ptcs
+
+
+def cluster_fastjet(clusterizer, ptcs, njets):
+    clusterizer.clear()
+    for ptc in ptcs:
+        clusterizer.add_p4(ptc.p4())
+    clusterizer.make_exclusive_jets(njets)
+    return [clusterizer.jet(i) for i in range(clusterizer.n_jets())]
+
+
+def cluster_python(ptcs, njets, algorithm='ee_kt'):
+    sequence = ClusterSequence(p4_array(ptcs), algorithm)
+    return [sequence.p4(jet) for jet in sequence.exclusive_jets(njets)]
+
+
+def run(multiplicities=MULTIPLICITIES, njets=4, repeat=3):
+    random.seed(0xdeadbeef)
+    clusterizer = CCJetClusterizer(1) if CCJetClusterizer else None
+    rows = []
+    for n in multiplicities:
+        ptcs = make_particles(n)
+        tpython = best_time(lambda: cluster_python(ptcs, njets), repeat)
+        tantikt = best_time(lambda: cluster_python(ptcs, njets, 'antikt'),
+                            repeat)
+        if clusterizer:
+            tfastjet = best_time(
+                lambda: cluster_fastjet(clusterizer, ptcs, njets), repeat)
+            ratio = tpython / tfastjet
+            tfastjet *= 1e3
+        else:
+            tfastjet, ratio = 'n/a', 'n/a'
+        rows.append([n, tfastjet, tpython * 1e3, tantikt * 1e3, ratio])
+    print_table(['nparticles', 'fastjet [ms]', 'ee_kt [ms]',
+                 'antikt [ms]', 'python/fastjet'], rows)
+    return rows
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,69 @@
+'''Benchmark of the per-call cost of the 4-vector backends
+of heppy.particles.tlv: ROOT TLorentzVector and the python
+LorentzVector.
+
+Usage::
+
+  python -m heppy.benchmarks.bench_p4
+'''
+
+import random
+import math
+from ROOT import TLorentzVector
+
+from heppy.particles.tlv.particle import Particle
+from heppy.particles.tlv.resonance import Resonance2
+from heppy.particles.tlv.lorentzvector import LorentzVector, Vector3
+from heppy.benchmarks.timing import best_time, print_table
+
+NPARTICLES = 100
+
+
+def make_particles(backend, n):
+    '''Returns n particles with 4-momenta of type backend.'''
+    ptcs = []
+    for i in range(n):
+        tlv = backend()
+        tlv.SetPtEtaPhiM(random.uniform(1, 100),
+                         random.uniform(-3, 3),
+                         random.uniform(-math.pi, math.pi), 0.105)
+        ptcs.append(Particle(211, 1, tlv))
+    return ptcs
+
+
+def boost(ptcs, boost_vector):
+    for i in range(0, len(ptcs) - 1, 2):
+        Resonance2(ptcs[i], ptcs[i + 1], 23).boost(boost_vector)
+
+
+def run(nparticles=NPARTICLES, repeat=5):
+    random.seed(0xdeadbeef)
+    rows = []
+    results = dict()
+    for name, backend, vector3 in [('ROOT', TLorentzVector, None),
+                                   ('python', LorentzVector, Vector3)]:
+        ptcs = make_particles(backend, nparticles)
+        boost_vector = backend(0, 0, 10, 100).BoostVector()
+        tests = [
+            ('e', lambda: [ptc.e() for ptc in ptcs]),
+            ('pt', lambda: [ptc.pt() for ptc in ptcs]),
+            ('eta', lambda: [ptc.eta() for ptc in ptcs]),
+            ('phi', lambda: [ptc.phi() for ptc in ptcs]),
+            ('m', lambda: [ptc.m() for ptc in ptcs]),
+            ('sort', lambda: sorted(ptcs, reverse=True)),
+            ('resonance', lambda: boost(ptcs, boost_vector)),
+            ]
+        for test, func in tests:
+            # time per particle
+            results[(test, name)] = best_time(func, repeat) / nparticles
+    for test in ['e', 'pt', 'eta', 'phi', 'm', 'sort', 'resonance']:
+        troot = results[(test, 'ROOT')]
+        tpython = results[(test, 'python')]
+        rows.append([test, troot * 1e6, tpython * 1e6, troot / tpython])
+    print_table(['per particle', 'ROOT [us]', 'python [us]', 'speedup'],
+                rows)
+    return rows
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,123 @@
+'''Benchmark of the memory used by the papas simulation:
+particles, tracks and clusters of heppy.papas.pfobjects.
+
+The tracks and clusters are slotted, and their momentum and position are
+stored as floats, the ROOT TVector3 objects being created only when requested.
+
+Two measurements are done for 1000 simulated particles:
+ - the size of the python objects of each collection, per object;
+ - the increase of the resident memory of the process for the whole simulation,
+   and after the TVector3 of all tracks and clusters have been requested.
+The resident memory includes the memory allocated by ROOT,
+and is only available on linux.
+
+Usage::
+
+  python -m heppy.benchmarks.bench_papas_memory
+'''
+
+import gc
+import sys
+import random
+import math
+import resource
+from ROOT import TLorentzVector, TVector3
+
+from heppy.papas.detectors.CMS import CMS
+from heppy.papas.simulator import Simulator
+from heppy.papas.pfobjects import Particle
+from heppy.papas.graphtools.history import History
+from heppy.benchmarks.timing import print_table
+
+NPARTICLES = 1000
+
+COLLECTIONS = ['simulated_particles', 'true_tracks', 'smeared_tracks',
+               'true_ecals', 'smeared_ecals', 'true_hcals', 'smeared_hcals']
+
+
+def make_particles(n):
+    '''Returns n particles: charged and neutral hadrons, photons, electrons and muons.'''
+    kinds = [(211, 1, 0.139), (-211, -1, 0.139), (130, 0, 0.497),
+             (22, 0, 0.), (11, -1, 0.000511), (13, -1, 0.105)]
+    ptcs = []
+    for i in range(n):
+        pdgid, charge, mass = random.choice(kinds)
+        tlv = TLorentzVector()
+        tlv.SetPtEtaPhiM(random.expovariate(1 / 5.) + 0.5,
+                         random.uniform(-2.5, 2.5),
+                         random.uniform(-math.pi, math.pi), mass)
+        ptcs.append(Particle(tlv, TVector3(0, 0, 0), charge, pdgid, i))
+    return ptcs
+
+
+def resident():
+    '''Returns the resident memory of the process in bytes, or None
+    if it is not available.'''
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except IOError:
+        return None
+
+
+def object_size(obj):
+    '''Returns the size in bytes of obj, of its __dict__ if any, and of its
+    float and container attributes. Shared objects (paths, particles,
+    other tracks and clusters) are not counted.'''
+    size = sys.getsizeof(obj)
+    values = []
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+        values.extend(obj.__dict__.values())
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if hasattr(obj, name):
+                values.append(getattr(obj, name))
+    for value in values:
+        if isinstance(value, (float, list, dict)):
+            size += sys.getsizeof(value)
+    return size
+
+
+def simulate(nparticles):
+    detector = CMS()
+    simulator = Simulator(detector)
+    simulator.simulate(make_particles(nparticles), History())
+    return simulator
+
+
+def run(nparticles=NPARTICLES):
+    random.seed(0xdeadbeef)
+    gc.collect()
+    before = resident()
+    simulator = simulate(nparticles)
+    gc.collect()
+    lazy = resident()
+    rows = []
+    for name in COLLECTIONS:
+        objects = getattr(simulator, name).values()
+        if not objects:
+            continue
+        rows.append([name, len(objects),
+                     float(sum(object_size(obj) for obj in objects)) / len(objects)])
+    print_table(['collection', 'objects', 'bytes/object'], rows)
+    # now request the ROOT objects
+    for name in COLLECTIONS:
+        for obj in getattr(simulator, name).itervalues():
+            if hasattr(obj, 'position'):
+                obj.position
+            elif hasattr(obj, 'p3'):
+                obj.p3()
+    gc.collect()
+    materialized = resident()
+    if before is not None:
+        scale = 1000. / nparticles / 1024.
+        print
+        print_table(['per 1000 ptcs', 'resident [kB]'],
+                    [['simulation', (lazy - before) * scale],
+                     ['ROOT vectors', (materialized - lazy) * scale]])
+    return rows
+
+
+if __name__ == '__main__':
+    run()
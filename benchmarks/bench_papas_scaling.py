@@ -0,0 +1,273 @@
+'''Scaling benchmark of papas: simulation and particle flow reconstruction
+of synthetic events of increasing multiplicity, from a single particle
+to multijet events with pile-up.
+
+The events are generated with heppy.papas.toyevents. Each stage of the chain is
+timed separately:
+ - simulation: Simulator.simulate
+ - merging: MergedClusterBuilder, for the ecal and hcal clusters
+ - blocks: PFBlockBuilder
+ - splitting: PFReconstructor.split_blocks
+ - reconstruction: PFReconstructor.reconstruct_split_blocks
+The increase of the resident memory of the process is measured for each stage
+(linux only, see bench_papas_memory).
+
+The results can be written to a JSON file, and compared to the results of
+a previous run, used as a baseline: the stages that are slower than
+in the baseline by more than the tolerance are reported as regressions.
+The JSON file also describes the machine and the versions of python, numpy and ROOT,
+as the times can only be compared on the same machine.
+
+A reference results file, bench_papas_scaling_reference.json, is kept next to
+this module, and is used as the baseline with the -c option.
+It was produced with 5 runs of each scenario::
+
+  python -m heppy.benchmarks.bench_papas_scaling -r 5 -o bench_papas_scaling_reference.json
+
+The numbers of particles, blocks and reconstructed particles of the reference
+can be checked anywhere. To check the times on another machine,
+produce a reference there in the same way, from the commit to compare to.
+
+Usage::
+
+  python -m heppy.benchmarks.bench_papas_scaling -o results.json
+  python -m heppy.benchmarks.bench_papas_scaling -b results.json -t 0.25
+  python -m heppy.benchmarks.bench_papas_scaling -c
+'''
+
+import gc
+import os
+import sys
+import math
+import json
+import time
+import timeit
+import logging
+import platform
+import numpy as np
+from optparse import OptionParser
+
+from heppy.papas.detectors.CMS import CMS
+from heppy.papas.simulator import Simulator
+from heppy.papas.pfobjects import Particle
+from heppy.papas.data.papasevent import PapasEvent
+from heppy.papas.pfalgo.distance import Distance
+from heppy.papas.mergedclusterbuilder import MergedClusterBuilder
+from heppy.papas.pfalgo.pfblockbuilder import PFBlockBuilder
+from heppy.papas.pfalgo.pfreconstructor import PFReconstructor
+import heppy.papas.toyevents as toyevents
+import heppy.statistics.rrandom as random
+from heppy.benchmarks.bench_papas_memory import resident
+from heppy.benchmarks.timing import print_table
+
+STAGES = ['simulation', 'merging', 'blocks', 'splitting', 'reconstruction']
+
+#: reference results, see the module documentation
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'bench_papas_scaling_reference.json')
+
+JET = [211, -211, 211, -211, 22, 22, 22, 22, 130, 22]
+
+
+def jets(njets, energy=50.):
+    '''Returns the particles of njets jets of 10 particles, evenly spaced in phi.'''
+    ptcs = []
+    for i in range(njets):
+        theta = random.uniform(0.5, math.pi - 0.5)
+        phi = -math.pi + 2 * math.pi * (i + random.uniform(0.2, 0.8)) / njets
+        ptcs.extend(toyevents.monojet(JET, theta, phi, 1., energy))
+    return ptcs
+
+
+def pileup(nparticles):
+    '''Returns nparticles soft particles, a quarter of each of
+    pi+, pi-, photons and K0L.'''
+    ptcs = []
+    for pdgid in [211, -211, 22, 130]:
+        ptcs.extend(toyevents.particles(nparticles / 4, pdgid, 0.2, math.pi - 0.2, 0.5, 5.))
+    return ptcs
+
+
+#: name and generator of the particles of the events
+SCENARIOS = [
+    ('single', lambda: [toyevents.particle(211, 1.2, 0.3, 20.)]),
+    ('monojet', lambda: jets(1)),
+    ('dijet', lambda: jets(2)),
+    ('4jets', lambda: jets(4)),
+    ('4jets_pu100', lambda: jets(4) + pileup(100)),
+    ('4jets_pu400', lambda: jets(4) + pileup(400)),
+    ('8jets_pu1000', lambda: jets(8) + pileup(1000)),
+]
+
+
+def make_event(generate, seed=0xdeadbeef):
+    '''Returns the particles made by generate, with distinct identifiers.'''
+    random.seed(seed)
+    return [Particle(ptc.p4(), ptc.vertex, ptc.q(), ptc.pdgid(), index)
+            for index, ptc in enumerate(generate())]
+
+
+class Chain(object):
+    '''The papas chain, stage by stage, as in the papas analyzers.'''
+
+    def __init__(self, detector, ptcs):
+        self.detector = detector
+        self.ptcs = ptcs
+        self.logger = logging.getLogger('bench_papas_scaling')
+        self.papasevent = PapasEvent(0)
+        self.ruler = Distance()
+
+    def simulation(self):
+        simulator = Simulator(self.detector, self.logger)
+        simulator.simulate(self.ptcs, self.papasevent.history)
+        for collection in [simulator.simulated_particles, simulator.true_tracks,
+                           simulator.smeared_tracks, simulator.true_ecals, simulator.smeared_ecals,
+                           simulator.true_hcals, simulator.smeared_hcals]:
+            self.papasevent.add_collection(collection)
+
+    def merging(self):
+        for name in ['es', 'hs']:
+            builder = MergedClusterBuilder(self.papasevent.get_collection(name),
+                                           self.ruler, self.papasevent.history)
+            self.papasevent.add_collection(builder.merged_clusters)
+
+    def blocks(self):
+        ids = self.papasevent.get_collection('ts').keys() + \
+              self.papasevent.get_collection('em').keys() + \
+              self.papasevent.get_collection('hm').keys()
+        self.papasevent.add_collection(PFBlockBuilder(self.papasevent, ids, self.ruler).blocks)
+
+    def splitting(self):
+        self.reconstructor = PFReconstructor(self.detector, self.logger)
+        self.reconstructor.split_blocks(self.papasevent, 'br')
+
+    def reconstruction(self):
+        self.reconstructor.reconstruct_split_blocks()
+
+
+def measure(detector, generate, repeat=3):
+    '''Runs the chain repeat times on the same event.
+    Returns the best time of each stage in seconds, the memory increase of each stage
+    in kB for the first run, and the numbers of particles, blocks and reconstructed particles.'''
+    times = dict((stage, []) for stage in STAGES)
+    memory = dict()
+    for i in range(repeat):
+        chain = Chain(detector, make_event(generate))
+        for stage in STAGES:
+            gc.collect()
+            before = resident()
+            start = timeit.default_timer()
+            getattr(chain, stage)()
+            times[stage].append(timeit.default_timer() - start)
+            if i == 0 and before is not None:
+                memory[stage] = (resident() - before) / 1024.
+    counts = dict(nparticles=len(chain.ptcs),
+                  nblocks=len(chain.reconstructor.splitblocks),
+                  nreconstructed=len(chain.reconstructor.particles))
+    return dict((stage, min(values)) for stage, values in times.iteritems()), memory, counts
+
+
+def run(scenarios=SCENARIOS, repeat=3):
+    '''Runs the benchmark for all scenarios, prints and returns the results,
+    a list of dictionaries (one per scenario).'''
+    detector = CMS()
+    results = []
+    for name, generate in scenarios:
+        times, memory, counts = measure(detector, generate, repeat)
+        result = dict(scenario=name, times=times, memory_kb=memory)
+        result.update(counts)
+        results.append(result)
+    print 'best time of each stage [ms]'
+    print_table(['scenario', 'nparticles', 'nblocks'] + STAGES,
+                [[result['scenario'], result['nparticles'], result['nblocks']] +
+                 [result['times'][stage] * 1e3 for stage in STAGES] for result in results])
+    if results and results[0]['memory_kb']:
+        print
+        print 'resident memory increase of each stage [kB]'
+        print_table(['scenario'] + STAGES,
+                    [[result['scenario']] + [result['memory_kb'][stage] for stage in STAGES]
+                     for result in results])
+    return results
+
+
+def environment():
+    '''returns a description of the machine and of the software versions'''
+    import ROOT
+    root_version = None
+    if hasattr(ROOT.gROOT, 'GetVersion'):
+        root_version = ROOT.gROOT.GetVersion()
+    return dict(date=time.strftime('%Y-%m-%d'), machine=platform.machine(),
+                processor=platform.processor(), system=platform.platform(),
+                python=platform.python_version(), numpy=np.__version__,
+                root=root_version)
+
+
+def compare(results, baseline, tolerance=0.25, min_time=1e-3):
+    '''Returns the regressions of results with respect to baseline, as a list of
+    (scenario, stage, time, baseline time).
+    A stage is a regression if it is slower than in the baseline by more than
+    the relative tolerance. The stages faster than min_time seconds in the baseline
+    are not considered, as their timing is not reliable.'''
+    reference = dict((result['scenario'], result) for result in baseline)
+    regressions = []
+    for result in results:
+        if result['scenario'] not in reference:
+            continue
+        for stage, time in sorted(result['times'].iteritems()):
+            base = reference[result['scenario']]['times'].get(stage)
+            if base is None or base < min_time:
+                continue
+            if time > base * (1 + tolerance):
+                regressions.append((result['scenario'], stage, time, base))
+    return regressions
+
+
+def main(args=None):
+    parser = OptionParser(usage='%prog [options]')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='write the results to this JSON file')
+    parser.add_option('-b', '--baseline', dest='baseline', default=None,
+                      help='JSON file of a previous run, to look for regressions')
+    parser.add_option('-c', '--check', dest='check', action='store_true', default=False,
+                      help='use the reference results as the baseline')
+    parser.add_option('-t', '--tolerance', dest='tolerance', type='float', default=0.25,
+                      help='relative slowdown above which a stage is a regression')
+    parser.add_option('-r', '--repeat', dest='repeat', type='int', default=3,
+                      help='number of runs of each scenario, the best time is kept')
+    options, args = parser.parse_args(args)
+    if options.check:
+        options.baseline = REFERENCE
+    results = run(repeat=options.repeat)
+    if options.output:
+        with open(options.output, 'w') as out:
+            json.dump(dict(benchmark='papas_scaling', environment=environment(),
+                           repeat=options.repeat, results=results), out,
+                      indent=2, sort_keys=True)
+    if options.baseline:
+        with open(options.baseline) as infile:
+            reference = json.load(infile)
+        baseline = reference['results']
+        print
+        print 'baseline', options.baseline
+        print 'produced on', ', '.join('{}={}'.format(key, value) for key, value in
+                                       sorted(reference.get('environment', dict()).iteritems()))
+        for result, base in zip(results, baseline):
+            counts = ['nparticles', 'nblocks', 'nreconstructed']
+            if result['scenario'] == base['scenario'] and \
+               [result[key] for key in counts] != [base[key] for key in counts]:
+                print 'warning: the events of {} differ from the baseline'.format(
+                    result['scenario'])
+        regressions = compare(results, baseline, options.tolerance)
+        print
+        if not regressions:
+            print 'no regression with respect to', options.baseline
+            return 0
+        print_table(['scenario', 'stage', 'time [ms]', 'baseline [ms]', 'ratio'],
+                    [[scenario, stage, time * 1e3, base * 1e3, time / base]
+                     for scenario, stage, time, base in regressions])
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+'''Benchmark of the batch smearing of the papas Simulator.
+
+The simulation of the events of bench_papas_scaling with many jets is timed
+in the default mode, where each track and cluster is smeared when it is made,
+and in batch mode, where all the tracks and clusters of the event are smeared
+at once, see L{Simulator<heppy.papas.simulator.Simulator>}.
+
+In batch mode, the simulator makes lookup tables of the energy resolution and
+response of the calorimeters at the first event. This is done before the timing.
+The track resolutions are still computed track by track.
+
+The results can be written to a JSON file.
+
+Usage::
+
+  python -m heppy.benchmarks.bench_papas_smearing -o smearing.json
+'''
+
+import gc
+import sys
+import json
+import timeit
+import logging
+from optparse import OptionParser
+
+from heppy.papas.detectors.CMS import CMS
+from heppy.papas.simulator import Simulator
+from heppy.papas.graphtools.history import History
+from heppy.benchmarks.bench_papas_scaling import SCENARIOS, make_event
+from heppy.benchmarks.timing import print_table
+
+MODES = ['default', 'batch']
+
+#: the scenarios of bench_papas_scaling with jets
+JET_SCENARIOS = [(name, generate) for name, generate in SCENARIOS if 'jet' in name]
+
+
+def measure(simulator, generate, repeat=3):
+    '''Simulates the same event repeat times.
+    Returns the best time in seconds, and the number of smeared clusters.'''
+    times = []
+    for i in range(repeat):
+        ptcs = make_event(generate)
+        gc.collect()
+        start = timeit.default_timer()
+        simulator.simulate(ptcs, History())
+        times.append(timeit.default_timer() - start)
+    nclusters = len(simulator.smeared_ecals) + len(simulator.smeared_hcals)
+    return min(times), nclusters
+
+
+def run(scenarios=JET_SCENARIOS, repeat=3):
+    '''Runs the benchmark for all scenarios, prints and returns the results,
+    a list of dictionaries (one per scenario).'''
+    detector = CMS()
+    logger = logging.getLogger('bench_papas_smearing')
+    simulators = dict((mode, Simulator(detector, logger, batch=(mode == 'batch')))
+                      for mode in MODES)
+    # first event, to make the lookup tables of the batch mode
+    for simulator in simulators.values():
+        measure(simulator, scenarios[0][1], 1)
+    results = []
+    for name, generate in scenarios:
+        result = dict(scenario=name, times=dict())
+        for mode in MODES:
+            time, nclusters = measure(simulators[mode], generate, repeat)
+            result['times'][mode] = time
+        result['nparticles'] = len(make_event(generate))
+        result['nclusters'] = nclusters
+        results.append(result)
+    print 'best simulation time [ms]'
+    print_table(['scenario', 'nparticles', 'nclusters'] + MODES + ['speed-up'],
+                [[result['scenario'], result['nparticles'], result['nclusters']] +
+                 [result['times'][mode] * 1e3 for mode in MODES] +
+                 [result['times']['default'] / result['times']['batch']]
+                 for result in results])
+    return results
+
+
+def main(args=None):
+    parser = OptionParser(usage='%prog [options]')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='write the results to this JSON file')
+    parser.add_option('-r', '--repeat', dest='repeat', type='int', default=3,
+                      help='number of runs of each scenario, the best time is kept')
+    options, args = parser.parse_args(args)
+    results = run(repeat=options.repeat)
+    if options.output:
+        with open(options.output, 'w') as out:
+            json.dump(dict(benchmark='papas_smearing', results=results), out,
+                      indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,23 @@
+'''Timing tools shared by the heppy benchmarks.'''
+
+import timeit
+
+
+def best_time(func, repeat=5, number=1):
+    '''Returns the best time in seconds for number calls to func,
+    out of repeat trials.'''
+    timer = timeit.Timer(func)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def print_table(header, rows):
+    '''Prints rows (lists of values) aligned below header (list of strings).'''
+    fmt = ' '.join(['{:>14}'] * len(header))
+    print(fmt.format(*header))
+    for row in rows:
+        cells = []
+        for value in row:
+            if isinstance(value, float):
+                value = '{:.4g}'.format(value)
+            cells.append(value)
+        print(fmt.format(*cells))
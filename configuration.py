@@ -14,3 +14,16 @@ class Collider(object):
     '''
     BEAMS = 'pp' 
     SQRTS = 13000.
+
+
+class Random(object):
+    '''Describes the random number generation, see heppy.statistics.rrandom.
+
+    @param BACKEND: 'numpy' (default), 'root', or 'cpplib'.
+           With numpy, each analyzer uses an independent stream
+           of random numbers for each event, so that the results do not
+           depend on the way the events are split into jobs.
+           root gives the same random numbers as the previous versions
+           of heppy, for validation.
+    '''
+    BACKEND = 'numpy'
@@ -0,0 +1,221 @@
+'''Plain geometry primitives for the event display.
+
+The classes of L{geometry<heppy.display.geometry>} and L{pfobjects<heppy.display.pfobjects>}
+create ROOT graphics objects, which are drawn in the analysis process.
+The functions of this module describe the same drawings with plain python
+objects, that do not depend on ROOT and that can be serialized:
+a primitive is a dictionary with a 'shape' ('ellipse', 'box' or 'graph'),
+its coordinates, and the ROOT style attributes (colors, fill and line styles).
+
+A Scene holds the primitives of an event for a set of projections and subscreens,
+like the L{Display<heppy.display.core.Display>}. It can be sent to another
+process and rendered there, see L{renderer<heppy.display.renderer>}.
+
+Example::
+
+    scene = Scene('event_12', ['xy', 'yz'], ['simulated'])
+    scene.register(detector_shapes(detector), layer=0)
+    scene.register(trajectory_shapes(particles), layer=2)
+    scene.register(cluster_shapes(clusters), layer=2)
+'''
+
+import math
+import numpy as np
+
+#: ROOT color indices, see geometry.COLORS
+COLORS = dict(
+    ECAL=622,     # kRed-10
+    HCAL=590,     # kBlue-10
+    void=None,
+    BeamPipe=422  # kCyan-10
+)
+
+GREY = 17
+
+
+def ellipse(x, y, r1, r2=None, line_color=1, fill_color=0, fill_style=0):
+    '''returns an ellipse primitive, a circle if r2 is None'''
+    return dict(shape='ellipse', x=x, y=y, r1=r1, r2=r1 if r2 is None else r2,
+                line_color=line_color, fill_color=fill_color, fill_style=fill_style)
+
+
+def box(x1, y1, x2, y2, line_color=1, fill_color=0, fill_style=0):
+    '''returns a box primitive, from its lower left and upper right corners'''
+    return dict(shape='box', x1=x1, y1=y1, x2=x2, y2=y2,
+                line_color=line_color, fill_color=fill_color, fill_style=fill_style)
+
+
+def graph(xs, ys, option='p', line_color=1, line_style=1, line_width=1,
+          marker_color=1, marker_style=2, marker_size=0.7):
+    '''returns a graph primitive.
+    @param xs, ys: coordinates of the points
+    @param option: 'p' to draw the markers, 'l' to draw a line, 'lp' for both
+    '''
+    return dict(shape='graph', x=[float(x) for x in xs], y=[float(y) for y in ys],
+                option=option, line_color=line_color, line_style=line_style,
+                line_width=line_width, marker_color=marker_color,
+                marker_style=marker_style, marker_size=marker_size)
+
+
+def detector_shapes(detector):
+    '''returns the shapes of the detector for each projection,
+    as L{GDetector<heppy.display.geometry.GDetector>}.'''
+    shapes = dict(xy=[], yz=[], xz=[])
+    elems = sorted(detector.elements.values(),
+                   key=lambda x: x.volume.outer.rad, reverse=True)
+    for elem in elems:
+        color = COLORS[elem.material.name]
+        if color:
+            outer = dict(fill_color=color, fill_style=1001)
+            inner = dict(fill_color=0, fill_style=1001)
+        else:
+            outer = inner = dict(fill_style=0)
+        cylinders = [(elem.volume.outer, outer)]
+        if elem.volume.inner:
+            cylinders.append((elem.volume.inner, inner))
+        for cylinder, style in cylinders:
+            radius, dz = cylinder.rad, cylinder.z
+            shapes['xy'].append(ellipse(0., 0., radius, **style))
+            for projection in ['yz', 'xz']:
+                shapes[projection].append(box(-dz, -radius, dz, radius, **style))
+    return shapes
+
+
+def cluster_shapes(clusters, grey=False):
+    '''returns the shapes of the clusters for each projection,
+    as L{Blob<heppy.display.pfobjects.Blob>}.'''
+    shapes = dict(xy=[], yz=[], xz=[], ECAL_thetaphi=[], HCAL_thetaphi=[])
+    for cluster in clusters:
+        x, y, z = cluster.xyz()
+        pos = cluster.position
+        radius = cluster.size()
+        thetaphiradius = cluster.angular_size()
+        color = 7
+        innercolor = 1
+        if cluster.particle:
+            if cluster.particle.pdgid() == 22 or cluster.particle.pdgid() == 11:
+                color = 2
+            else:
+                color = 4
+        if grey:
+            color = GREY
+            innercolor = GREY
+        max_energy = cluster.__class__.max_energy
+        scale = cluster.energy / max_energy if max_energy else 1.
+        centers = [('xy', x, y, radius), ('yz', z, y, radius), ('xz', z, x, radius)]
+        thetaphi = {'ecal_in': 'ECAL_thetaphi', 'hcal_in': 'HCAL_thetaphi'}.get(cluster.layer)
+        if thetaphi:
+            centers.append((thetaphi, math.pi / 2. - pos.Theta(), pos.Phi(), thetaphiradius))
+        for projection, cx, cy, r in centers:
+            shapes[projection].append(ellipse(cx, cy, r, line_color=color))
+            shapes[projection].append(ellipse(cx, cy, r * scale, line_color=innercolor,
+                                              fill_color=color, fill_style=3002))
+    return shapes
+
+
+def _projections(points, first_direction):
+    '''returns the coordinates of the points in each projection.
+    In the theta-phi projection, the first point is replaced by the initial direction.'''
+    xs, ys, zs = np.array(points, dtype=float).reshape(-1, 3).T
+    thetas = np.arctan2(np.hypot(xs, ys), zs)
+    phis = np.arctan2(ys, xs)
+    if len(points):
+        fx, fy, fz = first_direction
+        thetas[0] = math.atan2(math.hypot(fx, fy), fz)
+        phis[0] = math.atan2(fy, fx)
+    return dict(xy=(xs, ys), yz=(zs, ys), xz=(zs, xs), thetaphi=(math.pi / 2. - thetas, phis))
+
+
+def trajectory_shapes(particles, grey=False):
+    '''returns the shapes of the trajectories of the particles for each projection,
+    as L{GTrajectories<heppy.display.pfobjects.GTrajectories>}:
+    the points of the paths for all particles, and a line
+    of 500 points along the helix of the charged particles.'''
+    shapes = dict(xy=[], yz=[], xz=[], thetaphi=[])
+    linecolor = GREY if grey else 1
+    for ptc in particles:
+        p3 = ptc.p4().Vect()
+        direction = (p3.X(), p3.Y(), p3.Z())
+        is_neutral = abs(ptc.q()) < 0.5
+        points = [(point.X(), point.Y(), point.Z()) for point in ptc.points.values()]
+        if is_neutral:
+            style = dict(option='lp', line_style=2)
+        else:
+            style = dict(option='p')
+            helix = ptc.path
+            max_time = helix.time_at_z(ptc.points.values()[-1].Z())
+            line = [helix.point_at_time(time) for time in np.linspace(0, max_time, 500)]
+            line = [(point.X(), point.Y(), point.Z()) for point in line]
+            line_style = dict(line_color=linecolor, line_width=1)
+            if abs(ptc.pdgid()) in [11, 13]:
+                line_style = dict(line_color=GREY if grey else 5, line_width=3)
+            for projection, (xs, ys) in _projections(line, direction).iteritems():
+                shapes[projection].append(graph(xs, ys, option='l', **line_style))
+        for projection, (xs, ys) in _projections(points, direction).iteritems():
+            shapes[projection].append(graph(xs, ys, line_color=linecolor,
+                                            marker_color=linecolor, **style))
+    return shapes
+
+
+class Scene(object):
+    '''The primitives of an event display, for a set of projections and subscreens.
+
+    The scene is made of plain python objects only, see to_dict.
+    The projections and the ranges of the views are the ones of the
+    L{Display<heppy.display.core.Display>}.
+    '''
+
+    def __init__(self, name, projections=None, subscreens=None):
+        '''@param name: name of the scene, eg 'event_12', used in the output file names
+           @param projections: list of projections, eg ['xy', 'yz', 'xz' ,'ECAL_thetaphi', 'HCAL_thetaphi']
+           @param subscreens: list of names of the subscreens within each projection
+        '''
+        self.name = name
+        if not projections:
+            projections = ['xy', 'yz', 'xz']
+        if not subscreens:
+            subscreens = ['']
+        self.subscreens = list(subscreens)
+        self.views = []
+        for projection in projections:
+            if 'thetaphi' in projection:
+                view = dict(xrange=[-math.pi / 2, math.pi / 2], yrange=[-math.pi, math.pi],
+                            size=[500, 1000])
+            else:
+                view = dict(xrange=[-4, 4], yrange=[-4, 4], size=[600, 600])
+            view.update(projection=projection,
+                        pads=[[] for subscreen in self.subscreens])
+            self.views.append(view)
+
+    def register(self, shapes, layer, sides=None):
+        '''registers shapes in the selected subscreens of every projection.
+        @param shapes: dictionary of the lists of primitives for each projection,
+           eg as returned by cluster_shapes. The key 'thetaphi' is used for all
+           theta-phi projections without a specific entry.
+        @param layer: the primitives of the higher layers are drawn on top
+        @param sides: if None, the shapes are registered in all subscreens,
+           otherwise in the subscreens of the given indices
+        '''
+        if sides is None:
+            sides = range(len(self.subscreens))
+        for view in self.views:
+            projection = view['projection']
+            primitives = shapes.get(projection)
+            if primitives is None and 'thetaphi' in projection:
+                primitives = shapes.get('thetaphi')
+            if not primitives:
+                continue
+            for side in sides:
+                view['pads'][side].extend((layer, primitive) for primitive in primitives)
+
+    def to_dict(self):
+        '''returns the scene as a dictionary of plain python objects,
+        that can be written to JSON.'''
+        views = []
+        for view in self.views:
+            view = dict(view)
+            view['pads'] = [[dict(primitive, layer=layer) for layer, primitive in
+                             sorted(pad, key=lambda item: item[0])]
+                            for pad in view['pads']]
+            views.append(view)
+        return dict(name=self.name, subscreens=self.subscreens, views=views)
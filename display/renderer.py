@@ -0,0 +1,274 @@
+'''Headless rendering of event display scenes.
+
+A L{Scene<heppy.display.primitives.Scene>} is written to a file for each projection,
+in one or several formats:
+ - 'json': the primitives themselves, for external viewers;
+ - 'svg': written in pure python, without ROOT;
+ - any other format, eg 'png' or 'pdf': drawn with ROOT in batch mode
+   and written with TCanvas.SaveAs.
+
+The rendering can be offloaded to a separate process, so that the event loop
+does not wait for the canvases to be drawn and the images to be written::
+
+    renderer = Renderer('display', filetypes=['png', 'json'], offload=True)
+    renderer.submit(scene) # returns immediately
+    ...
+    renderer.close() # waits for all scenes to be written
+'''
+
+import os
+import json
+import multiprocessing
+from xml.sax.saxutils import escape
+
+#: approximate RGB values of the ROOT colors used by the display
+ROOT_COLORS = {
+    0: '#ffffff', 1: '#000000', 2: '#ff0000', 3: '#00ff00', 4: '#0000ff',
+    5: '#ffff00', 6: '#ff00ff', 7: '#00ffff', 17: '#b2b2b2',
+    422: '#ccffff', 590: '#ccccff', 622: '#ffcccc',
+}
+
+def file_name(outdir, scene, view, filetype):
+    '''returns the name of the file of a view of a scene'''
+    return '{outdir}/{name}_{projection}.{filetype}'.format(
+        outdir=outdir, name=scene['name'], projection=view['projection'],
+        filetype=filetype)
+
+
+def render(scene, outdir, filetypes=('png',)):
+    '''writes the scene to outdir, one file per projection and file type.
+    @param scene: a Scene, or the dictionary returned by Scene.to_dict
+    @param outdir: output directory, created if needed
+    @param filetypes: list of file types, eg ['png', 'svg', 'json']
+    @return: the list of the files written
+    '''
+    if hasattr(scene, 'to_dict'):
+        scene = scene.to_dict()
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+    written = []
+    for filetype in filetypes:
+        if filetype == 'json':
+            written.extend(write_json(scene, outdir))
+        elif filetype == 'svg':
+            written.extend(write_svg(scene, outdir))
+        else:
+            written.extend(write_root(scene, outdir, filetype))
+    return written
+
+
+def write_json(scene, outdir):
+    written = []
+    for view in scene['views']:
+        fname = file_name(outdir, scene, view, 'json')
+        with open(fname, 'w') as out:
+            json.dump(dict(name=scene['name'], subscreens=scene['subscreens'], view=view), out)
+        written.append(fname)
+    return written
+
+
+def _color(index):
+    return ROOT_COLORS.get(index, '#808080')
+
+
+def _fill(primitive):
+    style = primitive['fill_style']
+    if style == 0:
+        return 'fill="none"'
+    opacity = 1. if style == 1001 else 0.3
+    return 'fill="{}" fill-opacity="{}"'.format(_color(primitive['fill_color']), opacity)
+
+
+def _svg_elements(primitive, tx, ty, sx, sy):
+    '''returns the svg elements of a primitive.
+    tx and ty transform the coordinates to pixels, sx and sy the lengths.'''
+    shape = primitive['shape']
+    stroke = 'stroke="{}"'.format(_color(primitive['line_color']))
+    if shape == 'ellipse':
+        return ['<ellipse cx="{:.2f}" cy="{:.2f}" rx="{:.2f}" ry="{:.2f}" {} {}/>'.format(
+            tx(primitive['x']), ty(primitive['y']),
+            primitive['r1'] * sx, primitive['r2'] * sy, stroke, _fill(primitive))]
+    elif shape == 'box':
+        x1, x2 = tx(primitive['x1']), tx(primitive['x2'])
+        y1, y2 = ty(primitive['y2']), ty(primitive['y1'])
+        return ['<rect x="{:.2f}" y="{:.2f}" width="{:.2f}" height="{:.2f}" {} {}/>'.format(
+            x1, y1, x2 - x1, y2 - y1, stroke, _fill(primitive))]
+    elif shape == 'graph':
+        points = [(tx(x), ty(y)) for x, y in zip(primitive['x'], primitive['y'])]
+        elements = []
+        if 'l' in primitive['option'] and len(points) > 1:
+            dash = ' stroke-dasharray="4,3"' if primitive['line_style'] == 2 else ''
+            elements.append(
+                '<polyline points="{}" fill="none" {} stroke-width="{}"{}/>'.format(
+                    ' '.join('{:.2f},{:.2f}'.format(x, y) for x, y in points),
+                    stroke, primitive['line_width'], dash))
+        if 'p' in primitive['option']:
+            size = 4. * primitive['marker_size']
+            color = _color(primitive['marker_color'])
+            elements.extend(
+                '<path d="M{0:.2f} {1:.2f}h{2:.2f}M{3:.2f} {4:.2f}v{2:.2f}" stroke="{5}"/>'.format(
+                    x - size, y, 2 * size, x, y - size, color) for x, y in points)
+        return elements
+    raise ValueError('unknown shape ' + shape)
+
+
+def write_svg(scene, outdir):
+    written = []
+    for view in scene['views']:
+        dx, dy = view['size']
+        (xmin, xmax), (ymin, ymax) = view['xrange'], view['yrange']
+        sx, sy = dx / float(xmax - xmin), dy / float(ymax - ymin)
+        lines = ['<svg xmlns="http://www.w3.org/2000/svg" width="{}" height="{}">'.format(
+            dx * len(view['pads']), dy)]
+        for side, pad in enumerate(view['pads']):
+            x0 = side * dx
+            tx = lambda x: x0 + (x - xmin) * sx
+            ty = lambda y: (ymax - y) * sy
+            title = '{}: {}'.format(view['projection'], scene['subscreens'][side])
+            lines.append('<clipPath id="pad{0}"><rect x="{1}" y="0" width="{2}" height="{3}"/>'
+                         '</clipPath>'.format(side, x0, dx, dy))
+            lines.append('<g clip-path="url(#pad{})">'.format(side))
+            lines.append('<rect x="{}" y="0" width="{}" height="{}" fill="white" '
+                         'stroke="black"/>'.format(x0, dx, dy))
+            for primitive in pad:
+                lines.extend(_svg_elements(primitive, tx, ty, sx, sy))
+            lines.append('<text x="{}" y="15" font-size="12">{}</text>'.format(
+                x0 + 5, escape(title)))
+            lines.append('</g>')
+        lines.append('</svg>')
+        fname = file_name(outdir, scene, view, 'svg')
+        with open(fname, 'w') as out:
+            out.write('\n'.join(lines))
+        written.append(fname)
+    return written
+
+
+def write_root(scene, outdir, filetype):
+    '''draws the scene with ROOT in batch mode, and writes it with TCanvas.SaveAs.
+    The previous batch mode of ROOT is restored, so that the interactive
+    display of the same process is not affected.'''
+    import ROOT
+    batch = ROOT.gROOT.IsBatch()
+    ROOT.gROOT.SetBatch(True)
+    try:
+        return _write_root(scene, outdir, filetype)
+    finally:
+        ROOT.gROOT.SetBatch(batch)
+
+
+def _write_root(scene, outdir, filetype):
+    import ROOT
+    from array import array
+    written = []
+    for view in scene['views']:
+        dx, dy = view['size']
+        npads = len(view['pads'])
+        name = '_'.join([scene['name'], view['projection']])
+        canvas = ROOT.TCanvas(name, name, npads * dx, dy)
+        canvas.Divide(npads, 1)
+        keep = []
+        for side, pad in enumerate(view['pads']):
+            canvas.cd(side + 1)
+            title = '{}: {}'.format(view['projection'], scene['subscreens'][side])
+            ROOT.TH1.AddDirectory(False)
+            hist = ROOT.TH2F('_'.join([name, str(side)]), title,
+                             100, view['xrange'][0], view['xrange'][1],
+                             100, view['yrange'][0], view['yrange'][1])
+            ROOT.TH1.AddDirectory(True)
+            hist.SetStats(False)
+            hist.Draw()
+            keep.append(hist)
+            for primitive in pad:
+                shape = primitive['shape']
+                if shape == 'ellipse':
+                    obj = ROOT.TEllipse(primitive['x'], primitive['y'],
+                                        primitive['r1'], primitive['r2'])
+                    option = 'same'
+                elif shape == 'box':
+                    obj = ROOT.TBox(primitive['x1'], primitive['y1'],
+                                    primitive['x2'], primitive['y2'])
+                    option = 'samel'
+                elif shape == 'graph':
+                    if not primitive['x']:
+                        continue
+                    obj = ROOT.TGraph(len(primitive['x']), array('d', primitive['x']),
+                                      array('d', primitive['y']))
+                    obj.SetLineStyle(primitive['line_style'])
+                    obj.SetLineWidth(primitive['line_width'])
+                    obj.SetMarkerColor(primitive['marker_color'])
+                    obj.SetMarkerStyle(primitive['marker_style'])
+                    obj.SetMarkerSize(primitive['marker_size'])
+                    option = primitive['option'] + 'same'
+                else:
+                    raise ValueError('unknown shape ' + shape)
+                obj.SetLineColor(primitive['line_color'])
+                if shape != 'graph':
+                    obj.SetFillColor(primitive['fill_color'])
+                    obj.SetFillStyle(primitive['fill_style'])
+                obj.Draw(option)
+                keep.append(obj)
+        canvas.Update()
+        fname = file_name(outdir, scene, view, filetype)
+        canvas.SaveAs(fname)
+        written.append(fname)
+    return written
+
+
+def _serve(queue, outdir, filetypes):
+    '''renders the scenes received through the queue, until None is received'''
+    while True:
+        scene = queue.get()
+        if scene is None:
+            break
+        render(scene, outdir, filetypes)
+
+
+class Renderer(object):
+    '''Renders scenes, in a separate process if offload is True.
+
+    The scenes are serialized with Scene.to_dict when they are submitted.
+    In the separate process, ROOT is only used for the formats
+    other than 'json' and 'svg', and always in batch mode.
+    '''
+
+    def __init__(self, outdir, filetypes=('png',), offload=True):
+        '''@param outdir: output directory
+           @param filetypes: list of file types, eg ['png', 'svg', 'json']
+           @param offload: if True, the scenes are rendered in a separate process,
+             started when the first scene is submitted
+        '''
+        self.outdir = outdir
+        self.filetypes = list(filetypes)
+        self.offload = offload
+        self.nsubmitted = 0
+        self._queue = None
+        self._process = None
+
+    def submit(self, scene):
+        '''renders the scene, or sends it to the renderer process if offload is True'''
+        scene = scene.to_dict()
+        self.nsubmitted += 1
+        if not self.offload:
+            render(scene, self.outdir, self.filetypes)
+            return
+        if self._process is None:
+            self._queue = multiprocessing.Queue()
+            self._process = multiprocessing.Process(
+                target=_serve, args=(self._queue, self.outdir, self.filetypes))
+            self._process.start()
+        self._queue.put(scene)
+
+    def close(self):
+        '''waits for the renderer process to write all submitted scenes.
+        @raise RuntimeError: if the renderer process failed
+        '''
+        if self._process is None:
+            return
+        self._queue.put(None)
+        self._process.join()
+        exitcode = self._process.exitcode
+        self._process = None
+        self._queue = None
+        if exitcode != 0:
+            raise RuntimeError('display renderer process failed with exit code {}'.format(
+                exitcode))
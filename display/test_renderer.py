@@ -0,0 +1,84 @@
+import unittest
+import os
+import json
+import math
+import shutil
+import tempfile
+import logging
+from ROOT import TLorentzVector, TVector3, gROOT
+from heppy.papas.detectors.CMS import CMS
+from heppy.papas.simulator import Simulator
+from heppy.papas.pfobjects import Particle
+from heppy.papas.graphtools.history import History
+from heppy.display.primitives import Scene, detector_shapes, cluster_shapes, trajectory_shapes
+from heppy.display.renderer import Renderer, render
+
+
+def make_scene(name):
+    detector = CMS()
+    ptcs = []
+    for i, (pdgid, charge) in enumerate([(211, 1), (-211, -1), (22, 0), (130, 0), (11, -1)]):
+        tlv = TLorentzVector()
+        tlv.SetPtEtaPhiM(10., 0.4 * i - 0.7, i, 0.139)
+        ptcs.append(Particle(tlv, TVector3(0, 0, 0), charge, pdgid, i))
+    simulator = Simulator(detector, logging.getLogger('test_renderer'))
+    simulator.simulate(ptcs, History())
+    scene = Scene(name, ['xy', 'yz', 'ECAL_thetaphi'], ['simulated', 'reconstructed'])
+    scene.register(detector_shapes(detector), layer=0)
+    scene.register(trajectory_shapes(simulator.ptcs), layer=2, sides=[0])
+    scene.register(trajectory_shapes(simulator.ptcs, grey=True), layer=1, sides=[1])
+    scene.register(cluster_shapes(simulator.smeared_ecals.values()), layer=2, sides=[0])
+    return scene
+
+
+class TestRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_scene(self):
+        scene = make_scene('event_0').to_dict()
+        self.assertEqual(scene, json.loads(json.dumps(scene)))
+        xy, yz, thetaphi = scene['views']
+        self.assertEqual(xy['projection'], 'xy')
+        self.assertEqual(thetaphi['xrange'], [-math.pi / 2, math.pi / 2])
+        simulated, reconstructed = xy['pads']
+        layers = [primitive['layer'] for primitive in simulated]
+        self.assertEqual(layers, sorted(layers))
+        shapes = set(primitive['shape'] for primitive in simulated)
+        self.assertEqual(shapes, set(['ellipse', 'graph']))
+        self.assertTrue(all(primitive['line_color'] == 17 for primitive in reconstructed
+                            if primitive['layer'] == 1))
+        # the detector is not drawn in theta phi, the ecal clusters are
+        self.assertFalse(any(primitive['layer'] == 0 for primitive in thetaphi['pads'][0]))
+        self.assertTrue(any(primitive['shape'] == 'ellipse' for primitive in thetaphi['pads'][0]))
+        self.assertTrue(any(primitive['shape'] == 'box' for primitive in yz['pads'][1]))
+
+    def test_render(self):
+        written = render(make_scene('event_1'), self.outdir, ['svg', 'json'])
+        self.assertEqual(len(written), 6)
+        with open(os.path.join(self.outdir, 'event_1_yz.json')) as infile:
+            self.assertEqual(json.load(infile)['view']['projection'], 'yz')
+        with open(os.path.join(self.outdir, 'event_1_xy.svg')) as infile:
+            self.assertTrue(infile.read().startswith('<svg'))
+
+    def test_root_batch(self):
+        '''rendering with ROOT does not change the batch mode of the process'''
+        batch = gROOT.IsBatch()
+        render(make_scene('event_2'), self.outdir, ['png'])
+        self.assertEqual(gROOT.IsBatch(), batch)
+
+    def test_offload(self):
+        renderer = Renderer(self.outdir, ['json'], offload=True)
+        for i in range(3):
+            renderer.submit(make_scene('event_{}'.format(i)))
+        renderer.close()
+        self.assertEqual(renderer.nsubmitted, 3)
+        self.assertEqual(len(os.listdir(self.outdir)), 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
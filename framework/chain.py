@@ -108,4 +108,12 @@ class Chain( object ):
         self.chain.GetEntry(index)
         return self.chain
 
+    def file_and_entry(self, index):
+        """
+        Returns the name of the file containing the event at position index,
+        and the position of the event in this file.
+        """
+        entry = self.chain.LoadTree(index)
+        return self.files[self.chain.GetTreeNumber()], entry
+
 
@@ -37,7 +37,8 @@ def printComps(comps, details=False):
 
 def split(comps):
     '''takes a list of components, split the ones that need to be splitted, 
-    and return a new (bigger) list'''
+    and return a new (bigger) list.
+    The name of the component is kept in the original_name attribute of its chunks.'''
 
     def chunks(l, n):
         '''split list l in n chunks. The last one can be smaller.'''
@@ -51,6 +52,7 @@ def split(comps):
                 newComp = copy.deepcopy(comp)
                 newComp.files = [chunk[0]]
                 newComp.fineSplit = ( chunk[1], comp.fineSplitFactor )
+                newComp.original_name = comp.name
                 newComp.name = '{name}_Chunk{index}'.format(name=newComp.name,
                                                        index=ichunk)
                 splitComps.append( newComp )
@@ -62,6 +64,7 @@ def split(comps):
             for ichunk, chunk in enumerate(chunks(comp.files, chunkSize)):
                 newComp = copy.deepcopy(comp)
                 newComp.files = chunk
+                newComp.original_name = comp.name
                 newComp.name = '{name}_Chunk{index}'.format(name=newComp.name,
                                                             index=ichunk)
                 splitComps.append( newComp )
@@ -17,6 +17,7 @@ from event import Event
 
 from heppy.framework.exceptions import UserStop
 from heppy.statistics.counter import Counter
+import heppy.statistics.rrandom as rrandom
 
 
 class Setup(object):
@@ -267,6 +268,8 @@ Make sure that the configuration object is of class cfg.Analyzer.
                 try:
                     self.event = Event(iEv, event, self.setup)
                     self.iEvent = iEv
+                    # iEv restarts at 1 in each job, ii is the index in the input
+                    self.iEntry = ii
                     self._run_analyzers_on_event()
                     self.nEvProcessed += 1
                     if iEv<self.nPrint:
@@ -332,12 +335,35 @@ possibly skipping a number of events at the beginning.
             raise TypeError(msg)
         self.event = Event(iEv, self.events[iEv], self.setup)            
         self.iEvent = iEv
+        self.iEntry = iEv
         return self._run_analyzers_on_event()
 
+    def _stream_key(self, entry):
+        '''Returns the component name and the event identifier used to select
+        the random number streams of the event at position entry in the input,
+        see heppy.statistics.random_numpy.
+
+        The event is identified by its input file and its position in this file,
+        and the component by its name before splitting (see config.split),
+        so that the random numbers do not depend on the way the component is split.
+        This requires an events backend with a file_and_entry method,
+        like heppy.framework.chain.Chain, or components with a single file.
+        Otherwise, the event is identified by the files of the component,
+        and the random numbers depend on the splitting.
+        '''
+        name = getattr(self.cfg_comp, 'original_name', self.cfg_comp.name)
+        if hasattr(self.events, 'file_and_entry'):
+            return name, self.events.file_and_entry(entry)
+        files = self.cfg_comp.files
+        if len(files) == 1:
+            return name, (files[0], entry)
+        return name, (tuple(files), entry)
+
     def _run_analyzers_on_event(self):
         '''Run all analysers on the current event, self.event. 
         Returns a tuple (success?, last_analyzer_name).
         '''
+        stream = self._stream_key(self.iEntry)
         for i,analyzer in enumerate(self._analyzers):
             if not analyzer.beginLoopCalled:
                 analyzer.beginLoop(self.setup)
@@ -348,6 +374,9 @@ possibly skipping a number of events at the beginning.
                     print  "Mem Jump detected before analyzer %s at event %s. RSS(before,after,difference) %s %s %s "%( analyzer.name, iEv, self.memLast, memNow, memNow-self.memLast)
                 self.memLast=memNow
             ret = False
+            # each analyzer gets its own random numbers for each event,
+            # see heppy.statistics.random_numpy
+            rrandom.set_stream(stream[0], analyzer.name, stream[1])
             try:
                 ret = analyzer.process( self.event )
                 ret = True if ret is None else ret
@@ -1,5 +1,6 @@
 '''Papas history helper'''
 from heppy.papas.graphtools.DAG import BreadthFirstSearchIterative, DAGFloodFill
+from heppy.papas.graphtools.history import History
 from heppy.papas.data.identifier import Identifier
 
 class HistoryHelper(object):
@@ -29,7 +30,17 @@ class HistoryHelper(object):
        
        #see also papasevent documentation for details of the labelling of collections
        #  eg 'pr' is a collections of particles that have been reconstructed
-        
+       
+       The linked ids are computed once for each uid and direction, and kept in a cache,
+       so that repeated queries do not traverse the history again. 
+       Use papasevent.get_history_helper() to share the same HistoryHelper,
+       and its cache, between all users of a papasevent.
+       
+       The history is expected to be extended only by adding new nodes as children
+       of existing nodes (as done by the simulator, the block builders and the
+       reconstruction). When the number of nodes changes, only the "children" and 
+       "undirected" caches are cleared, as the parents of existing nodes are unchanged.
+       If the history is modified in another way, call invalidate().
     '''    
     def __init__(self, papasevent):
         ''' arguments
@@ -37,6 +48,23 @@ class HistoryHelper(object):
         '''
         self.history = papasevent.history
         self.papasevent = papasevent
+        self.invalidate()
+        
+    def invalidate(self):
+        '''clears the caches of linked ids.'''
+        self._linked_ids = dict((direction, dict())
+                                for direction in ["parents", "children", "undirected"])
+        self._linked_typed_ids = dict()
+        self._history_size = len(self.history)
+        
+    def _check_history(self):
+        '''clears the caches that may be affected by new nodes in the history'''
+        if len(self.history) != self._history_size:
+            self._linked_ids["children"] = dict()
+            self._linked_ids["undirected"] = dict()
+            self._linked_typed_ids = dict( (key, ids) for key, ids in self._linked_typed_ids.iteritems()
+                                           if key[1] == "parents" )
+            self._history_size = len(self.history)
         
         
     def event_ids(self): 
@@ -51,8 +79,41 @@ class HistoryHelper(object):
         @param uid: unique identifier
         @param direction: parents/children/undirected
         '''
-        BFS = BreadthFirstSearchIterative(self.history[uid], direction)
-        return [v.get_value() for v in BFS.result] 
+        return list(self._get_linked_ids(uid, direction))
+    
+    def _get_linked_ids(self, uid, direction):
+        '''same as get_linked_ids, returning the cached list'''
+        self._check_history()
+        cache = self._linked_ids[direction]
+        ids = cache.get(uid, None)
+        if ids is None:
+            if isinstance(self.history, History):
+                ids = self.history.linked_ids(uid, direction)
+            else:
+                BFS = BreadthFirstSearchIterative(self.history[uid], direction)
+                ids = [v.get_value() for v in BFS.result]
+            cache[uid] = ids
+        return ids
+    
+    def get_linked_typed_ids(self, uid, type_and_subtype, direction="undirected"):
+        '''returns the ids linked to a given uid that have the required type_and_subtype
+        eg the simulated particles of a reconstructed particle:
+           sim_ids = get_linked_typed_ids(rec_particle.uniqueid, 'ps', 'parents')
+        @param uid: unique identifier
+        @param type_and_subtype: a two letter type and subtype eg 'ps' for simulated particles
+        @param direction: parents/children/undirected
+        '''
+        return list(self._get_linked_typed_ids(uid, type_and_subtype, direction))
+    
+    def _get_linked_typed_ids(self, uid, type_and_subtype, direction):
+        '''same as get_linked_typed_ids, returning the cached list'''
+        ids = self._get_linked_ids(uid, direction)
+        key = (uid, direction, type_and_subtype)
+        typed_ids = self._linked_typed_ids.get(key, None)
+        if typed_ids is None:
+            typed_ids = self.filter_ids(ids, type_and_subtype)
+            self._linked_typed_ids[key] = typed_ids
+        return typed_ids
 
     def filter_ids(self, ids, type_and_subtype):
         ''' returns a filtered subset of ids which have a type_and_subtype that matchs the type_and_subtype argument
@@ -60,8 +121,7 @@ class HistoryHelper(object):
             @param ids: a list of ids
             @param type_and_subtype: a two letter type and subtype eg 'es' for smeared ecal
         '''
-        return [uid for uid in ids
-                if Identifier.type_and_subtype(uid) == type_and_subtype]
+        return Identifier.filter_ids(ids, type_and_subtype)
     
     def id_from_pretty(self, pretty):
         ''' Searches to find the true id given a pretty id string
@@ -98,8 +158,9 @@ class HistoryHelper(object):
         @param direction = says what type of linkage to use "undirected"/"parents"/"children"
     
         '''
-        ids = self.get_linked_ids(uid, direction)
-        return self.get_collection(ids, type_and_subtype)   
+        ids = self._get_linked_typed_ids(uid, type_and_subtype, direction)
+        maindict = self.papasevent.get_collection(type_and_subtype)
+        return dict( (uid, maindict[uid]) for uid in ids )
     
     def summary_string_ids(self, ids, type_and_subtypes = ['pg', 'tt', 'ts', 'et', 'es', 'em', 'ht', 'hs', 'hm', 'pr'], 
                            labels = ["gen_particles","true_tracks","smeared_tracks", "true_ecals", "smeared_ecals","merged_ecals","true_hcals", 
@@ -149,10 +210,13 @@ class HistoryHelper(object):
         ''' Divide the event into connected subgroups 
             each subgroup is a list of ids
         '''        
-        self.subgraphs = []
-        for subgraphlist in DAGFloodFill(self.history).subgraphs:
-            element_ids = [node.get_value() for node in subgraphlist]            
-            self.subgraphs.append(sorted(element_ids, reverse = True)) 
+        if isinstance(self.history, History):
+            self.subgraphs = self.history.subgraphs()
+        else:
+            self.subgraphs = []
+            for subgraphlist in DAGFloodFill(self.history).subgraphs:
+                element_ids = [node.get_value() for node in subgraphlist]            
+                self.subgraphs.append(sorted(element_ids, reverse = True)) 
         self.subgraphs.sort(key = len, reverse = True) #biggest to smallest group
         return self.subgraphs
     
@@ -2,6 +2,7 @@
 '''Unique Identifer'''
 import struct
 from itertools import count
+import numpy as np
 from heppy.utils.pdebug import pdebugger
 
 class Identifier(long):
@@ -12,12 +13,15 @@ class Identifier(long):
 
     The Identifier class consists of a set of static methods that can be used
     to create and to dissect identifiers.
+    The methods make_ids, get_types, get_subtypes, get_values and get_indices
+    do the same for arrays of identifiers at once, with numpy.
 
     The identifier is 64 bits wide and stores info as follows
-    from left: bits 64 to 61 = PFOBJECTTYPE enumeration eg ECAL, HCAL, PARTICLE (max value = 7)
-               bits 60 to 53 = subtype - a single char eg 'g'
-               bits 52 to 20 = encoded float value eg energy
-               bits 21 to 1 = index number of the collection to which this obejct will belong (max value = 2097152 -1)
+    from left: bits 64 to 62 = PFOBJECTTYPE enumeration eg ECAL, HCAL, PARTICLE (max value = 7)
+               bits 61 to 55 = subtype - a single ascii char eg 'g'
+               bits 54 to 24 = encoded positive float value eg energy
+                               (float32 without the sign bit)
+               bits 23 to 1 = index number of the collection to which this obejct will belong (max value = 8388608 -1)
 
     Note that sorting on id will result in sorting by:
     type
@@ -26,6 +30,13 @@ class Identifier(long):
     index
         '''    
 
+    TYPESHIFT = 61
+    SUBTYPESHIFT = 54
+    VALUESHIFT = 23
+    TYPEMASK = 0b111
+    SUBTYPEMASK = 0b1111111
+    VALUEMASK = 0x7fffffff
+    INDEXMASK = (1 << VALUESHIFT) - 1
 
     class PFOBJECTTYPE:
         NONE = 0
@@ -44,47 +55,54 @@ class Identifier(long):
         @param value: a float reprenting energy or momentum etc
         '''
         assert(value >= 0) #actually I would like it to work with negative numbers but need to change float to bit conversions
-        #shift all the parts and join together	
-        typeshift = type << 61
-        valueshift = Identifier._float_to_bits(value) << 21
-        subtypeshift = ord(subtype.lower()) << 53
-        uid = subtypeshift | valueshift | typeshift | index
-        #verify		
-        assert (Identifier.get_index(uid) == index )
-        if value != 0:
-            assert(abs(Identifier.get_value(uid) - value) < abs(value) * 10 ** -6)
-        assert (Identifier.get_type(uid) == type)
-        assert (Identifier.get_subtype(uid) == subtype)
-        if index >= 2**(21 -1):
+        if index > cls.INDEXMASK:
             raise ValueError('identifer index has exceeded maximum value allowed')
-        return uid
+        subtype = ord(subtype.lower())
+        if subtype > cls.SUBTYPEMASK:
+            raise ValueError('identifier subtype must be an ascii character')
+        #shift all the parts and join together
+        return (type << cls.TYPESHIFT) | (subtype << cls.SUBTYPESHIFT) | \
+               (Identifier._float_to_bits(value) << cls.VALUESHIFT) | index
+
+    @classmethod
+    def make_ids(cls, type, indices, subtype='u', values=0.):
+        '''Creates an array of unique ids, see make_id
+        @param type: defined by enumeration PFOBJECTTYPE eg ECALCLUSTER
+        @param indices: array of indices into the collection of type and subtype
+        @param subtype: single letter subtype code eg 'm' for merged
+        @param values: array of floats, or a single float, eg energies
+        @return: numpy array of uint64. Use tolist() to get python longs,
+          identical to the ones returned by make_id
+        '''
+        indices = np.asarray(indices, dtype=np.uint64)
+        values = np.asarray(values, dtype=np.float32)
+        assert(np.all(values >= 0))
+        if len(indices) and indices.max() > cls.INDEXMASK:
+            raise ValueError('identifer index has exceeded maximum value allowed')
+        subtype = ord(subtype.lower())
+        if subtype > cls.SUBTYPEMASK:
+            raise ValueError('identifier subtype must be an ascii character')
+        bits = values.view(np.uint32).astype(np.uint64) & np.uint64(cls.VALUEMASK)
+        head = np.uint64((type << cls.TYPESHIFT) | (subtype << cls.SUBTYPESHIFT))
+        return head | (bits << np.uint64(cls.VALUESHIFT)) | indices
 
     @staticmethod      
     def get_index( ident):
         '''Takes an identifier and returns the unique counter component of it
         @param: unique identifier'''
-        return ident & 0b111111111111111111111
+        return ident & Identifier.INDEXMASK
     
     @staticmethod      
     def get_unique_id( ident):
         '''The unique id combines the index, type and subtype to form a shorter unique identifier (without the value)
         Its not strictly needed for Python at the moment '''
-        bitshift = 21  +  61 - 53
-        typeshift = Identifier.get_type(ident) << 29
-        subtypeshift = ord(Identifier.get_subtype(ident)) << 21
-        uniqueid = subtypeshift |  typeshift | Identifier.get_index(ident) 
-        #verify		
-        assert (uniqueid >> bitshift & 0b111 == Identifier.get_type(ident) )
-        assert (uniqueid >> 61 -53  & 0b11111111 == Identifier.get_subtype(ident) )
-        assert (uniqueid >> 61 -53  & 0b11111111 == Identifier.get_subtype(ident) )
-        assert ( (ident >> 0b111111111111111111111) == Identifier.get_index(ident))
-        return uniqueid
+        return ident >> Identifier.SUBTYPESHIFT << Identifier.VALUESHIFT | Identifier.get_index(ident)
     
     @staticmethod  
     def get_type ( ident):
         '''returns the PFOBJECTTYPE type of the identifier eg ECALCLUSTER
         @param ident: unique identifier'''        
-        return ident >> 61 & 0b111
+        return ident >> Identifier.TYPESHIFT & Identifier.TYPEMASK
 
     @staticmethod  
     def get_subtype ( ident):
@@ -101,15 +119,67 @@ class Identifier(long):
                  smeared (tracks ecals hcals)
                  split (blocks)
         '''
-        return chr( (ident >> 53 & 0b11111111))
+        return chr(ident >> Identifier.SUBTYPESHIFT & Identifier.SUBTYPEMASK)
 
     @staticmethod  
     def get_value (ident):
         '''returns the float value encoded in the identifier 
         @param ident: unique identifier'''         
-        bitvalue = ident >> 21 & 0b11111111111111111111111111111111
+        bitvalue = ident >> Identifier.VALUESHIFT & Identifier.VALUEMASK
         return Identifier._bits_to_float(bitvalue)
 
+    @staticmethod
+    def _as_array(idents):
+        return np.asarray(idents, dtype=np.uint64)
+
+    @staticmethod
+    def get_types(idents):
+        '''returns the array of the PFOBJECTTYPE types of an array of identifiers'''
+        return (Identifier._as_array(idents) >> np.uint64(Identifier.TYPESHIFT)).astype(int)
+
+    @staticmethod
+    def get_subtypes(idents):
+        '''returns the array of the subtypes of an array of identifiers,
+        as single characters'''
+        codes = Identifier._as_array(idents) >> np.uint64(Identifier.SUBTYPESHIFT) & \
+                np.uint64(Identifier.SUBTYPEMASK)
+        return codes.astype(np.uint8).view('S1')
+
+    @staticmethod
+    def get_values(idents):
+        '''returns the array of the float values encoded in an array of identifiers'''
+        bits = Identifier._as_array(idents) >> np.uint64(Identifier.VALUESHIFT) & \
+               np.uint64(Identifier.VALUEMASK)
+        return bits.astype(np.uint32).view(np.float32).astype(float)
+
+    @staticmethod
+    def get_indices(idents):
+        '''returns the array of the indices of an array of identifiers'''
+        return (Identifier._as_array(idents) & np.uint64(Identifier.INDEXMASK)).astype(int)
+
+    @staticmethod
+    def filter_ids(idents, type_and_subtype):
+        '''returns the list of the identifiers that have the given type_and_subtype
+        eg Identifier.filter_ids(ids, 'es') for the smeared ecals.
+        The ids are selected in bulk using their type and subtype bits.
+        @param idents: list of identifiers
+        @param type_and_subtype: two letter type and subtype eg 'es'
+        '''
+        if len(idents) < 16:
+            # not worth the conversion to a numpy array
+            return [ident for ident in idents
+                    if Identifier.type_and_subtype(ident) == type_and_subtype]
+        # several types have the same letter, eg '.', and a letter may be unknown
+        types = [type for type, letter in enumerate(Identifier._type_codes)
+                 if letter == type_and_subtype[:1]]
+        if not types or len(type_and_subtype) != 2:
+            return []
+        codes = [(type << Identifier.TYPESHIFT - Identifier.SUBTYPESHIFT) | ord(type_and_subtype[1])
+                 for type in types]
+        selected = np.in1d(Identifier._as_array(idents) >> np.uint64(Identifier.SUBTYPESHIFT),
+                           np.array(codes, dtype=np.uint64))
+        return [idents[i] for i in np.flatnonzero(selected)]
+
     @staticmethod  
     def is_ecal ( ident):
         '''boolean test of whether it is an ecal
@@ -145,8 +215,8 @@ class Identifier(long):
     def type_letter(ident): #character/letter for this type
         '''returns a single letter representation of the PFOBJECTTYPE type eg 'p' for particle
         @param ident: unique identifier'''     
-        typelist=".ehtpb..." #the enum value (0 to 8) will index into this and return E is it is ECAL etc
-        return typelist[Identifier.get_type(ident)]    
+        #the enum value (0 to 7) will index into Identifier._type_codes and return E is it is ECAL etc
+        return Identifier._type_codes[Identifier.get_type(ident)]    
 
     @staticmethod
     def type_and_subtype(ident):
@@ -162,19 +232,25 @@ class Identifier(long):
         '''          
         return  Identifier.type_and_subtype(ident) + str(Identifier.get_index(ident))
 
+    _type_codes = ".ehtpb.."
+
+    _float32 = struct.Struct('>f')
+    _uint32 = struct.Struct('>L')
+
     @staticmethod
     def _float_to_bits (floatvalue):  #standard float packing
-        '''takes a float and returns a bit representation
+        '''takes a positive float and returns its 31 bit representation
+        (the sign bit is dropped, so that -0. gives 0)
         @param floatvalue: float'''
-        s = struct.pack('>f', floatvalue)
-        return struct.unpack('>l', s)[0]  # 32bit representation
+        s = Identifier._float32.pack(floatvalue)
+        return Identifier._uint32.unpack(s)[0] & Identifier.VALUEMASK
 
     @staticmethod
     def _bits_to_float (bitvalue):
         '''takes a bit vlaue and returns a float representation
         @param bitvalue: bitvalue'''
-        s = struct.pack('>l', bitvalue)
-        return struct.unpack('>f', s)[0]	
+        s = Identifier._uint32.pack(bitvalue)
+        return Identifier._float32.unpack(s)[0]
     
     @classmethod
     def reset(cls):
@@ -1,4 +1,6 @@
 from heppy.papas.data.identifier import Identifier
+from heppy.papas.data.historyhelper import HistoryHelper
+from heppy.papas.graphtools.history import History
 from heppy.framework.event import Event
 
 
@@ -44,7 +46,8 @@ class PapasEvent(Event):
         super(PapasEvent, self).__init__(iEv)
         Identifier.reset()
         self.collections = dict()
-        self.history = dict()    
+        self.history = History()
+        self._history_helper = None
         
     def add_collection(self, collection):
         '''Add a new collection into the PapasEvent. The collection should contain only one object type
@@ -76,3 +79,12 @@ class PapasEvent(Event):
         return None
 
     
+
+    def get_history_helper(self):
+        '''returns the HistoryHelper of this event, created at the first call.
+        Sharing the same HistoryHelper allows to reuse the linked ids that it caches.
+        '''
+        if self._history_helper is None or \
+           self._history_helper.history is not self.history:
+            self._history_helper = HistoryHelper(self)
+        return self._history_helper
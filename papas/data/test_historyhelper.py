@@ -67,6 +67,38 @@ class TestHistoryHelper(unittest.TestCase):
         self.assertTrue(hhelper.get_linked_collection( hhelper.id_from_pretty('et0'), 'ts').keys() == [hhelper.id_from_pretty('ts0')])
         self.assertRaises(KeyError, hhelper.get_linked_collection, 0, 'ts')
         self.assertTrue(len(hhelper.get_linked_collection( hhelper.id_from_pretty('et0'), 'no')) == 0)
+
+    def test_cache(self):
+        papasevent = PapasEvent(0)
+        history = papasevent.history
+        tracks = dict()
+        ecals = dict()
+        uidt = Identifier.make_id(Identifier.PFOBJECTTYPE.TRACK, 0, 's', 4.5)
+        tracks[uidt] = uidt
+        history[uidt] = Node(uidt)
+        uide = Identifier.make_id(Identifier.PFOBJECTTYPE.ECALCLUSTER, 0, 't', 4.5)
+        ecals[uide] = uide
+        history[uide] = Node(uide)
+        history[uidt].add_child(history[uide])
+        papasevent.add_collection(tracks)
+        papasevent.add_collection(ecals)
+        hhelper = papasevent.get_history_helper()
+        self.assertTrue(papasevent.get_history_helper() is hhelper)
+        self.assertEqual(hhelper.get_linked_typed_ids(uide, 'ts', 'parents'), [uidt])
+        self.assertEqual(hhelper.get_linked_ids(uidt, 'children'), [uidt, uide])
+        # the returned lists can be modified
+        hhelper.get_linked_ids(uidt, 'children').append(0)
+        self.assertEqual(hhelper.get_linked_ids(uidt, 'children'), [uidt, uide])
+        # extending the history
+        uide2 = Identifier.make_id(Identifier.PFOBJECTTYPE.ECALCLUSTER, 1, 'm', 4.5)
+        history[uide2] = Node(uide2)
+        history[uide].add_child(history[uide2])
+        self.assertEqual(hhelper.get_linked_ids(uidt, 'children'), [uidt, uide, uide2])
+        self.assertEqual(hhelper.get_linked_typed_ids(uidt, 'em'), [uide2])
+        self.assertEqual(hhelper.get_linked_typed_ids(uide2, 'ts', 'parents'), [uidt])
+        # a new history leads to a new helper
+        papasevent.history = dict()
+        self.assertFalse(papasevent.get_history_helper() is hhelper)
         
 
 if __name__ == '__main__':
@@ -20,6 +20,52 @@ class TestIdentifier(unittest.TestCase):
         self.assertTrue(Identifier.pretty(ids[3]) == 'ts1')
         self.assertTrue(Identifier.get_value(ids[3]) == 0.5)        
 
+    def test_large_index(self):
+        index = 2**23 - 1
+        uid = Identifier.make_id(Identifier.PFOBJECTTYPE.PARTICLE, index, 'r', 3.5)
+        self.assertEqual(Identifier.get_index(uid), index)
+        self.assertEqual(Identifier.get_value(uid), 3.5)
+        self.assertEqual(Identifier.pretty(uid), 'pr' + str(index))
+        self.assertRaises(ValueError, Identifier.make_id,
+                          Identifier.PFOBJECTTYPE.PARTICLE, index + 1, 'r', 3.5)
+
+    def test_bulk(self):
+        '''bulk operations give the same results as the single ones'''
+        values = [0., 1.23456, 12.782, 2**-30, 1e5]
+        indices = range(len(values))
+        ids = Identifier.make_ids(Identifier.PFOBJECTTYPE.HCALCLUSTER, indices, 'm', values)
+        for uid, index, value in zip(ids.tolist(), indices, values):
+            self.assertEqual(uid, Identifier.make_id(Identifier.PFOBJECTTYPE.HCALCLUSTER,
+                                                     index, 'm', value))
+        self.assertEqual(list(Identifier.get_indices(ids)), indices)
+        self.assertEqual(list(Identifier.get_types(ids)),
+                         [Identifier.PFOBJECTTYPE.HCALCLUSTER] * len(values))
+        self.assertEqual(list(Identifier.get_subtypes(ids)), ['m'] * len(values))
+        for value, expected in zip(Identifier.get_values(ids), values):
+            self.assertAlmostEqual(value, expected, delta=expected * 1e-6)
+        track = Identifier.make_id(Identifier.PFOBJECTTYPE.TRACK, 7, 'm', 1.)
+        mixed = [track] + ids.tolist()
+        self.assertEqual(Identifier.filter_ids(mixed, 'hm'), ids.tolist())
+        self.assertEqual(Identifier.filter_ids(mixed, 'tm'), [track])
+        self.assertEqual(Identifier.filter_ids(mixed, 'ts'), [])
+        many = mixed * 10
+        self.assertEqual(Identifier.filter_ids(many, 'tm'), [track] * 10)
+
+    def test_filter_ids(self):
+        '''the bulk selection, used for 16 ids or more,
+        gives the same results as the selection of the ids one by one'''
+        tracks = Identifier.make_ids(Identifier.PFOBJECTTYPE.TRACK, range(20), 's',
+                                     [1.] * 20).tolist()
+        nones = [Identifier.make_id(Identifier.PFOBJECTTYPE.NONE, i, 's', 1.)
+                 for i in range(20)]
+        for ids in [tracks[:5], tracks, tracks + nones]:
+            for type_and_subtype in ['ts', 'tm', 'no', '.s', 't', '']:
+                expected = [ident for ident in ids
+                            if Identifier.type_and_subtype(ident) == type_and_subtype]
+                self.assertEqual(Identifier.filter_ids(ids, type_and_subtype), expected)
+        self.assertEqual(Identifier.filter_ids(tracks, 'no'), [])
+        self.assertEqual(Identifier.filter_ids(tracks + nones, '.s'), nones)
+
 if __name__ == '__main__':
     unittest.main()
 
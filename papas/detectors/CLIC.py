@@ -3,6 +3,7 @@
 from detector import Detector, DetectorElement
 import material as material
 from geometry import VolumeCylinder
+from response import grid
 import math
 import heppy.statistics.rrandom as random
 
@@ -37,6 +38,9 @@ class ECAL(DetectorElement):
 
     def energy_response(self, energy, eta=0):
         return 1
+
+    def tabulated_functions(self):
+        return {'energy_resolution': (grid(0.1, 1000., 200, log=True), grid(0., 5., 1))}
     
     def cluster_size(self, ptc):
         '''just guessing numbers (from Mogens, as in ILD).'''
@@ -48,7 +52,7 @@ class ECAL(DetectorElement):
 
     def acceptance(self, cluster):
         energy = cluster.energy
-        eta = abs(cluster.position.Eta())
+        eta = abs(cluster.eta())
         if eta < self.eta_junction:
             return energy>self.emin['barrel']
         elif eta < 2.76:  #TODO check this value
@@ -78,6 +82,9 @@ class HCAL(DetectorElement):
 
     def energy_response(self, energy, eta=0):
         return 1.0
+
+    def tabulated_functions(self):
+        return {'energy_resolution': (grid(0.1, 1000., 200, log=True), grid(0., 5., 1))}
     
     def cluster_size(self, ptc):
         '''returns cluster size in the HCAL
@@ -89,7 +96,7 @@ class HCAL(DetectorElement):
 
     def acceptance(self, cluster):
         energy = cluster.energy
-        eta = abs(cluster.position.Eta())
+        eta = abs(cluster.eta())
         if eta < 2.76:  #TODO: check this value
             return energy>1.
         else:
@@ -125,7 +132,7 @@ class Tracker(DetectorElement):
         Acceptance from the CLIC CDF p107, Fig. 5.12 without background.
         The tracker is taken to be efficient up to theta = 80 degrees. 
         '''
-        pt = track.p3().Pt()
+        pt = track.pt()
         theta = abs(track.theta())
         if theta < self.theta_max:
             if pt > 0.4:
@@ -143,7 +150,7 @@ class Tracker(DetectorElement):
         
         CLIC CDR, Table 5.3
         '''
-        pt = track.p3().Pt()
+        pt = track.pt()
         # matching the resmap defined above.
         theta = abs(track.theta()) * 180 / math.pi
         the_a, the_b = None, None
@@ -184,7 +191,7 @@ class CLIC(Detector):
         
         No information, cooking something up.
         '''
-        if track.p3().Mag() > 5 and \
+        if track.p() > 5 and \
            abs(track.theta()) < 80. * math.pi / 180.:
             return random.uniform(0, 1) < 0.95
         else:
@@ -203,7 +210,7 @@ class CLIC(Detector):
         
         The CLIC CDR gives 99% for E > 7.5GeV and polar angle > 10 degrees
         '''
-        return track.p3().Mag() > 7.5 and \
+        return track.p() > 7.5 and \
                abs(track.theta()) < 80. * math.pi / 180.
             
     def muon_resolution(self, ptc):
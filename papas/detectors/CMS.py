@@ -1,9 +1,13 @@
 from detector import Detector, DetectorElement
 import material as material
 from geometry import VolumeCylinder
+from response import grid
 import math
 import heppy.statistics.rrandom as random
 
+#: upper bound of a random acceptance probability, see HCAL.acceptance_probability
+_ALMOST_ONE = 1. - 1e-15
+
 class ECAL(DetectorElement):
 
     def __init__(self):
@@ -30,6 +34,11 @@ class ECAL(DetectorElement):
             part = 'endcap'
         return self.eresp[part][0]/(1+math.exp((energy-self.eresp[part][1])/self.eresp[part][2])) #using fermi-dirac function : [0]/(1 + exp( (energy-[1]) /[2] ))
 
+    def tabulated_functions(self):
+        energies = grid(0.1, 1000., 200, log=True)
+        return {'energy_resolution': (energies, grid(0., 5., 50, edges=[self.eta_crack, 3.])),
+                'energy_response': (energies, grid(0., 5., 50, edges=[self.eta_crack]))}
+
     def cluster_size(self, ptc):
         pdgid = abs(ptc.pdgid())
         if pdgid==22 or pdgid==11:
@@ -39,7 +48,7 @@ class ECAL(DetectorElement):
 
     def acceptance(self, cluster):
         energy = cluster.energy
-        eta = abs(cluster.position.Eta())
+        eta = abs(cluster.eta())
         if eta < self.eta_crack:
             return energy>self.emin['barrel']
         elif eta < 2.93:
@@ -75,29 +84,45 @@ class HCAL(DetectorElement):
             part = 'endcap'
         return self.eresp[part][0]/(1+math.exp((energy-self.eresp[part][1])/self.eresp[part][2])) #using fermi-dirac function : [0]/(1 + exp( (energy-[1]) /[2] ))
 
+    def tabulated_functions(self):
+        energies = grid(0.1, 1000., 200, log=True)
+        etas = grid(0., 5., 50, edges=[self.eta_crack])
+        return {'energy_resolution': (energies, etas),
+                'energy_response': (energies, etas),
+                'acceptance_probability': (grid(0.1, 1000., 200, edges=[1., 1.1, 7., 10.], log=True),
+                                           grid(0., 5., 50, edges=[self.eta_crack, 3.]))}
+
     def cluster_size(self, ptc):
         return 0.2
 
-    def acceptance(self, cluster):
-        energy = cluster.energy
-        eta = abs(cluster.position.Eta())
+    def acceptance_probability(self, energy, eta):
+        '''returns the probability to accept a cluster.
+        In the regions where the acceptance is random, the probability is
+        kept below 1, so that a random number is always drawn there'''
+        eta = abs(eta)
         if eta < self.eta_crack :
             if energy>1.:
-                return random.uniform(0,1)<(1/(1+math.exp((energy-1.93816)/(-1.75330))))
+                return min(1/(1+math.exp((energy-1.93816)/(-1.75330))), _ALMOST_ONE)
             else:
-                return False
+                return 0.
         elif eta < 3. : 
             if energy>1.1:
                 if energy<10.:
-                    return random.uniform(0,1)<(1.05634-1.66943e-01*energy+1.05997e-02*(energy**2))
+                    return min(1.05634-1.66943e-01*energy+1.05997e-02*(energy**2), _ALMOST_ONE)
                 else:
-                    return random.uniform(0,1)<(8.09522e-01/(1+math.exp((energy-9.90855)/-5.30366)))
+                    return min(8.09522e-01/(1+math.exp((energy-9.90855)/-5.30366)), _ALMOST_ONE)
             else:
-                return False
+                return 0.
         elif eta < 5.:
-            return energy>7.
+            return 1. if energy>7. else 0.
         else:
-            return False
+            return 0.
+
+    def acceptance(self, cluster):
+        probability = self.acceptance_probability(cluster.energy, cluster.eta())
+        if probability == 0. or probability == 1.:
+            return probability == 1.
+        return random.uniform(0,1)<probability
     
     def space_resolution(self, ptc):
         pass
@@ -115,8 +140,8 @@ class Tracker(DetectorElement):
 
     def acceptance(self, track):
         # return False
-        pt = track.p3() .Pt()
-        eta = abs(track.p3() .Eta())
+        pt = track.pt()
+        eta = abs(track.eta())
         if eta < 1.35 and pt>0.5:
             return random.uniform(0,1)<0.95
         elif eta < 2.5 and pt>0.5:
@@ -126,7 +151,7 @@ class Tracker(DetectorElement):
 
     def resolution(self, track):
         # TODO: depends on the field
-        pt = track.p3() .Pt()
+        pt = track.pt()
         return 1.1e-2
 
     
@@ -154,13 +179,13 @@ class BeamPipe(DetectorElement):
 class CMS(Detector):
         
     def electron_acceptance(self, track):
-        return track.p3() .Mag() > 5 and abs(track.p3() .Eta()) < 2.5
+        return track.p() > 5 and abs(track.eta()) < 2.5
 
     def electron_resolution(self, ptc):
         return 0.1 / math.sqrt(ptc.e())
             
     def muon_acceptance(self, track):
-        return track.p3() .Pt() > 5 and abs(track.p3() .Eta()) < 2.5
+        return track.pt() > 5 and abs(track.eta()) < 2.5
             
     def muon_resolution(self, ptc):
         return 0.02 
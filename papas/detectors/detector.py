@@ -1,4 +1,5 @@
 import operator
+from response import ResponseTable
 
 class DetectorElement(object):
 
@@ -6,6 +7,26 @@ class DetectorElement(object):
         self.name = name
         self.volume = volume
         self.material = material
+
+    def tabulate(self, fname, energies, etas):
+        '''replaces the method fname, a function of (energy, eta),
+        by a lookup table, see heppy.papas.detectors.response.
+        Returns the table.'''
+        table = ResponseTable(getattr(self, fname), energies, etas)
+        setattr(self, fname, table)
+        return table
+
+    def untabulate(self, fname):
+        '''restores the original method fname'''
+        if isinstance(getattr(self, fname), ResponseTable):
+            delattr(self, fname)
+
+    def tabulated_functions(self):
+        '''returns the names of the methods that can be tabulated,
+        with their energy and |eta| grid nodes:
+        {fname: (energies, etas)}.
+        To be overloaded in the child classes.'''
+        return dict()
     
 class Detector(object):
     #TODO validate geometry consistency (no hole, no overlapping volumes)
@@ -23,3 +44,31 @@ class Detector(object):
             self._cylinders.append(element.volume.outer)
         self._cylinders.sort(key=operator.attrgetter("rad"))
         return self._cylinders
+
+    def tabulate(self):
+        '''replaces the response functions of all elements by lookup tables,
+        which are faster, especially for arrays of particles.
+        Returns the tables in a dict {(element name, function name): table}'''
+        tables = dict()
+        for name, element in self.elements.iteritems():
+            for fname, (energies, etas) in element.tabulated_functions().iteritems():
+                tables[(name, fname)] = element.tabulate(fname, energies, etas)
+        return tables
+
+    def untabulate(self):
+        '''restores the analytic response functions of all elements'''
+        for element in self.elements.values():
+            for fname in element.tabulated_functions():
+                element.untabulate(fname)
+
+    def validate_tables(self):
+        '''returns the maximum deviations (absolute, relative) of each lookup table
+        from the corresponding analytic function,
+        in a dict {(element name, function name): (absolute, relative)}'''
+        deviations = dict()
+        for name, element in self.elements.iteritems():
+            for fname in element.tabulated_functions():
+                table = getattr(element, fname)
+                if isinstance(table, ResponseTable):
+                    deviations[(name, fname)] = table.max_deviation()
+        return deviations
@@ -0,0 +1,172 @@
+'''Lookup tables for the detector response.
+
+A ResponseTable replaces a function of the energy and pseudo-rapidity of a particle,
+like the energy resolution or the energy response of a calorimeter,
+by a bilinear interpolation in a table of its values on an (energy, |eta|) grid.
+The energy axis is logarithmic.
+
+The table can be evaluated for a single particle, or for arrays of energies and
+pseudo-rapidities at once. Outside of the grid, the original function is used.
+
+Many parametrizations are discontinuous, eg at the barrel / endcap transition,
+or at an energy threshold. These edges must be given to the grid function, so that
+the grid has two nodes at each edge, with the values on each side of the edge.
+
+Example::
+
+    energies = grid(0.1, 1000., 100, log=True)
+    etas = grid(0., 5., 50, edges=[1.479, 3.])
+    table = ResponseTable(ecal.energy_resolution, energies, etas)
+    table(10., 0.5)
+    table(np.array([1., 10.]), np.array([0.5, 2.]))
+    table.max_deviation() # (absolute, relative)
+
+See L{DetectorElement.tabulate<heppy.papas.detectors.detector.DetectorElement.tabulate>}
+'''
+
+import math
+from bisect import bisect_right
+import numpy as np
+
+#: relative distance to an edge at which the function is evaluated on each side
+EDGE_EPSILON = 1e-9
+
+_SCALARS = (float, int, long)
+
+
+def grid(low, high, n, edges=(), log=False):
+    '''returns the sorted list of the nodes of a grid axis.
+    @param low: lower edge
+    @param high: upper edge
+    @param n: number of regular intervals (in log scale if log is True)
+    @param edges: positions of discontinuities, which appear twice in the grid
+    @param log: the nodes are regularly spaced in log scale if True
+    '''
+    if log:
+        nodes = list(np.logspace(math.log10(low), math.log10(high), n + 1))
+    else:
+        nodes = list(np.linspace(low, high, n + 1))
+    nodes.extend(edge for edge in edges if low < edge < high)
+    nodes.extend(edge for edge in edges if low < edge < high)
+    return sorted(nodes)
+
+
+def _probes(nodes):
+    '''returns the positions at which the function is evaluated for the nodes:
+    on the left of the first node of a pair of identical nodes, and on its right
+    for the second one. The first and last nodes are probed inside the grid.'''
+    def delta(node):
+        return EDGE_EPSILON * max(abs(node), 1.)
+    probes = list(nodes)
+    for i in range(len(nodes) - 1):
+        if nodes[i] == nodes[i + 1]:
+            probes[i] = nodes[i] - delta(nodes[i])
+            probes[i + 1] = nodes[i] + delta(nodes[i])
+    probes[0] = nodes[0] + delta(nodes[0])
+    probes[-1] = nodes[-1] - delta(nodes[-1])
+    return probes
+
+
+def evaluate(function, energies, etas):
+    '''evaluates a function of (energy, eta) for arrays of energies and etas,
+    at once if the function is a ResponseTable, and element by element otherwise.
+    Returns a numpy array.'''
+    if isinstance(function, ResponseTable):
+        return function(energies, etas)
+    energies = np.asarray(energies, dtype=float).tolist()
+    etas = np.asarray(etas, dtype=float).tolist()
+    return np.array([function(energy, eta) for energy, eta in zip(energies, etas)],
+                    dtype=float)
+
+
+class ResponseTable(object):
+    '''Tabulated version of a function of (energy, eta), symmetric in eta.
+
+    attributes:
+       @param function: the original function
+       @param energies: energy nodes
+       @param etas: |eta| nodes
+       @param values: array of the values of the function, of shape (len(energies), len(etas))
+    '''
+
+    def __init__(self, function, energies, etas):
+        '''constructor.
+        @param function: function(energy, eta) returning a float
+        @param energies: energy nodes, see grid
+        @param etas: |eta| nodes, see grid
+        '''
+        self.function = function
+        self.energies = [float(energy) for energy in energies]
+        self.etas = [float(eta) for eta in etas]
+        self.values = np.array([[function(energy, eta) for eta in _probes(self.etas)]
+                                for energy in _probes(self.energies)], dtype=float)
+        self._logenergies = np.log(self.energies)
+        self._logenergies_list = self._logenergies.tolist()
+        self._values = self.values.tolist()
+
+    def _scalar(self, energy, eta):
+        eta = abs(eta)
+        energies, etas = self.energies, self.etas
+        if not (energies[0] <= energy <= energies[-1] and eta <= etas[-1]):
+            return self.function(energy, eta)
+        i = min(bisect_right(energies, energy), len(energies) - 1) - 1
+        j = min(bisect_right(etas, eta), len(etas) - 1) - 1
+        logenergies = self._logenergies_list
+        we = (math.log(energy) - logenergies[i]) / (logenergies[i + 1] - logenergies[i])
+        weta = (eta - etas[j]) / (etas[j + 1] - etas[j])
+        values = self._values
+        low = values[i][j] + weta * (values[i][j + 1] - values[i][j])
+        high = values[i + 1][j] + weta * (values[i + 1][j + 1] - values[i + 1][j])
+        return low + we * (high - low)
+
+    def __call__(self, energy, eta=0.):
+        '''returns the interpolated value of the function,
+        for a single particle, or for arrays of energies and etas.'''
+        if isinstance(energy, _SCALARS) and isinstance(eta, _SCALARS):
+            return self._scalar(energy, eta)
+        energy, eta = np.broadcast_arrays(np.asarray(energy, dtype=float),
+                                          np.abs(np.asarray(eta, dtype=float)))
+        inside = (energy >= self.energies[0]) & (energy <= self.energies[-1]) & \
+                 (eta <= self.etas[-1])
+        result = np.empty(energy.shape)
+        e, x = energy[inside], eta[inside]
+        i = np.clip(np.searchsorted(self.energies, e, side='right'), 1, len(self.energies) - 1) - 1
+        j = np.clip(np.searchsorted(self.etas, x, side='right'), 1, len(self.etas) - 1) - 1
+        logenergies = self._logenergies
+        we = (np.log(e) - logenergies[i]) / (logenergies[i + 1] - logenergies[i])
+        etas = np.asarray(self.etas)
+        weta = (x - etas[j]) / (etas[j + 1] - etas[j])
+        values = self.values
+        low = values[i, j] + weta * (values[i, j + 1] - values[i, j])
+        high = values[i + 1, j] + weta * (values[i + 1, j + 1] - values[i + 1, j])
+        result[inside] = low + we * (high - low)
+        outside = ~inside
+        result[outside] = [self.function(ee, xx)
+                           for ee, xx in zip(energy[outside], eta[outside])]
+        return result
+
+    def max_deviation(self, nsteps=4):
+        '''validation: returns the maximum absolute and relative deviations
+        of the table from the original function.
+        The function is evaluated on a grid nsteps times finer than the table,
+        excluding the edges.
+        '''
+        def fine(nodes, log=False):
+            result = []
+            for low, high in zip(nodes[:-1], nodes[1:]):
+                if high == low:
+                    continue
+                if log:
+                    result.extend(np.exp(np.linspace(math.log(low), math.log(high),
+                                                     nsteps + 1)[1:-1]))
+                else:
+                    result.extend(np.linspace(low, high, nsteps + 1)[1:-1])
+            return np.array(result)
+        energies, etas = np.meshgrid(fine(self.energies, log=True), fine(self.etas),
+                                     indexing='ij')
+        energies, etas = energies.ravel(), etas.ravel()
+        tabulated = self(energies, etas)
+        exact = np.array([self.function(energy, eta) for energy, eta in zip(energies, etas)])
+        deviation = np.abs(tabulated - exact)
+        scale = np.where(exact != 0., np.abs(exact), 1.)
+        return deviation.max(), (deviation / scale).max()
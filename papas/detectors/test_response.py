@@ -0,0 +1,61 @@
+import unittest
+import math
+import numpy as np
+from response import ResponseTable, grid
+from CMS import CMS
+
+
+def step(energy, eta):
+    '''smooth in energy, with a step at eta = 1'''
+    if abs(eta) < 1.:
+        return math.sqrt(energy)
+    return 2. * math.sqrt(energy)
+
+
+class TestResponseTable(unittest.TestCase):
+
+    def test_grid(self):
+        nodes = grid(0., 2., 4, edges=[1.2, 3.])
+        self.assertEqual(nodes, [0., 0.5, 1., 1.2, 1.2, 1.5, 2.])
+        nodes = grid(1., 100., 2, log=True)
+        self.assertTrue(np.allclose(nodes, [1., 10., 100.]))
+
+    def test_table(self):
+        table = ResponseTable(step, grid(1., 100., 200, log=True),
+                              grid(0., 2., 20, edges=[1.]))
+        # on each side of the edge
+        self.assertAlmostEqual(table(4., 0.999), 2., places=3)
+        self.assertAlmostEqual(table(4., -1.001), 4., places=3)
+        # outside of the grid, the function is used
+        self.assertEqual(table(1000., 0.5), step(1000., 0.5))
+        self.assertEqual(table(4., 3.), step(4., 3.))
+        # arrays
+        energies = np.array([1., 4., 30., 1000., 4.])
+        etas = np.array([0.2, -1.5, 0.999, 0.5, 3.])
+        values = table(energies, etas)
+        for energy, eta, value in zip(energies, etas, values):
+            self.assertAlmostEqual(value, table(energy, eta), places=12)
+        absolute, relative = table.max_deviation()
+        self.assertLess(relative, 1e-4)
+
+    def test_detector(self):
+        cms = CMS()
+        hcal = cms.elements['hcal']
+        analytic = hcal.energy_resolution(10., 2.)
+        tables = cms.tabulate()
+        self.assertTrue(('hcal', 'acceptance_probability') in tables)
+        self.assertAlmostEqual(hcal.energy_resolution(10., 2.), analytic, places=4)
+        for (name, fname), (absolute, relative) in cms.validate_tables().iteritems():
+            self.assertLess(absolute, 0.02)
+            self.assertLess(relative, 0.002)
+        # the deterministic acceptances stay deterministic
+        self.assertEqual(hcal.acceptance_probability(0.9, 0.5), 0.)
+        self.assertEqual(hcal.acceptance_probability(8., 4.), 1.)
+        self.assertEqual(hcal.acceptance_probability(6., 4.), 0.)
+        self.assertTrue(0. < hcal.acceptance_probability(100., 0.5) < 1.)
+        cms.untabulate()
+        self.assertEqual(hcal.energy_resolution(10., 2.), analytic)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+'''Disjoint set (union-find) structure, used to find the connected components
+of an undirected graph.
+
+The elements are indexed by integers 0 to n-1. The structure is made of a
+list of parents, the root of each tree being the representative element
+of a set. Union by size and path compression keep the trees very flat, so
+that finding the components of a graph with n elements and m links is
+almost linear in n + m.
+
+example::
+        ds = DisjointSet(4)
+        ds.union(0, 2)
+        ds.union(3, 2)
+        ds.components()  # [[0, 2, 3], [1]]
+
+see also connected_components, used by the
+L{SubgraphBuilder<heppy.papas.graphtools.subgraphbuilder.SubgraphBuilder>}.
+'''
+
+
+class DisjointSet(object):
+    '''
+    Disjoint set of n elements, indexed from 0 to n-1.
+    Initially, each element is in its own set.
+
+    attributes:
+       @param parents: list of the parent index of each element.
+                       A root is its own parent
+       @param sizes: number of elements in the set of each root
+    '''
+
+    def __init__(self, n):
+        '''constructor.
+        @param n: number of elements
+        '''
+        self.parents = range(n)
+        self.sizes = [1] * n
+
+    def find(self, index):
+        '''returns the root of the set containing index,
+        compressing the path from index to the root.'''
+        parents = self.parents
+        root = index
+        while parents[root] != root:
+            root = parents[root]
+        while parents[index] != root:
+            parents[index], index = root, parents[index]
+        return root
+
+    def union(self, index1, index2):
+        '''merges the sets containing index1 and index2.
+        returns False if they were already in the same set, True otherwise'''
+        root1 = self.find(index1)
+        root2 = self.find(index2)
+        if root1 == root2:
+            return False
+        if self.sizes[root1] < self.sizes[root2]:
+            root1, root2 = root2, root1
+        self.parents[root2] = root1
+        self.sizes[root1] += self.sizes[root2]
+        return True
+
+    def components(self):
+        '''returns the list of sets, each of them being the sorted list
+        of its element indices. The sets are ordered by their smallest index.'''
+        groups = dict()
+        result = []
+        for index in xrange(len(self.parents)):
+            root = self.find(index)
+            group = groups.get(root, None)
+            if group is None:
+                group = groups[root] = []
+                result.append(group)
+            group.append(index)
+        return result
+
+
+def connected_components(ids, links):
+    '''finds the connected components of an undirected graph.
+
+    @param ids: the node ids, which must be sortable
+    @param links: iterable of pairs of linked ids (id1, id2).
+    @return: the list of components, each component being the list of its ids
+    sorted in reverse order. The components are ordered by their smallest id.
+    This is the same ordering as obtained with a floodfill on the nodes
+    sorted by id (see L{DAGFloodFill<heppy.papas.graphtools.DAG.DAGFloodFill>}
+    with dosorting=True), which is needed for a match with papascpp.
+    '''
+    ids = sorted(ids)
+    indices = dict((uid, index) for index, uid in enumerate(ids))
+    disjointset = DisjointSet(len(ids))
+    for id1, id2 in links:
+        disjointset.union(indices[id1], indices[id2])
+    return [[ids[index] for index in reversed(component)]
+            for component in disjointset.components()]
@@ -0,0 +1,296 @@
+'''Compact storage of the papas history, a Directed Acyclic Graph of ids.
+
+The History stores the ids once, in a list, and the links between them
+as two integer arrays (edge arrays) giving the parent and child index of each link.
+For the traversals, the links are converted on demand to a compressed sparse row
+(CSR) structure: for each node, the offsets of its linked nodes in a single
+integer array. Links added after the conversion are kept aside in small lists,
+and the conversion is redone only when they become numerous, so that queries
+can be interleaved with the extension of the history at a low cost.
+
+This avoids the creation of a L{Node<heppy.papas.graphtools.DAG.Node>} object
+and of its lists of parents, children and undirected links for each id.
+
+The History can be used as the dictionary of Nodes used before:
+history[uid] returns a light HistoryNode which can be used with the algorithms
+of L{DAG<heppy.papas.graphtools.DAG>}, and new nodes can be inserted with
+history[uid] = Node(uid).
+
+example::
+        history = History()
+        history.add_link(1, 2)
+        history.add_link(1, 3)
+        history.linked_ids(2, "undirected") # [2, 1, 3]
+        history[1].add_child(history[4])
+        history.subgraphs() # [[4, 3, 2, 1]]
+'''
+from array import array
+from collections import deque
+import numpy as np
+from heppy.papas.graphtools.disjointset import connected_components
+
+DIRECTIONS = ("children", "parents", "undirected")
+
+
+class _Adjacency(object):
+    '''CSR structure for one direction of the links.
+
+    attributes:
+       @param nedges: number of links converted
+       @param offsets: the nodes linked to node i are targets[offsets[i]:offsets[i+1]]
+       @param targets: indices of the linked nodes
+       @param recent: dict {index: list of linked indices} for the links added
+                      after the conversion
+       @param nrecent: number of links in recent
+    '''
+    __slots__ = ('nedges', 'offsets', 'targets', 'recent', 'nrecent')
+
+    def __init__(self, nedges, offsets, targets):
+        self.nedges = nedges
+        self.offsets = offsets
+        self.targets = targets
+        self.recent = dict()
+        self.nrecent = 0
+
+    def linked(self, index):
+        '''returns the list of the indices linked to index, in the order in which
+        the links were added'''
+        if index + 1 < len(self.offsets):
+            result = self.targets[self.offsets[index]:self.offsets[index + 1]].tolist()
+        else:
+            result = []
+        recent = self.recent.get(index, None)
+        if recent:
+            result.extend(recent)
+        return result
+
+
+def _to_array(values):
+    '''converts a numpy array of integers to a compact array.array'''
+    result = array('l')
+    result.fromstring(np.asarray(values, dtype=np.dtype('i%d' % result.itemsize)).tostring())
+    return result
+
+
+class History(object):
+    '''
+    Directed Acyclic Graph of unique ids, with compact storage of the links.
+
+    attributes:
+       @param ids: list of the ids, in order of insertion
+       @param indices: dict {id: index in ids}
+       @param parents: array of the parent index of each link
+       @param children: array of the child index of each link
+    '''
+
+    def __init__(self, ids=()):
+        '''constructor.
+        @param ids: optional ids of the initial nodes, without links
+        '''
+        self.ids = []
+        self.indices = dict()
+        self.parents = array('l')
+        self.children = array('l')
+        self._adjacency = dict()
+        for uid in ids:
+            self.add_node(uid)
+
+    def add_node(self, uid):
+        '''adds uid into the history if it is not already there,
+        and returns its index'''
+        index = self.indices.get(uid, None)
+        if index is None:
+            index = self.indices[uid] = len(self.ids)
+            self.ids.append(uid)
+        return index
+
+    def add_link(self, parentid, childid):
+        '''records that childid is a child of parentid.
+        The ids are added into the history if needed'''
+        parent = self.add_node(parentid)
+        child = self.add_node(childid)
+        self.parents.append(parent)
+        self.children.append(child)
+        for direction, adjacency in self._adjacency.iteritems():
+            if direction != "parents":
+                adjacency.recent.setdefault(parent, []).append(child)
+            if direction != "children":
+                adjacency.recent.setdefault(child, []).append(parent)
+            adjacency.nrecent += 1
+
+    def links(self):
+        '''returns the list of the links (parentid, childid), in order of insertion'''
+        ids = self.ids
+        return [(ids[parent], ids[child])
+                for parent, child in zip(self.parents, self.children)]
+
+    def _get_adjacency(self, direction):
+        '''returns the CSR structure for the direction, building it if needed'''
+        adjacency = self._adjacency.get(direction, None)
+        if adjacency is not None and \
+           adjacency.nrecent <= max(64, adjacency.nedges / 4):
+            return adjacency
+        parents = np.frombuffer(self.parents, dtype=np.dtype('i%d' % self.parents.itemsize))
+        children = np.frombuffer(self.children, dtype=parents.dtype)
+        if direction == "children":
+            sources, targets = parents, children
+        elif direction == "parents":
+            sources, targets = children, parents
+        else:
+            sources = np.concatenate([parents, children])
+            targets = np.concatenate([children, parents])
+        # stable sort, so that the linked nodes stay in the order of insertion
+        # of the links, as in the Node lists
+        if direction == "undirected":
+            order = np.lexsort((np.tile(np.arange(len(parents)), 2), sources))
+        else:
+            order = np.argsort(sources, kind='mergesort')
+        offsets = np.zeros(len(self.ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(self.ids)), out=offsets[1:])
+        adjacency = _Adjacency(len(parents), _to_array(offsets), _to_array(targets[order]))
+        self._adjacency[direction] = adjacency
+        return adjacency
+
+    def linked_indices(self, index, direction):
+        '''returns the indices of the nodes directly linked to the node at index
+        @param direction: "children", "parents" or "undirected"
+        '''
+        return self._get_adjacency(direction).linked(index)
+
+    def linked_ids(self, uid, direction="undirected"):
+        '''returns the ids of all nodes reachable from uid, including uid,
+        in the breadth first order of
+        L{BreadthFirstSearchIterative<heppy.papas.graphtools.DAG.BreadthFirstSearchIterative>}
+        @param uid: unique id of the starting node
+        @param direction: "children", "parents" or "undirected"
+        '''
+        adjacency = self._get_adjacency(direction)
+        visited = set()
+        result = []
+        todo = deque([self.indices[uid]])
+        while todo:
+            index = todo.popleft()
+            if index in visited:
+                continue
+            visited.add(index)
+            result.append(self.ids[index])
+            todo.extend(linked for linked in adjacency.linked(index)
+                        if linked not in visited)
+        return result
+
+    def subgraphs(self):
+        '''returns the connected groups of ids, see
+        L{connected_components<heppy.papas.graphtools.disjointset.connected_components>}'''
+        ids = self.ids
+        return connected_components(
+            ids, ((ids[parent], ids[child])
+                  for parent, child in zip(self.parents, self.children)))
+
+    # dictionary of nodes interface
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, uid):
+        return uid in self.indices
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def keys(self):
+        return list(self.ids)
+
+    def iterkeys(self):
+        return iter(self.ids)
+
+    def __getitem__(self, uid):
+        return HistoryNode(self, self.indices[uid])
+
+    def get(self, uid, default=None):
+        index = self.indices.get(uid, None)
+        if index is None:
+            return default
+        return HistoryNode(self, index)
+
+    def __setitem__(self, uid, node):
+        '''inserts a node, eg history[uid] = Node(uid).
+        The links of the node, if any, are recorded as well.'''
+        self.add_node(uid)
+        for child in node.children:
+            self.add_link(uid, child.get_value())
+        for parent in node.parents:
+            self.add_link(parent.get_value(), uid)
+
+    def setdefault(self, uid, node):
+        if uid not in self.indices:
+            self[uid] = node
+        return self[uid]
+
+
+class HistoryNode(object):
+    '''Light view on a node of a History, with the interface of
+    L{Node<heppy.papas.graphtools.DAG.Node>}.
+    Two views on the same node are equal.
+    '''
+    __slots__ = ('history', 'index')
+
+    def __init__(self, history, index):
+        self.history = history
+        self.index = index
+
+    @property
+    def value(self):
+        return self.history.ids[self.index]
+
+    def get_value(self):
+        return self.value
+
+    def accept(self, visitor):
+        visitor.visit(self)
+
+    def add_child(self, child):
+        '''set the children'''
+        self.history.add_link(self.value, child.get_value())
+
+    def add_parent(self, parent):
+        '''set the parents'''
+        self.history.add_link(parent.get_value(), self.value)
+
+    def get_linked_nodes(self, type):
+        '''return a list of the linked children/parents/undirected links'''
+        history = self.history
+        return [HistoryNode(history, index)
+                for index in history.linked_indices(self.index, type)]
+
+    @property
+    def children(self):
+        return self.get_linked_nodes("children")
+
+    @property
+    def parents(self):
+        return self.get_linked_nodes("parents")
+
+    @property
+    def undirected_links(self):
+        return self.get_linked_nodes("undirected")
+
+    def __eq__(self, other):
+        return isinstance(other, HistoryNode) and \
+            self.history is other.history and self.index == other.index
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.index)
+
+    def __repr__(self):
+        '''unique string representation'''
+        return self.__str__()
+
+    def __str__(self):
+        '''unique string representation'''
+        return str('node: {val} {children}'.format(
+            val = self.value,
+            children = self.children
+        ) )
@@ -1,4 +1,5 @@
-from DAG import Node, DAGFloodFill
+from DAG import Node
+from disjointset import connected_components
 from heppy.utils.pdebug import pdebugger
 from heppy.papas.data.identifier import Identifier
 import collections
@@ -13,9 +14,9 @@ class SubgraphBuilder(object):
         ids   : list of unique identifiers eg of tracks, clusters etc
         edges : dict of edges which contains all edges between the ids (and maybe more)
                 an edge records the distance between two ids
-        nodes : a set of nodes corresponding to the unique ids which is used to construct a graph
-                and thus find distinct blocks
+        nodes : a set of nodes corresponding to the unique ids, built on demand
         subgraphs : a list of subgraphs, each subgraph is a list of connected ids
+                    found with a union-find (see disjointset.py)
 
         Usage example:
             graph = SubgraphBuilder(ids, edges)
@@ -30,21 +31,25 @@ class SubgraphBuilder(object):
         self.ids = ids
         self.edges = edges
         
-        # build the block nodes (separate graph which will use distances between items to determine links)
-        self.nodes = dict((idt, Node(idt)) for idt in ids)
-        for edge in edges.itervalues():
-            #add linkage info into the nodes dictionary
-            if  edge.linked: #this is actually an undirected link - OK for undirected searches 
-                self.nodes[edge.id1].add_child(self.nodes[edge.id2])
+        self._nodes = None
 
-        # build the subgraphs of connected nodes
-        self.subgraphs = []
-        
-        #sort option  below is needed for consistent orderings and is required for a match with papascpp
-        for subgraph in DAGFloodFill(self.nodes, dosorting=True).subgraphs:
-            # each of the subgraphs returned by floodfill is a list of nodes that are connected
-            # we want the ids of these nodes
-            self.subgraphs.append( sorted((node.get_value() for node in subgraph), reverse=True) )  
+        # build the subgraphs of connected ids
+        # the ordering of the subgraphs and of the ids in each subgraph
+        # is needed for consistent orderings and is required for a match with papascpp
+        links = ((edge.id1, edge.id2) for edge in edges.itervalues() if edge.linked)
+        self.subgraphs = connected_components(ids, links)
+
+    @property
+    def nodes(self):
+        '''dict of nodes corresponding to the unique ids, linked according to the edges.
+        It is only built when requested.'''
+        if self._nodes is None:
+            self._nodes = dict((idt, Node(idt)) for idt in self.ids)
+            for edge in self.edges.itervalues():
+                #add linkage info into the nodes dictionary
+                if  edge.linked: #this is actually an undirected link - OK for undirected searches 
+                    self._nodes[edge.id1].add_child(self._nodes[edge.id2])
+        return self._nodes
 
     def __str__(self):
         descrip = "{ "
@@ -0,0 +1,34 @@
+import unittest
+import random
+from DAG import Node, DAGFloodFill
+from disjointset import DisjointSet, connected_components
+
+
+class TestDisjointSet(unittest.TestCase):
+
+    def test_union_find(self):
+        ds = DisjointSet(6)
+        self.assertTrue(ds.union(0, 2))
+        self.assertTrue(ds.union(3, 2))
+        self.assertFalse(ds.union(0, 3))
+        self.assertTrue(ds.union(5, 4))
+        self.assertEqual(ds.find(3), ds.find(0))
+        self.assertNotEqual(ds.find(1), ds.find(0))
+        self.assertEqual(ds.components(), [[0, 2, 3], [1], [4, 5]])
+
+    def test_floodfill(self):
+        '''same subgraphs, in the same order, as the sorted DAGFloodFill'''
+        rand = random.Random(0xdead)
+        for itest in range(20):
+            ids = rand.sample(xrange(10000), 200)
+            links = [tuple(rand.sample(ids, 2)) for ilink in range(150)]
+            nodes = dict((uid, Node(uid)) for uid in ids)
+            for id1, id2 in links:
+                nodes[id1].add_child(nodes[id2])
+            expected = [sorted((node.get_value() for node in subgraph), reverse=True)
+                        for subgraph in DAGFloodFill(nodes, dosorting=True).subgraphs]
+            self.assertEqual(connected_components(ids, links), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import random
+from DAG import Node, BreadthFirstSearchIterative, DAGFloodFill
+from history import History
+
+
+class TestHistory(unittest.TestCase):
+
+    def test_interface(self):
+        history = History([1])
+        history.add_link(1, 2)
+        history.add_link(1, 3)
+        history[4] = Node(4)
+        history[1].add_child(history[4])
+        self.assertEqual(len(history), 4)
+        self.assertTrue(3 in history)
+        self.assertFalse(5 in history)
+        self.assertEqual(history.keys(), [1, 2, 3, 4])
+        self.assertEqual([node.get_value() for node in history[1].children], [2, 3, 4])
+        self.assertEqual([node.get_value() for node in history[4].parents], [1])
+        self.assertEqual(history[2], history[2])
+        self.assertEqual(history.linked_ids(2, "undirected"), [2, 1, 3, 4])
+        self.assertEqual(history.links(), [(1, 2), (1, 3), (1, 4)])
+        self.assertEqual(history.subgraphs(), [[4, 3, 2, 1]])
+
+    def test_same_as_nodes(self):
+        '''same traversals as the dictionary of Nodes,
+        also when queries and new links are interleaved'''
+        rand = random.Random(0xdead)
+        history = History()
+        nodes = dict()
+        ids = rand.sample(xrange(10000), 500)
+        for ilink in range(1000):
+            parent, child = sorted(rand.sample(ids, 2))
+            history.add_link(parent, child)
+            nodes.setdefault(parent, Node(parent)).add_child(
+                nodes.setdefault(child, Node(child)))
+            if ilink % 50 == 0:
+                uid = rand.choice(nodes.keys())
+                for direction in ["children", "parents", "undirected"]:
+                    expected = [node.get_value() for node in
+                                BreadthFirstSearchIterative(nodes[uid], direction).result]
+                    self.assertEqual(history.linked_ids(uid, direction), expected)
+                    # and the DAG algorithms on the History itself
+                    result = [node.get_value() for node in
+                              BreadthFirstSearchIterative(history[uid], direction).result]
+                    self.assertEqual(result, expected)
+        expected = [sorted((node.get_value() for node in subgraph), reverse=True)
+                    for subgraph in DAGFloodFill(nodes, dosorting=True).subgraphs]
+        self.assertEqual(history.subgraphs(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,8 @@ from heppy.papas.graphtools.subgraphbuilder import SubgraphBuilder
 from heppy.papas.graphtools.edge import Edge
 from heppy.papas.graphtools.DAG import Node
 from heppy.papas.pfobjects import MergedCluster
+from heppy.papas.pfalgo.distance import Distance
+from heppy.papas.pfalgo.pfblockbuilder import DirectionGrid
 from heppy.utils.pdebug import pdebugger
 
 class MergedClusterBuilder(SubgraphBuilder):
@@ -42,15 +44,18 @@ class MergedClusterBuilder(SubgraphBuilder):
         # collate ids of clusters
         uniqueids = list(clusters.keys())
              
-        #make the edges match cpp by using the same approach as cpp
+        #compute the edges between the pairs of clusters that could be linked.
+        #for a Distance, the grid gives the same links as considering all pairs, as in cpp
+        if isinstance(ruler, Distance):
+            pairs = DirectionGrid(clusters).candidate_pairs()
+        else:
+            pairs = ((id1, id2) for id1 in uniqueids for id2 in uniqueids if id1 < id2)
         edges = dict()
-        for obj1 in  clusters.values():
-            for obj2 in  clusters.values():
-                if obj1.uniqueid < obj2.uniqueid:
-                    link_type, is_linked, distance = ruler(obj1, obj2)
-                    edge = Edge(obj1.uniqueid, obj2.uniqueid, is_linked, distance)
-                    #the edge object is added into the edges dictionary
-                    edges[edge.key] = edge
+        for id1, id2 in pairs:
+            link_type, is_linked, distance = ruler(clusters[id1], clusters[id2])
+            edge = Edge(id1, id2, is_linked, distance)
+            #the edge object is added into the edges dictionary
+            edges[edge.key] = edge
 
         #make the subgraphs of clusters
         super(MergedClusterBuilder, self).__init__(uniqueids, edges)
@@ -75,4 +80,4 @@ class MergedClusterBuilder(SubgraphBuilder):
                 self.history_nodes[supercluster.uniqueid] = snode
                 for node_id in subgraph:
                     self.history_nodes[node_id].add_child(snode)
-            pdebugger.info(str('Made {}'.format(supercluster)))
+            pdebugger.info('Made %s', supercluster)
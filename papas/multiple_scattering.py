@@ -1,4 +1,5 @@
 import math
+import numpy as np
 from scipy import constants
 from numpy import sign
 from ROOT import TLorentzVector, TVector3
@@ -95,5 +96,86 @@ def multiple_scattering( particle, detector_element, field ):
 
     # replacing the particle's path with the scatterd one :
     particle.set_path(helix_new_0, option = 'w')
-        
-        
+
+
+def _rotate(vectors, angles, axes):
+    '''rotates the 3-vectors by the angles around the axes, as TVector3.Rotate.
+    @param vectors: array of shape (n, 3)
+    @param angles: array of n angles
+    @param axes: array of shape (n, 3). The vectors with a null axis are not rotated.
+    '''
+    norms = np.sqrt((axes * axes).sum(axis=1))
+    valid = norms > 0.
+    dx, dy, dz = (axes / np.where(valid, norms, 1.)[:, np.newaxis]).T
+    sa, ca = np.sin(angles), np.cos(angles)
+    x, y, z = vectors.T
+    rotated = np.column_stack([
+        (ca + (1 - ca) * dx * dx) * x + ((1 - ca) * dx * dy - sa * dz) * y + ((1 - ca) * dx * dz + sa * dy) * z,
+        ((1 - ca) * dy * dx + sa * dz) * x + (ca + (1 - ca) * dy * dy) * y + ((1 - ca) * dy * dz - sa * dx) * z,
+        ((1 - ca) * dz * dx - sa * dy) * x + ((1 - ca) * dz * dy + sa * dx) * y + (ca + (1 - ca) * dz * dz) * z])
+    return np.where(valid[:, np.newaxis], rotated, vectors)
+
+
+def multiple_scatterings(particles, detector_element, field):
+    '''Computes the multiple scattering of all particles in detector_element at once.
+
+    Same as multiple_scattering, for a list of particles: the scattering
+    points are found particle by particle, while the scattering angles,
+    the random numbers and the rotations of the momenta are computed with numpy.
+    With the numpy random backend, the gaussian and uniform random numbers
+    are the same as with successive calls to multiple_scattering,
+    whatever the number of particles, as each distribution has its own
+    random generator (see L{random_numpy<heppy.statistics.random_numpy>}).
+    '''
+    surface_in = '{}_in'.format(detector_element.name)
+    surface_out = '{}_out'.format(detector_element.name)
+    particles = [ptc for ptc in particles if ptc.q() and
+                 surface_in in ptc.path.points and surface_out in ptc.path.points]
+    if not particles:
+        return
+    paths = [ptc.path for ptc in particles]
+    t_scat = np.empty(len(paths))
+    lengths = np.empty(len(paths))
+    for i, path in enumerate(paths):
+        in_point = path.points[surface_in]
+        out_point = path.points[surface_out]
+        phi_in = path.phi(in_point.X(), in_point.Y())
+        phi_out = path.phi(out_point.X(), out_point.Y())
+        t_scat[i] = path.time_at_phi((phi_in + phi_out) * 0.5)
+        deltat = path.time_at_phi(phi_out) - path.time_at_phi(phi_in)
+        lengths[i] = abs(path.path_length(deltat))
+    p4s = np.array([(path.p4.X(), path.p4.Y(), path.p4.Z(), path.p4.T()) for path in paths])
+    omegas = np.array([path.omega for path in paths])
+    speeds = np.array([path.speed for path in paths])
+    charges = np.array([path.charge for path in paths], dtype=float)
+
+    # momenta at the scattering time
+    cos_t, sin_t = np.cos(omegas * t_scat), np.sin(omegas * t_scat)
+    p3s = np.column_stack([p4s[:, 0] * cos_t + p4s[:, 1] * sin_t,
+                           -p4s[:, 0] * sin_t + p4s[:, 1] * cos_t,
+                           p4s[:, 2]])
+    momenta = np.sqrt((p3s * p3s).sum(axis=1))
+
+    # gaussian width of the scattering angle
+    X_0 = detector_element.material.x0
+    theta_0 = 13.6e-3 / (speeds / constants.c * momenta) * np.abs(charges)
+    theta_0 *= np.sqrt(lengths / X_0) * (1 + 0.038 * np.log(lengths / X_0))
+    theta_space = theta_0 * 2.0**(1.0/2) * random.gauss(0., 1., size=len(paths))
+    psi = constants.pi * random.uniform(0., 1., size=len(paths))
+
+    # first rotation: theta, in the xy plane, then psi around the initial direction
+    e_z = np.array([0., 0., 1.])
+    scattered = _rotate(p3s, theta_space, np.cross(p3s, e_z))
+    scattered = _rotate(scattered, psi, p3s)
+
+    # back to t=0
+    p3s_0 = np.column_stack([scattered[:, 0] * cos_t - scattered[:, 1] * sin_t,
+                             scattered[:, 0] * sin_t + scattered[:, 1] * cos_t,
+                             scattered[:, 2]])
+    for i, (ptc, path) in enumerate(zip(particles, paths)):
+        p4_t = TLorentzVector(scattered[i, 0], scattered[i, 1], scattered[i, 2], p4s[i, 3])
+        helix_new_t = Helix(field, path.charge, p4_t, path.point_at_time(t_scat[i]))
+        p4_scat = TLorentzVector(p3s_0[i, 0], p3s_0[i, 1], p3s_0[i, 2], p4s[i, 3])
+        helix_new_0 = Helix(field, path.charge, p4_scat,
+                            helix_new_t.point_at_time(-t_scat[i]))
+        ptc.set_path(helix_new_0, option='w')
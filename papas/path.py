@@ -3,7 +3,7 @@ from scipy import constants
 from ROOT import TVector3, TLorentzVector
 from heppy.utils.deltar import deltaPhi
 from collections import OrderedDict
-import scipy.optimize 
+import numpy as np
 from numpy import sign
 import heppy.statistics.rrandom as random
 
@@ -107,10 +107,97 @@ class Helix(Path):
         return x,y,z
        
     
+def _xyz(vectors, size):
+    '''returns an array of shape (size, 3) from a TVector3-like object,
+    or from a list of size TVector3-like objects'''
+    if hasattr(vectors, 'X'):
+        return np.tile([vectors.X(), vectors.Y(), vectors.Z()], (size, 1))
+    return np.array([(vec.X(), vec.Y(), vec.Z()) for vec in vectors],
+                    dtype=float).reshape(size, 3)
+
+
+def closest_approach_times(helices, points, directions=None,
+                           rtol=1e-12, maxiter=20):
+    '''Returns the array of the times of closest approach between helices
+    and points, or lines if directions are given.
+
+    @param helices: list of Helix objects
+    @param points: TVector3-like point, or list of points, one per helix
+    @param directions: optional TVector3-like direction, or list of
+      directions, one per helix. If given, the distance is computed between
+      the helix and the line going through the point in this direction.
+    @param rtol: relative tolerance on the time
+    @param maxiter: maximum number of iterations
+
+    All helices are treated at once with numpy.
+    The first step gives the time of closest approach of the straight line
+    tangent to the helix at its origin, which is computed analytically.
+    It is refined by Newton iterations on the derivative of the squared
+    distance, which converge quadratically, typically in 2 or 3 iterations.
+    The closest local minimum of the distance to the origin of the helix
+    is found.
+
+    For impact parameters up to a few mm and momenta above 1 GeV,
+    the resulting impact parameters are accurate to about 1e-14 m,
+    see heppy/benchmarks/bench_impact_parameter.py.
+    '''
+    size = len(helices)
+    origins = _xyz([helix.origin for helix in helices], size)
+    vwx = np.array([helix.v_over_omega.X() for helix in helices], dtype=float)
+    vwy = np.array([helix.v_over_omega.Y() for helix in helices], dtype=float)
+    omegas = np.array([helix.omega for helix in helices], dtype=float)
+    vzs = np.array([helix.vz() for helix in helices], dtype=float)
+    points = _xyz(points, size)
+    if directions is None:
+        directions = np.zeros((size, 3))
+    else:
+        directions = _xyz(directions, size)
+        norms = np.sqrt((directions ** 2).sum(axis=1))
+        directions /= np.where(norms > 0., norms, 1.)[:, np.newaxis]
+
+    def transverse(vectors):
+        '''component of the vectors perpendicular to the directions'''
+        return vectors - (vectors * directions).sum(axis=1)[:, np.newaxis] * directions
+
+    times = np.zeros(size)
+    for iteration in range(maxiter):
+        wt = omegas * times
+        cos, sin = np.cos(wt), np.sin(wt)
+        positions = np.column_stack([
+            origins[:, 0] + vwy * (1 - cos) + vwx * sin,
+            origins[:, 1] - vwx * (1 - cos) + vwy * sin,
+            origins[:, 2] + vzs * times
+        ])
+        velocities = np.column_stack([
+            omegas * (vwy * sin + vwx * cos),
+            omegas * (vwy * cos - vwx * sin),
+            vzs
+        ])
+        accelerations = np.column_stack([
+            omegas ** 2 * (vwy * cos - vwx * sin),
+            - omegas ** 2 * (vwx * cos + vwy * sin),
+            np.zeros(size)
+        ])
+        distances = transverse(positions - points)
+        tvelocities = transverse(velocities)
+        # half derivatives of the squared distance
+        first = (distances * velocities).sum(axis=1)
+        speed2 = (tvelocities ** 2).sum(axis=1)
+        second = speed2 + (distances * accelerations).sum(axis=1)
+        # far from the minimum, the second derivative can be negative:
+        # the curvature term is then dropped (Gauss-Newton step).
+        second = np.where(second > 0., second, speed2)
+        steps = np.where(second > 0., first / np.where(second > 0., second, 1.), 0.)
+        times -= steps
+        if np.all(np.abs(steps) <= rtol * np.abs(times)):
+            break
+    return times
+
+
 class ImpactParameter(object):
     '''Performs impact parameter calculation, and stores relevant information.'''
     
-    def __init__(self, helix, origin, jet_direction, resolution=0.):
+    def __init__(self, helix, origin, jet_direction, resolution=0., time=None):
         '''Constructs impact parameter.
         
         @param helix: the helix for which the impact parameter is
@@ -121,12 +208,12 @@ class ImpactParameter(object):
           the sign of the impact parameter
         @param resolution: resolution estimate to calculate the
           impact parameter significance
+        @param time: time of the point of closest approach, if already
+          known (see impact_parameters). Otherwise, it is computed
+          with closest_approach_times.
         
-        The impact parameter calculation involves a minimization
-        performed using the brent method of scipy.optimize.minimize_scalar.
-        The point of closest approach must be within -5 and +5 ns
-        of the helix vertex (point of reference on the helix,
-        not the primary vertex).
+        The point of closest approach is the closest one to the helix vertex
+        (point of reference on the helix, not the primary vertex).
         
         Interesting attributes:
         - helix: the corresponding helix
@@ -144,18 +231,9 @@ class ImpactParameter(object):
         '''
         self.helix = helix
         self.origin = origin
-        def distquad (time):
-            x,y,z = self.helix.coord_at_time(time)
-            dist2 = (x-origin.x())**2 + (y-origin.y())**2 + (z-origin.z())**2 
-            return dist2
-        minim_answer = scipy.optimize.minimize_scalar(
-            distquad,
-            method='brent', 
-            bracket = [-5e-9, 5e-9],
-            options={'xtol': 1e-20, 'maxiter': 1e5},
-            tol=None,
-        )
-        self.time = minim_answer.x
+        if time is None:
+            time = closest_approach_times([helix], origin)[0]
+        self.time = time
         self.vector = self.helix.point_at_time(self.time) - origin
         jet_direction = jet_direction.Unit()
         self.sign  = self.vector.Dot(jet_direction)
@@ -173,6 +251,22 @@ class ImpactParameter(object):
         lines = [ vector_desc('origin', self.origin), 
                   vector_desc('IP', self.vector), ]
         return '\n'.join(lines)
+
+
+def impact_parameters(helices, origin, jet_direction, resolutions=None):
+    '''Returns the list of the ImpactParameter objects of the helices.
+    The times of closest approach are computed for all helices at once.
+
+    @param helices: list of helices
+    @param origin: TVector3-like primary vertex
+    @param jet_direction: TVector3-like, to calculate the signs
+    @param resolutions: optional list of resolutions, one per helix
+    '''
+    if resolutions is None:
+        resolutions = [0.] * len(helices)
+    times = closest_approach_times(helices, origin)
+    return [ImpactParameter(helix, origin, jet_direction, resolution, time)
+            for helix, resolution, time in zip(helices, resolutions, times)]
         
         
 if __name__ == '__main__':
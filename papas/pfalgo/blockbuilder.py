@@ -1,4 +1,4 @@
-from heppy.papas.graphtools.DAG import Node, DAGFloodFill
+from heppy.papas.graphtools.DAG import Node
 from heppy.papas.pfalgo.pfblock import PFBlock
 from heppy.papas.graphtools.subgraphbuilder import SubgraphBuilder
 from heppy.utils.pdebug import pdebugger
@@ -50,14 +50,13 @@ class BlockBuilder(SubgraphBuilder):
         self._make_blocks()        
     
     def _make_blocks (self) :
-        ''' uses the DAGfloodfill algorithm in connection with the BlockBuilder nodes
-            to work out which elements are connected
+        ''' uses the subgraphs of connected elements found by the SubgraphBuilder
             Each set of connected elements will be used to make a new PFBlock
         ''' 
         for subgraph in self.subgraphs:
             #make the block
             block = PFBlock(subgraph, self.edges, self.startindex + len(self.blocks), subtype=self.subtype)        
-            pdebugger.info("Made {}".format(block))
+            pdebugger.info('Made %s', block)
             #put the block in the dict of blocks            
             self.blocks[block.uniqueid] = block
             
@@ -15,6 +15,8 @@ class PFBlock(object):
                underlying objects given their uniqueid
      edges : Dictionary of all the edge cominations in the block dict{edgekey : Edge}
              use  get_edge(id1,id2) to find an edge
+             The edges must not be modified once the block is made, as they are
+             also indexed by element (see linked_edges)
      
      Usage:
             block = PFBlock(element_ids,  edges, index, 'r') 
@@ -50,6 +52,29 @@ class PFBlock(object):
             key = Edge.make_key(id1, id2)
             self.edges[key] = edges[key]
 
+        #index the linked edges by element and by edge type, sorted by increasing distance
+        self._linked_edges = self._make_adjacency()
+
+    def _make_adjacency(self):
+        '''returns a dictionary {uniqueid : {edgetype : list of linked edges}},
+        in which the edgetype None gives all the linked edges.
+        Each list is sorted by increasing distance, edges with no distance coming last.
+        '''
+        adjacency = dict((uid, {None: []}) for uid in self.element_uniqueids)
+        for edge in self.edges.itervalues():
+            if not edge.linked:
+                continue
+            for uid in (edge.id1, edge.id2):
+                byedgetype = adjacency[uid]
+                byedgetype[None].append(edge)
+                byedgetype.setdefault(edge.edge_type, []).append(edge)
+        #this is a bit yucky and temporary solution as need to make sure the order returned is consistent
+        # maybe should live outside of this class
+        for byedgetype in adjacency.itervalues():
+            for linked_edges in byedgetype.itervalues():
+                linked_edges.sort(key=lambda x: (x.distance is None, x.distance))
+        return adjacency
+
     def count_ecal(self):
         ''' Counts how many ecal cluster ids are in the block '''
         count = 0
@@ -74,38 +99,25 @@ class PFBlock(object):
     def linked_edges(self, uniqueid, edgetype=None) :
         '''
         Returns list of all edges of a given edge type that are connected to a given id.
-        The list is sorted in order of increasing distance
+        The list is sorted in order of increasing distance.
+        The edges are taken from the index made at construction, so the cost only depends
+        on the number of edges of the element.
 
         Arguments:
         @param uniqueid: is the id of item of interest
         @param edgetype: is an optional type of edge. If specified only links of the given edgetype will be returned
         '''
-        linked_edges = []
-        for edge in self.edges.itervalues():
-            if edge.linked and (edge.id1 == uniqueid or edge.id2 == uniqueid):
-                if edgetype is None or ((edgetype != None) and (edge.edge_type == edgetype)):
-                    linked_edges.append(edge)
-
-
-        #this is a bit yucky and temporary solution as need to make sure the order returned is consistent
-        # maybe should live outside of this class
-        linked_edges.sort(key=lambda x: (x.distance is None, x.distance))
-        return linked_edges
+        byedgetype = self._linked_edges.get(uniqueid, None)
+        if byedgetype is None:
+            return []
+        return list(byedgetype.get(edgetype, []))
 
     def linked_ids(self, uniqueid, edgetype=None) :
         '''Returns the list of ids linked to uniqueid, sorted by increasing distance. the type of link can be specified through the parameter edgetype.
             eg block.linked_ids(trackid, "ecal_track") returns all the ids that are linked and of type "ecal_track"
             '''
-        linked_ids = []
-        linked_edges = []
-        linked_edges = self.linked_edges(uniqueid, edgetype)
-        if len(linked_edges):
-            for edge in linked_edges:
-                if edge.id1 == uniqueid:
-                    linked_ids.append(edge.id2)
-                else:
-                    linked_ids.append(edge.id1)
-        return linked_ids
+        return [edge.id2 if edge.id1 == uniqueid else edge.id1
+                for edge in self.linked_edges(uniqueid, edgetype)]
     
     def short_elements_string(self):
         ''' Construct a string description of each of the elements in a block.
@@ -1,6 +1,10 @@
+import math
+import itertools
 from blockbuilder import BlockBuilder
 from heppy.papas.graphtools.edge import Edge
-from heppy.papas.graphtools.DAG import Node
+from heppy.papas.graphtools.history import History
+from heppy.papas.data.identifier import Identifier
+from heppy.papas.pfalgo.distance import Distance
 
 class PFBlockBuilder(BlockBuilder):
     ''' PFBlockBuilder creates edges to describe distances between particle flow elements 
@@ -22,6 +26,13 @@ class PFBlockBuilder(BlockBuilder):
             builder = PFBlockBuilder(papasevent, uniqueids, ruler)
             for b in builder.blocks.itervalues() :
                 print b
+                
+        If the ruler is a Distance, the elements are first placed in a grid 
+        (see DirectionGrid), and the ruler is only called for the pairs of elements 
+        that are close enough to be linked, and then for all the pairs of elements 
+        within each block. The resulting blocks and their edges are the same 
+        as if all pairs were considered, but the edges attribute of the builder
+        does not contain the edges between distant elements. 
     '''
     def __init__(self, papasevent, uniqueids, ruler, startindex=0, subtype='r'):
         '''
@@ -39,21 +50,36 @@ class PFBlockBuilder(BlockBuilder):
         '''
         self.papasevent = papasevent
         if self.papasevent.history is None:
-            self.papasevent.history = dict((idt, Node(idt)) for idt in uniqueids)
+            self.papasevent.history = History(uniqueids)
         
-        # compute edges between each pair of nodes
+        self.ruler = ruler
+        # compute edges between each pair of nodes that could be linked
+        if isinstance(ruler, Distance):
+            objects = dict((uid, papasevent.get_object(uid)) for uid in uniqueids)
+            pairs = DirectionGrid(objects).candidate_pairs()
+        else:
+            pairs = ((id1, id2) for id1 in uniqueids for id2 in uniqueids if id1 < id2)
         edges = dict()
-
-        for id1 in uniqueids:
-            for  id2 in uniqueids:
-                if id1 < id2 :
-                    edge = self._make_edge(id1, id2, ruler)
-                    #the edge object is added into the edges dictionary
-                    edges[edge.key] = edge
+        for id1, id2 in pairs:
+            edge = self._make_edge(id1, id2, ruler)
+            #the edge object is added into the edges dictionary
+            edges[edge.key] = edge
 
         #use the underlying BlockBuilder to construct the blocks        
         super(PFBlockBuilder, self).__init__(uniqueids, edges, startindex, subtype, self.papasevent.history)
 
+    def _make_blocks(self):
+        '''adds the missing edges between the elements of each subgraph,
+        which are needed by the blocks, and makes the blocks.'''
+        for subgraph in self.subgraphs:
+            for id1, id2 in itertools.combinations(subgraph, 2):
+                key = Edge.make_key(id1, id2)
+                if key not in self.edges:
+                    if id2 < id1:
+                        id1, id2 = id2, id1
+                    self.edges[key] = self._make_edge(id1, id2, self.ruler)
+        super(PFBlockBuilder, self)._make_blocks()
+
     def _make_edge(self, id1, id2, ruler):
         ''' id1, id2 are the unique ids of the two items
             ruler is something that measures distance between two objects eg track and hcal
@@ -78,3 +104,102 @@ class PFBlockBuilder(BlockBuilder):
             
         #make the edge 
         return Edge(id1, id2, is_linked, distance) 
+
+
+class DirectionGrid(object):
+    '''Grid used to find the pairs of tracks and clusters that could be linked
+    by the L{Distance<heppy.papas.pfalgo.distance.Distance>}.
+    
+    The tracks (at their ecal_in and hcal_in points) and the clusters 
+    (each of their subclusters) are placed in a grid on the unit
+    direction vectors, separately for the ecal and hcal layers.
+    Each entry is given a radius such that two entries can only be linked
+    if the distance between their direction vectors is smaller than the 
+    sum of their radii:
+     - two clusters can only be linked if, for a pair of their subclusters,
+       deltaR(theta, phi) is below the sum of their angular sizes. 
+       The angle between the two directions is below sqrt(2) deltaR.
+     - a track and a cluster can only be linked if the track point 
+       is at a distance smaller than the size from a subcluster, 
+       so at an angle smaller than asin(size / distance to the origin). 
+    The tracks have a radius of 0. The cell size is twice the largest radius, 
+    so that only the neighbouring cells need to be considered. 
+    '''
+    
+    # relative margin on the radii, to stay conservative w.r.t. rounding errors
+    margin = 1e-6
+    
+    def __init__(self, objects):
+        '''@param objects: dictionary {uniqueid: object} of the tracks 
+           and clusters to consider
+        '''
+        self.layers = dict(ecal_in=[], hcal_in=[])
+        for uid, obj in objects.iteritems():
+            if Identifier.is_track(uid):
+                for layer, entries in self.layers.iteritems():
+                    point = obj.path.points.get(layer, None)
+                    if point is not None:
+                        entries.append( (uid, self._unit(point.X(), point.Y(), point.Z()), 0.) )
+            elif Identifier.is_ecal(uid) or Identifier.is_hcal(uid):
+                entries = self.layers[obj.layer]
+                for subcluster in obj.subclusters:
+                    entries.append( (uid, self._unit(*subcluster.xyz()),
+                                     self._radius(subcluster)) )
+
+    @staticmethod
+    def _unit(x, y, z):
+        '''returns the direction of the vector (x, y, z) as a tuple'''
+        mag = math.sqrt(x * x + y * y + z * z)
+        if mag == 0.:
+            return (0., 0., 0.)
+        return (x / mag, y / mag, z / mag)
+    
+    def _radius(self, cluster):
+        '''radius of a (sub)cluster in the grid, see class description'''
+        mag = cluster.mag()
+        if mag == 0. or cluster.size() >= mag:
+            # all directions are possible 
+            return 2.
+        radius = max(math.sqrt(2.) * cluster.angular_size(),
+                     math.asin(cluster.size() / mag))
+        return radius * (1. + self.margin) + self.margin
+
+    def candidate_pairs(self):
+        '''returns the set of pairs of ids (id1, id2), with id1 < id2, 
+        of elements that could be linked.'''
+        pairs = set()
+        for entries in self.layers.itervalues():
+            pairs.update(self._layer_pairs(entries))
+        return pairs
+            
+    def _layer_pairs(self, entries):
+        pairs = set()
+        if not entries:
+            return pairs
+        max_radius = max(radius for uid, direction, radius in entries)
+        if max_radius == 0.:
+            # no cluster
+            return pairs
+        cell_size = 2. * max_radius
+        cells = dict()
+        for entry in entries:
+            x, y, z = entry[1]
+            key = (int(math.floor(x / cell_size)),
+                   int(math.floor(y / cell_size)),
+                   int(math.floor(z / cell_size)))
+            cells.setdefault(key, []).append(entry)
+        offsets = list(itertools.product([-1, 0, 1], repeat=3))
+        for (i, j, k), cell in cells.iteritems():
+            for di, dj, dk in offsets:
+                other_cell = cells.get((i + di, j + dj, k + dk), None)
+                if other_cell is None:
+                    continue
+                for uid1, (x1, y1, z1), radius1 in cell:
+                    for uid2, (x2, y2, z2), radius2 in other_cell:
+                        if uid1 >= uid2 or radius1 + radius2 == 0.:
+                            # each pair considered once, and no track-track link
+                            continue
+                        dist2 = (x1 - x2)**2 + (y1 - y2)**2 + (z1 - z2)**2
+                        if dist2 < (radius1 + radius2)**2:
+                            pairs.add( (uid1, uid2) )
+        return pairs
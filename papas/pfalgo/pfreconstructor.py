@@ -1,8 +1,8 @@
 import math
 import copy
+import logging
+import multiprocessing
 from heppy.papas.data.identifier import Identifier
-from heppy.papas.data.historyhelper import HistoryHelper
-from heppy.papas.graphtools.edge import Edge
 from heppy.papas.graphtools.DAG import Node
 from heppy.papas.pfalgo.pfblocksplitter import BlockSplitter
 from heppy.papas.pdt import particle_data
@@ -15,6 +15,17 @@ from ROOT import TVector3, TLorentzVector
 #Discuss with colin self.locked vs ecal.locked
 #209 in reconstruct_block extra ecals to be added in
 
+#: reconstructor used by the worker processes, see PFReconstructor.reconstruct_blocks
+_worker_reconstructor = None
+
+
+def _record_blocks(blockids):
+    '''Called in the worker processes: returns the records of the
+    reconstruction of the blocks, see PFReconstructor.record_block'''
+    return [(blockid, _worker_reconstructor.record_block(blockid))
+            for blockid in blockids]
+
+
 class PFReconstructor(object):
     ''' The reconstructor takes an event containing blocks of elements
         and attempts to reconstruct particles
@@ -63,19 +74,43 @@ class PFReconstructor(object):
               reconstructed = PFReconstructor(papasevent, 'br')
               event.reconstructed_particles= sorted( reconstructed.particles,
                             key = lambda ptc: ptc.e(), reverse=True)
+
+         Parallel reconstruction:
+            The blocks are independent, and when there are at least parallel_threshold
+            blocks, they can be processed by nprocesses worker processes.
+            The workers only take the decisions: which particles are made from which
+            elements, and which elements are unused. These decisions are recorded,
+            and the particles are then made by the main process, in the same order as
+            in the serial reconstruction, so that the particle ids, the history and
+            the links to the tracks and clusters of the event are identical.
+            The parallel reconstruction is not used if the debug output or the
+            info output of the logger are enabled, as they would be written by the
+            workers in an arbitrary order.
         ''' 
     
-    def __init__(self, detector, logger):
+    def __init__(self, detector, logger, nprocesses=1, parallel_threshold=200):
+        '''@param detector: the detector, for the resolutions and the propagation
+           @param logger: logger
+           @param nprocesses: number of worker processes, 1 for a serial reconstruction
+           @param parallel_threshold: minimum number of blocks for a parallel reconstruction
+        '''
         self.detector = detector
         self.log = logger
+        self.nprocesses = nprocesses
+        self.parallel_threshold = parallel_threshold
+        self._records = None
 
     def reconstruct(self, papasevent, block_type_and_subtype):
         '''papasevent: PapasEvent containing collections of particle flow objects 
            block_type_and_subtype: which blocks collection to use'''
-        
+        self.split_blocks(papasevent, block_type_and_subtype)
+        self.reconstruct_split_blocks()
+
+    def split_blocks(self, papasevent, block_type_and_subtype):
+        '''first step of reconstruct: simplifies and splits the blocks into self.splitblocks'''
         self.unused = []
         self.papasevent = papasevent
-        self.history_helper = HistoryHelper(papasevent)
+        self.history_helper = papasevent.get_history_helper()
         self.particles = dict()
         self.splitblocks = dict()
         blocks = papasevent.get_collection(block_type_and_subtype)   
@@ -83,24 +118,89 @@ class PFReconstructor(object):
         # simplify the blocks by editing the links so that each track will end up linked to at most one hcal
         # then recalculate the blocks
         for blockid in sorted(blocks.keys(), reverse=True): #big blocks come first
-            pdebugger.info(str('Splitting {}'.format(blocks[blockid])))
+            pdebugger.info('Splitting %s', blocks[blockid])
             newblocks = self.simplify_blocks(blocks[blockid], self.papasevent.history)
             self.splitblocks.update(newblocks)      
-    
+
+    def reconstruct_split_blocks(self):
+        '''second step of reconstruct: reconstructs the particles from self.splitblocks'''
         #reconstruct each of the resulting blocks        
-        for b in sorted(self.splitblocks.keys(), reverse=True):  #put big interesting blocks first
-            sblock = self.splitblocks[b]
-            pdebugger.info('Processing {}'.format(sblock))
-            self.reconstruct_block(sblock)
-            pdebugger.info("Finished block")
+        blockids = sorted(self.splitblocks.keys(), reverse=True) #put big interesting blocks first
+        if self.is_parallel(len(blockids)):
+            self.reconstruct_blocks(blockids)
+        else:
+            for b in blockids:
+                sblock = self.splitblocks[b]
+                pdebugger.info('Processing %s', sblock)
+                self.reconstruct_block(sblock)
+                pdebugger.info("Finished block")
 
         #check if anything is unused
         if len(self.unused):
-            self.log.warning(str(self.unused))
+            self.log.warning('%s', self.unused)
         self.log.info("Particles:")
-        self.log.info(str(self))
+        self.log.info('%s', self)
         pdebugger.info("Finished reconstruction")
 
+    def is_parallel(self, nblocks):
+        '''returns True if the nblocks blocks are to be reconstructed in parallel'''
+        if self.nprocesses <= 1 or nblocks < self.parallel_threshold:
+            return False
+        if pdebugger.isEnabledFor(logging.INFO):
+            return False
+        return self.log is None or not self.log.isEnabledFor(logging.INFO)
+
+    def reconstruct_blocks(self, blockids):
+        '''reconstructs the split blocks in worker processes.
+
+        The workers are forked from this process, so that they share the event.
+        The blocks are distributed in turn to the workers, and the particles
+        are made afterwards in the order of blockids.
+        '''
+        global _worker_reconstructor
+        _worker_reconstructor = self
+        pool = multiprocessing.Pool(processes=self.nprocesses)
+        try:
+            results = pool.map(_record_blocks,
+                               [blockids[i::self.nprocesses] for i in range(self.nprocesses)])
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            _worker_reconstructor = None
+        records = dict()
+        for result in results:
+            records.update(result)
+        for blockid in blockids:
+            calls, unused = records[blockid]
+            for method, args in calls:
+                getattr(self, method)(*args)
+            self.unused.extend(unused)
+
+    def record_block(self, blockid):
+        '''reconstructs the split block with id blockid without making the particles.
+
+        returns the list of the calls to make the particles (method name, arguments),
+        and the list of unused element ids.
+        '''
+        self._records = []
+        self.unused = []
+        try:
+            self.reconstruct_block(self.splitblocks[blockid])
+            return self._records, self.unused
+        finally:
+            self._records = None
+
+    def make_particle(self, method, *args):
+        '''calls method(*args) to make a particle, or records the call
+        in a worker process'''
+        if self._records is not None:
+            self._records.append((method, args))
+            return None
+        return getattr(self, method)(*args)
+
     def simplify_blocks(self, block, history_nodes=None):
         ''' Block: a block which contains list of element ids and set of edges that connect them
             history_nodes: optional dictionary of Nodes with element identifiers in each node
@@ -114,24 +214,20 @@ class PFReconstructor(object):
          have the tracks and cluster elements as parents, and also the original block as a parent
         '''
         ids = block.element_uniqueids
-        #create a copy of the edges and unlink some of these edges if needed
-        newedges = copy.deepcopy(block.edges)
+        #the edges of the block are shared, they are only copied when they need to be unlinked
+        newedges = block.edges
         if len(ids) > 1 :   
             for uid in ids :
                 if Identifier.is_track(uid):
                     # for tracks unlink all hcals except the closest hcal
-                    linked_ids = block.linked_ids(uid, "hcal_track") # NB already sorted from small to large distance
-                    if linked_ids != None and len(linked_ids) > 1:
-                        first_hcal = True
-                        for id2 in linked_ids:
-                            newedge = newedges[Edge.make_key(uid, id2)]
-                            if first_hcal:
-                                first_dist = newedge.distance
-                                first_hcal = False
-                            else:
-                                if newedge.distance == first_dist:
-                                    pass 
-                                newedge.linked = False 
+                    linked_edges = block.linked_edges(uid, "hcal_track") # NB already sorted from small to large distance
+                    if len(linked_edges) > 1:
+                        if newedges is block.edges:
+                            newedges = dict(block.edges)
+                        for edge in linked_edges[1:]:
+                            newedge = copy.copy(edge)
+                            newedge.linked = False
+                            newedges[newedge.key] = newedge
         #create new block(s)               
         splitblocks = BlockSplitter(block.uniqueid, ids, newedges, len(self.splitblocks), 's', history_nodes).blocks
         return splitblocks
@@ -299,8 +395,8 @@ class PFReconstructor(object):
                 #thcals = [th for th in elem.linked if th.layer=='hcal_in']
                 #assert(thcals[0]==hcal)
         self.log.info(hcal)
-        self.log.info('\tT {tracks}'.format(tracks=tracks))
-        self.log.info('\tE {ecals}'.format(ecals=ecals))
+        self.log.info('\tT %s', tracks)
+        self.log.info('\tE %s', ecals)
         hcal_energy = hcal.energy
         if len(tracks):
             ecal_energy = sum(ecal.energy for ecal in ecals)
@@ -322,9 +418,7 @@ class PFReconstructor(object):
             # calo_eres = self.neutral_hadron_energy_resolution(hcal)
             calo_eres = self.neutral_hadron_energy_resolution(track_energy,
                                                               hcal.position.Eta())
-            self.log.info('dE/p, res = {derel}, {res} '.format(
-                derel=delta_e_rel,
-                res=calo_eres))
+            self.log.info('dE/p, res = %s, %s ', delta_e_rel, calo_eres)
             # if False:
             if delta_e_rel > self.nsigma_hcal(hcal) * calo_eres: # approx means hcal energy + ecal energies > track energies
                 excess = delta_e_rel * track_energy # energy in excess of track energies
@@ -363,17 +457,11 @@ class PFReconstructor(object):
         '''
         if self.locked[cluster.uniqueid]:
             return 
-        if vertex is None:
-            vertex = TVector3()
         pdg_id = None
-        propagate_to = None
         if layer=='ecal_in':
             pdg_id = 22 #photon
-            propagate_to = [ self.detector.elements['ecal'].volume.inner ]
         elif layer=='hcal_in':
             pdg_id = 130 #K0
-            propagate_to = [ self.detector.elements['ecal'].volume.inner,
-                             self.detector.elements['hcal'].volume.inner ]
         else:
             raise ValueError('layer must be equal to ecal_in or hcal_in')
         assert(pdg_id)
@@ -382,6 +470,21 @@ class PFReconstructor(object):
             energy = cluster.energy
         if energy < mass: 
             return None 
+        self.locked[cluster.uniqueid] = True #just OK but not nice if hcal used to make ecal.
+        self.make_particle('make_cluster_particle', cluster.uniqueid, layer, pdg_id,
+                           parent_ids, energy, vertex)
+
+    def make_cluster_particle(self, clusterid, layer, pdg_id, parent_ids, energy, vertex=None):
+        '''makes the particle of type pdg_id from the cluster, see reconstruct_cluster'''
+        cluster = self.papasevent.get_object(clusterid)
+        if vertex is None:
+            vertex = TVector3()
+        if layer == 'ecal_in':
+            propagate_to = [ self.detector.elements['ecal'].volume.inner ]
+        else:
+            propagate_to = [ self.detector.elements['ecal'].volume.inner,
+                             self.detector.elements['hcal'].volume.inner ]
+        mass, charge = particle_data[pdg_id]
         if mass == 0:
             momentum = energy #avoid sqrt for zero mass
         else:
@@ -397,8 +500,7 @@ class PFReconstructor(object):
                                      propagate_to)
         #merge Nov 10th 2016 not sure about following line (was commented out in papasevent branch)
         particle.clusters[layer] = cluster  # not sure about this either when hcal is used to make an ecal cluster?
-        self.locked[cluster.uniqueid] = True #just OK but not nice if hcal used to make ecal.
-        pdebugger.info(str('Made {} from {}'.format(particle, cluster)))
+        pdebugger.info('Made %s from %s', particle, cluster)
         self.insert_particle(parent_ids, particle)        
         
     def reconstruct_track(self, track, pdgid, parent_ids,
@@ -407,6 +509,12 @@ class PFReconstructor(object):
         '''
         if self.locked[track.uniqueid]:
             return 
+        self.locked[track.uniqueid] = True
+        return self.make_particle('make_track_particle', track.uniqueid, pdgid, parent_ids)
+
+    def make_track_particle(self, trackid, pdgid, parent_ids):
+        '''makes the particle from the track, see reconstruct_track'''
+        track = self.papasevent.get_object(trackid)
         vertex = track.path.points['vertex']
         pdgid = pdgid * track.charge
         mass, charge = particle_data[pdgid]
@@ -415,8 +523,7 @@ class PFReconstructor(object):
         particle = Particle(p4, vertex, charge, pdgid, len(self.particles), subtype='r')
         #todo fix this so it picks up smeared track points (need to propagagte smeared track)
         particle.set_track(track) #refer to existing track rather than make a new one
-        self.locked[track.uniqueid] = True
-        pdebugger.info(str('Made {} from {}'.format(particle, track)))
+        pdebugger.info('Made %s from %s', particle, track)
         self.insert_particle(parent_ids, particle)
         return particle
 
@@ -0,0 +1,56 @@
+import unittest
+from heppy.papas.data.identifier import Identifier
+from heppy.papas.graphtools.edge import Edge
+from heppy.papas.pfalgo.pfblock import PFBlock
+from heppy.papas.pfalgo.pfreconstructor import PFReconstructor
+
+
+class TestPFBlock(unittest.TestCase):
+
+    def setUp(self):
+        '''one track linked to two hcals and one ecal,
+        and one ecal linked to the first hcal by an ecal_hcal edge.
+        '''
+        Identifier.reset()
+        self.track = Identifier.make_id(Identifier.PFOBJECTTYPE.TRACK, 1, 't', 5.)
+        self.ecal = Identifier.make_id(Identifier.PFOBJECTTYPE.ECALCLUSTER, 2, 't', 2.)
+        self.hcal1 = Identifier.make_id(Identifier.PFOBJECTTYPE.HCALCLUSTER, 3, 't', 4.)
+        self.hcal2 = Identifier.make_id(Identifier.PFOBJECTTYPE.HCALCLUSTER, 4, 't', 3.)
+        self.ids = [self.track, self.ecal, self.hcal1, self.hcal2]
+        self.edges = dict()
+        for id1, id2, linked, dist in [(self.track, self.ecal, True, 0.01),
+                                       (self.track, self.hcal1, True, 0.2),
+                                       (self.track, self.hcal2, True, 0.1),
+                                       (self.ecal, self.hcal1, False, None),
+                                       (self.ecal, self.hcal2, False, None),
+                                       (self.hcal1, self.hcal2, False, None)]:
+            edge = Edge(id1, id2, linked, dist)
+            self.edges[edge.key] = edge
+        self.block = PFBlock(self.ids, self.edges, 0, 'r')
+
+    def test_linked_ids(self):
+        block = self.block
+        self.assertEqual(block.linked_ids(self.track),
+                         [self.ecal, self.hcal2, self.hcal1])
+        self.assertEqual(block.linked_ids(self.track, "hcal_track"),
+                         [self.hcal2, self.hcal1])
+        self.assertEqual(block.linked_ids(self.track, "hcal_hcal"), [])
+        self.assertEqual(block.linked_ids(self.hcal1), [self.track])
+        edges = block.linked_edges(self.track, "ecal_track")
+        self.assertEqual(len(edges), 1)
+        self.assertTrue(edges[0] is block.get_edge(self.track, self.ecal))
+
+    def test_simplify(self):
+        reconstructor = PFReconstructor(None, None)
+        reconstructor.splitblocks = dict()
+        splitblocks = reconstructor.simplify_blocks(self.block)
+        self.assertEqual(sorted(block.short_info() for block in splitblocks.values()),
+                         ['E1H1T1', 'H1'])
+        # the original block is not modified
+        self.assertTrue(self.block.get_edge(self.track, self.hcal1).linked)
+        self.assertEqual(self.block.linked_ids(self.track, "hcal_track"),
+                         [self.hcal2, self.hcal1])
+
+
+if __name__ == '__main__':
+    unittest.main()
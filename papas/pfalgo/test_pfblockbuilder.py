@@ -0,0 +1,85 @@
+import unittest
+import math
+import random
+from ROOT import TVector3
+from heppy.papas.pfobjects import Cluster, MergedCluster, Track
+from heppy.papas.data.papasevent import PapasEvent
+from heppy.papas.pfalgo.pfblockbuilder import PFBlockBuilder, DirectionGrid
+from heppy.papas.pfalgo.distance import Distance
+
+
+class Path(object):
+    '''path with only the points needed by the distance'''
+    def __init__(self, points):
+        self.points = points
+
+
+def position(theta, phi, radius):
+    return TVector3(radius * math.sin(theta) * math.cos(phi),
+                    radius * math.sin(theta) * math.sin(phi),
+                    radius * math.cos(theta))
+
+
+class TestPFBlockBuilder(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(0xdeadbeef)
+        self.papasevent = PapasEvent(0)
+        ecals, hcals, tracks = dict(), dict(), dict()
+        for i in range(40):
+            # including directions close to the beam axis
+            theta = random.choice([random.uniform(0., math.pi), 0.01])
+            phi = random.uniform(-math.pi, math.pi)
+            ecal = Cluster(5., position(theta, phi, 1.3), 0.05, 'ecal_in', i)
+            other = Cluster(5., position(theta + 0.05, phi, 1.3), 0.05, 'ecal_in', 100 + i)
+            merged = MergedCluster([ecal, other], i)
+            ecals[merged.uniqueid] = merged
+            hcal = Cluster(5., position(theta, phi + 0.2, 1.9), 0.2, 'hcal_in', i)
+            hcals[hcal.uniqueid] = hcal
+            theta = random.uniform(0., math.pi)
+            points = dict(ecal_in=position(theta, phi, 1.3))
+            if i % 4:
+                points['hcal_in'] = position(theta, phi, 1.9)
+            track = Track(position(theta, phi, 10.), 1, Path(points), i)
+            tracks[track.uniqueid] = track
+        for collection in [ecals, hcals, tracks]:
+            self.papasevent.add_collection(collection)
+        self.ids = ecals.keys() + hcals.keys() + tracks.keys()
+
+    def test_same_blocks(self):
+        '''the grid must give the same blocks and edges as all pairs'''
+        distance = Distance()
+        self.papasevent.history = None
+        builder = PFBlockBuilder(self.papasevent, self.ids, distance)
+        self.papasevent.history = None
+        # any ruler which is not a Distance leads to the computation of all pairs
+        reference = PFBlockBuilder(self.papasevent, self.ids,
+                                   lambda ele1, ele2: distance(ele1, ele2))
+        self.assertTrue(len(builder.edges) < len(reference.edges))
+        self.assertEqual(sorted(builder.blocks.keys()),
+                         sorted(reference.blocks.keys()))
+        for uid, block in builder.blocks.iteritems():
+            ref_block = reference.blocks[uid]
+            self.assertEqual(block.element_uniqueids, ref_block.element_uniqueids)
+            self.assertEqual(sorted(block.edges.keys()), sorted(ref_block.edges.keys()))
+            for key, edge in block.edges.iteritems():
+                ref_edge = ref_block.edges[key]
+                self.assertEqual((edge.id1, edge.id2, edge.linked, edge.distance),
+                                 (ref_edge.id1, ref_edge.id2, ref_edge.linked,
+                                  ref_edge.distance))
+
+    def test_grid(self):
+        objects = dict((uid, self.papasevent.get_object(uid)) for uid in self.ids)
+        pairs = DirectionGrid(objects).candidate_pairs()
+        distance = Distance()
+        for id1 in self.ids:
+            for id2 in self.ids:
+                if id1 < id2 and (id1, id2) not in pairs:
+                    link_type, is_linked, dist = distance(
+                        self.papasevent.get_object(id1),
+                        self.papasevent.get_object(id2))
+                    self.assertFalse(is_linked)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import math
+import random
+import logging
+from ROOT import TLorentzVector, TVector3
+from heppy.papas.detectors.CMS import CMS
+from heppy.papas.simulator import Simulator
+from heppy.papas.pfobjects import Particle
+from heppy.papas.data.papasevent import PapasEvent
+from heppy.papas.pfalgo.distance import Distance
+from heppy.papas.mergedclusterbuilder import MergedClusterBuilder
+from heppy.papas.pfalgo.pfblockbuilder import PFBlockBuilder
+from heppy.papas.pfalgo.pfreconstructor import PFReconstructor
+import heppy.statistics.rrandom as rrandom
+
+
+def make_event(nparticles, detector):
+    '''simulates nparticles particles, and builds the blocks of the event'''
+    rand = random.Random(0xdead)
+    rrandom.seed(0xbeef)
+    papasevent = PapasEvent(0)
+    ptcs = []
+    for i in range(nparticles):
+        pdgid, charge, mass = rand.choice([(211, 1, 0.139), (-211, -1, 0.139),
+                                           (130, 0, 0.497), (22, 0, 0.),
+                                           (11, -1, 0.000511), (13, -1, 0.105)])
+        tlv = TLorentzVector()
+        tlv.SetPtEtaPhiM(rand.expovariate(1 / 5.) + 0.3, rand.uniform(-2.5, 2.5),
+                         rand.uniform(-math.pi, math.pi), mass)
+        ptcs.append(Particle(tlv, TVector3(0, 0, 0), charge, pdgid, i))
+    simulator = Simulator(detector, logging.getLogger('test_pfreconstructor'))
+    simulator.simulate(ptcs, papasevent.history)
+    for collection in [simulator.simulated_particles, simulator.true_tracks,
+                       simulator.smeared_tracks, simulator.true_ecals, simulator.smeared_ecals,
+                       simulator.true_hcals, simulator.smeared_hcals]:
+        papasevent.add_collection(collection)
+    ruler = Distance()
+    for name in ['es', 'hs']:
+        papasevent.add_collection(MergedClusterBuilder(papasevent.get_collection(name),
+                                                       ruler, papasevent.history).merged_clusters)
+    ids = papasevent.get_collection('ts').keys() + papasevent.get_collection('em').keys() + \
+          papasevent.get_collection('hm').keys()
+    papasevent.add_collection(PFBlockBuilder(papasevent, ids, ruler).blocks)
+    return papasevent
+
+
+class TestPFReconstructor(unittest.TestCase):
+
+    def reconstruct(self, nprocesses):
+        detector = CMS()
+        papasevent = make_event(300, detector)
+        reconstructor = PFReconstructor(detector, logging.getLogger('test_pfreconstructor'),
+                                        nprocesses=nprocesses, parallel_threshold=10)
+        self.assertEqual(reconstructor.is_parallel(len(papasevent.get_collection('br'))),
+                         nprocesses > 1)
+        reconstructor.reconstruct(papasevent, 'br')
+        particles = [(uid, ptc.pdgid(), ptc.e(), ptc.path.points.keys(),
+                      ptc.track.uniqueid if ptc.track else None,
+                      [(layer, cluster.uniqueid)
+                       for layer, cluster in sorted(ptc.clusters.items())])
+                     for uid, ptc in sorted(reconstructor.particles.items())]
+        return particles, papasevent.history.links(), reconstructor.unused
+
+    def test_parallel(self):
+        particles, links, unused = self.reconstruct(1)
+        self.assertTrue(len(particles) > 100)
+        self.assertEqual(self.reconstruct(3), (particles, links, unused))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@ from heppy.particles.tlv.particle import Particle as BaseParticle
 from heppy.utils.deltar import deltaR
 from heppy.papas.data.identifier import Identifier
 from heppy.configuration import Collider
+from heppy.particles.tlv.lorentzvector import _eta, _theta, _phi
 from ROOT import TVector3
 
 #add angular size needs to be fixed since at the moment the angluar size is set by the first elementsize
@@ -19,8 +20,12 @@ class PFObject(object):
     linked : list of PFObjects linked to this one
     locked : already used in the particle flow algorithm
     block_label : label of the block the PFObject belongs to. The block label is a unique identifier for the block.
+
+    The PFObjects are slotted, as many of them are created in each event:
+    attributes cannot be added to them on the fly.
     '''
 
+    __slots__ = ('linked', 'locked', 'block_label', 'uniqueid')
 
     def __init__(self, pfobjecttype, index, subtype='u', identifiervalue = 0.0):
         '''@param pfobjecttype: type of the object to be created (used in Identifier class) eg Identifier.PFOBJECTTYPE.ECALCLUSTER
@@ -62,8 +67,15 @@ class Cluster(PFObject):
      so: put mother in Cluster
      define the identifier outside?
     or stay as it is, but do not do any work in the child SmearedCluster and MergedCluster classes
+
+    The position is stored as three floats, and the TVector3 position is only
+    created when requested. It must then not be modified in place:
+    set a new position instead, e.g. cluster.position = new_position.
     '''
 
+    __slots__ = ('subtype', 'energy', 'pt', 'layer', 'particle', 'subclusters',
+                 '_x', '_y', '_z', '_position', '_size', '_angularsize')
+
     #TODO: not sure this plays well with SmearedClusters
     max_energy = 0.
 
@@ -79,6 +91,7 @@ class Cluster(PFObject):
             super(Cluster, self).__init__(Identifier.PFOBJECTTYPE.HCALCLUSTER, index, self.subtype, identifiervalue)
         else :
             assert (False)
+        self._position = None
         self.position = position
         self.set_energy(energy)
         self.set_size(float(size_m))
@@ -87,11 +100,35 @@ class Cluster(PFObject):
         self.subclusters = [self]
         # self.absorbed = []
 
+    @property
+    def position(self):
+        '''position of the cluster, as a TVector3 created on first request'''
+        if self._position is None:
+            self._position = TVector3(self._x, self._y, self._z)
+        return self._position
+
+    @position.setter
+    def position(self, position):
+        self._x, self._y, self._z = position.X(), position.Y(), position.Z()
+        self._position = None
+
+    def xyz(self):
+        '''Returns the position as a tuple of floats (x, y, z).'''
+        return self._x, self._y, self._z
+
+    def mag(self):
+        '''Returns the distance of the cluster to the origin.'''
+        return math.sqrt(self._x * self._x + self._y * self._y + self._z * self._z)
+
+    def eta(self):
+        '''Returns the pseudo-rapidity of the cluster position.'''
+        return _eta(self._x, self._y, self._z)
+
     def set_size(self, value):
         '''Set cluster radius in cm.'''
         self._size = value
         try:
-            self._angularsize = math.atan(self._size / self.position.Mag())
+            self._angularsize = math.atan(self._size / self.mag())
         except:
             import pdb; pdb.set_trace()
 
@@ -118,10 +155,10 @@ class Cluster(PFObject):
         #we have a link if any of the subclusters overlap
         #the distance is the distance betewen the weighted centres of each (merged) cluster
 
-        dist = deltaR(self.position.Theta(),
-                      self.position.Phi(),
-                      other.position.Theta(),
-                      other.position.Phi())
+        dist = deltaR(_theta(self._x, self._y, self._z),
+                      _phi(self._x, self._y),
+                      _theta(other._x, other._y, other._z),
+                      _phi(other._x, other._y))
 
         for c in self.subclusters:
             for o in  other.subclusters:
@@ -134,25 +171,28 @@ class Cluster(PFObject):
     def is_inside_cluster(self, other):
         '''TODO change name to "overlaps" ? '''
         #now we have original unmerged clusters so we can compare directly to see if they overlap
-        dR = deltaR(self.position.Theta(),
-                    self.position.Phi(),
-                    other.position.Theta(),
-                    other.position.Phi())
+        dR = deltaR(_theta(self._x, self._y, self._z),
+                    _phi(self._x, self._y),
+                    _theta(other._x, other._y, other._z),
+                    _phi(other._x, other._y))
         link_ok = dR < self.angular_size() + other.angular_size()
         return link_ok, dR
 
 
     def is_inside(self, point):
         """check if the point lies within the "size" circle of each of the subclusters"""
+        x, y, z = point.X(), point.Y(), point.Z()
         subdist = []
+        subdists = []
         for subc in self.subclusters:
-            dist = (subc.position - point).Mag()
+            dx, dy, dz = subc._x - x, subc._y - y, subc._z - z
+            dist = math.sqrt(dx * dx + dy * dy + dz * dz)
+            subdists.append(dist)
             if dist < subc.size():
                 subdist.append(dist)
         if len(subdist):
             return True, min(subdist)
 
-        subdists = [(subc.position - point).Mag() for subc in self.subclusters]
         dist = min(subdists)
         return False, dist
     
@@ -160,11 +200,12 @@ class Cluster(PFObject):
     def __iadd__(self, other):
         if other.layer != self.layer:
             raise ValueError('can only add a cluster from the same layer')
-        position = self.position * self.energy + other.position * other.energy
         energy = self.energy + other.energy
         denom = 1/energy
-        position *= denom
-        self.position = position
+        self._x = (self._x * self.energy + other._x * other.energy) * denom
+        self._y = (self._y * self.energy + other._y * other.energy) * denom
+        self._z = (self._z * self.energy + other._z * other.energy) * denom
+        self._position = None
         self.energy = energy
         assert (len(other.subclusters) == 1)
         self.subclusters.extend(other.subclusters)
@@ -177,7 +218,11 @@ class Cluster(PFObject):
         self.energy = energy
         if energy > self.__class__.max_energy:
             self.__class__.max_energy = energy
-        self.pt = energy * self.position.Unit().Perp()
+        # as energy * position.Unit().Perp()
+        mag2 = self._x * self._x + self._y * self._y + self._z * self._z
+        norm = 1. / math.sqrt(mag2) if mag2 > 0. else 1.
+        ux, uy = self._x * norm, self._y * norm
+        self.pt = energy * math.sqrt(ux * ux + uy * uy)
 
     # fancy but I prefer the other solution
     # def __setattr__(self, name, value):
@@ -191,8 +236,8 @@ class Cluster(PFObject):
         subclusterstr += ")"
         return '{energy:7.2f} {theta:5.2f} {phi:5.2f} {sub}'.format(
             energy=self.energy,
-            theta=math.pi/2. - self.position.Theta(),
-            phi=self.position.Phi(),
+            theta=math.pi/2. - _theta(self._x, self._y, self._z),
+            phi=_phi(self._x, self._y),
             sub=subclusterstr
         )
 
@@ -202,6 +247,9 @@ class Cluster(PFObject):
         )
 
 class SmearedCluster(Cluster):
+
+    __slots__ = ('mother',)
+
     def __init__(self, mother, *args, **kwargs):
         self.mother = mother
         self.subtype = 's'
@@ -210,20 +258,26 @@ class SmearedCluster(Cluster):
 class MergedCluster(Cluster):
     '''The MergedCluster is used to hold a cluster that has been merged from other clusters '''
 
+    __slots__ = ()
+
     def __init__(self, clusters, index=0, identifiervalue=None):
         '''identifiervalue will be used to help create the merged cluster unique identifier'''
-        position = None
+        x = y = z = 0.
         energy = 0.
         firstcluster = None
         for cluster in clusters:
             if not firstcluster:
                 firstcluster = cluster
-                position = cluster.position * cluster.energy
+                x, y, z = (cluster._x * cluster.energy, cluster._y * cluster.energy,
+                           cluster._z * cluster.energy)
                 energy = cluster.energy
             else:
-                position += cluster.position * cluster.energy
+                x += cluster._x * cluster.energy
+                y += cluster._y * cluster.energy
+                z += cluster._z * cluster.energy
                 energy += cluster.energy
-        position *= (1./energy)           
+        denom = 1./energy
+        position = TVector3(x * denom, y * denom, z * denom)
         self.subtype = 'm'
         super(MergedCluster, self).__init__(energy, position, firstcluster._size, firstcluster.layer, index, identifiervalue=energy)
         self.subclusters = clusters 
@@ -232,11 +286,12 @@ class MergedCluster(Cluster):
         '''TODO: why not using iadd from base class'''
         if other.layer != self.layer:
             raise ValueError('can only add a cluster from the same layer')
-        position = self.position * self.energy + other.position * other.energy
         energy = self.energy + other.energy
         denom = 1/energy
-        position *= denom
-        self.position = position
+        self._x = (self._x * self.energy + other._x * other.energy) * denom
+        self._y = (self._y * self.energy + other._y * other.energy) * denom
+        self._z = (self._z * self.energy + other._z * other.energy) * denom
+        self._position = None
         self.energy = energy
         self.subclusters.extend([other])
 
@@ -249,31 +304,54 @@ class Track(PFObject):
     - p3 : momentum in 3D space (px, py, pz)
     - charge : particle charge
     - path : contains the trajectory parameters and points
+
+    The momentum is stored as three floats, and the TVector3 returned by p3()
+    is only created when requested.
     '''
-    
+
+    __slots__ = ('subtype', 'charge', 'path', 'particle',
+                 '_px', '_py', '_pz', '_p3')
+
+    layer = 'tracker'
+
     def __init__(self, p3, charge, path, index=0, particle=None, subtype='t'):
         if not hasattr(self, 'subtype'):
             self.subtype = subtype        
-        super(Track, self).__init__(Identifier.PFOBJECTTYPE.TRACK, index, self.subtype, p3.Mag())
+        self._px, self._py, self._pz = p3.X(), p3.Y(), p3.Z()
+        self._p3 = None
+        super(Track, self).__init__(Identifier.PFOBJECTTYPE.TRACK, index, self.subtype, self.p())
 
-        self._p3 = p3
         self.charge = charge
         self.path = path
         self.particle = particle
-        self.layer = 'tracker'
 
     def p3(self):
+        if self._p3 is None:
+            self._p3 = TVector3(self._px, self._py, self._pz)
         return self._p3
 
+    def xyz(self):
+        '''Returns the momentum as a tuple of floats (px, py, pz).'''
+        return self._px, self._py, self._pz
+
+    def p(self):
+        return math.sqrt(self._px * self._px + self._py * self._py + self._pz * self._pz)
+
+    def pt(self):
+        return math.sqrt(self._px * self._px + self._py * self._py)
+
+    def eta(self):
+        return _eta(self._px, self._py, self._pz)
+
     def theta(self):
-        return math.pi/2. - self._p3.Theta()
+        return math.pi/2. - _theta(self._px, self._py, self._pz)
 
     def info(self):
         return '{p:7.2f} {pt:7.2f} {theta:5.2f} {phi:5.2f}'.format(
-            pt=self._p3.Perp(),
-            p=self._p3.Mag(),
+            pt=self.pt(),
+            p=self.p(),
             theta=self.theta(),
-            phi=self._p3.Phi()
+            phi=_phi(self._px, self._py)
         )
 
     def short_info(self):
@@ -283,6 +361,8 @@ class Track(PFObject):
 
     
 class SmearedTrack(Track):
+
+    __slots__ = ('mother',)
     
     def __init__(self, mother, *args, **kwargs):
         self.mother = mother
@@ -305,6 +385,7 @@ class Particle(BaseParticle):
         self.uniqueid = Identifier.make_id(Identifier.PFOBJECTTYPE.PARTICLE, index, subtype, idvalue)
         self.vertex = vertex
         self.path = None
+        self.propagated = dict() # propagation results by cylinder, see propagator.py
         self.clusters = dict()
         self.track = None # to match cpp 
         self.clusters_smeared = dict()
@@ -324,6 +405,9 @@ class Particle(BaseParticle):
 
     def set_path(self, path, option=None):
         if option == 'w' or self.path is None:
+            if self.path is not None and path is not self.path:
+                # the propagation results of the previous path are obsolete
+                self.propagated.clear()
             self.path = path
             if self.q(): # todo check this is OK for multiple scattering?
                 if self.track:
@@ -333,6 +417,8 @@ class Particle(BaseParticle):
     
     def set_track(self, track):
         self.track = track 
+        if self.path is not None and track.path is not self.path:
+            self.propagated.clear()
         self.path = track.path;
 
     def short_info(self):
@@ -1,6 +1,8 @@
 from vectors import Point
 import math
 import copy
+import numpy as np
+from scipy import constants
 from ROOT import TVector3
 from geotools import circle_intersection
 from papas_exceptions import PropagationError
@@ -10,23 +12,94 @@ class Info(object):
     pass
 
 class Propagator(object):
+    '''Propagates particles to surface cylinders.
+
+    The result of the propagation of a particle to a cylinder is cached
+    in the particle (see pfobjects.Particle.propagated), so that repeated
+    requests for the same cylinder are free. The cache assumes that
+    the 4-momentum and vertex of the particle are not modified.
+    It is cleared when the path of the particle is replaced,
+    see pfobjects.Particle.set_path.
+
+    The cache can be filled for many particles and cylinders at once with
+    precompute, which does all the calculations with numpy arrays.
+    The points are only added to the path of the particle when
+    propagate_one is called, so that particle.path.points is filled
+    in the same way as without the cache.
+    '''
 
     def propagate(self, particles, cylinders, *args, **kwargs):
         for ptc in particles:
             for cyl in cylinders:
                 self.propagate_one(ptc, cyl, *args, **kwargs)
-                
-                
-class StraightLinePropagator(Propagator):        
 
-    def propagate_one(self, particle, cylinder, dummy=None):
-        line = StraightLine(particle.p4(), particle.vertex) 
-        particle.set_path( line ) # TODO 
+    def propagate_one(self, particle, cylinder, field=None):
+        '''propagates particle to cylinder, adding the intersection point
+        to particle.points if there is one.'''
+        key = self.cache_key(cylinder, field)
+        result = particle.propagated.get(key, None)
+        path = None
+        if result is None:
+            path = self.make_path(particle, field)
+            result = self.destination(particle, path, cylinder)
+            particle.propagated[key] = result
+        if particle.path is None:
+            if path is None:
+                path = self.make_path(particle, field)
+            particle.set_path(path)
+        destination, info = result
+        if destination is not None:
+            particle.points[cylinder.name] = destination
+        return info
+
+    def precompute(self, particles, cylinders, field=None):
+        '''computes the propagation of all particles to all cylinders
+        with numpy, and stores the results in the cache of the particles.
+        The rare cases that are not handled here (e.g. particles going exactly
+        along the transverse plane) are left to propagate_one.'''
+        particles = list(particles)
+        if not particles or not cylinders:
+            return
+        p4s = np.array([(p4.Px(), p4.Py(), p4.Pz(), p4.E())
+                        for p4 in (ptc.p4() for ptc in particles)])
+        vertices = np.array([(ptc.vertex.X(), ptc.vertex.Y(), ptc.vertex.Z())
+                             for ptc in particles])
+        charges = np.array([ptc.q() for ptc in particles], dtype=float)
+        for cylinder in cylinders:
+            key = self.cache_key(cylinder, field)
+            todo = np.array([key not in ptc.propagated for ptc in particles])
+            if not todo.any():
+                continue
+            valid, found, points, is_looper = self.destinations(
+                charges, p4s, vertices, cylinder, field)
+            for i in np.flatnonzero(todo & valid):
+                result = None, None
+                if found[i]:
+                    result = (TVector3(*points[i]),
+                              self.info(p4s[i], is_looper[i]))
+                particles[i].propagated[key] = result
+
+    def info(self, p4, is_looper):
+        '''returns the information on the propagation, see destination'''
+        return None
+
+
+class StraightLinePropagator(Propagator):
+
+    def cache_key(self, cylinder, field):
+        return cylinder.name, cylinder.rad, cylinder.z
+
+    def make_path(self, particle, field):
+        return StraightLine(particle.p4(), particle.vertex)
+
+    def destination(self, particle, line, cylinder):
+        '''returns the intersection point of the line and the cylinder,
+        or None, and None as there is no information on the propagation'''
         theta = line.udir.Theta()
         if abs(line.origin.Z()) > cylinder.z or \
            line.origin.Perp() > cylinder.rad:
-            return # particle created outside the cylinder
-        if line.udir.Z(): 
+            return None, None # particle created outside the cylinder
+        if line.udir.Z():
             destz = cylinder.z if line.udir.Z() > 0. else -cylinder.z
             length = (destz - line.origin.Z())/math.cos(theta)
             if length < 0:
@@ -47,34 +120,73 @@ class StraightLinePropagator(Propagator):
                 c= originxy.Mag2()-cylinder.rad**2
                 delta = b**2 - 4*a*c
                 if delta<0:
-                    return 
+                    return None, None
                     # raise PropagationError(particle)
                 km = (-b - math.sqrt(delta))/(2*a)
                 # positive propagation -> correct solution.
                 kp = (-b + math.sqrt(delta))/(2*a)
                 # print delta, km, kp
-                destination = line.origin + line.udir * kp  
-        #TODO deal with Z == 0 
+                destination = line.origin + line.udir * kp
+        #TODO deal with Z == 0
         #TODO deal with overlapping cylinders
-        particle.points[cylinder.name] = destination
+        return destination, None
+
+    def destinations(self, charges, p4s, origins, cylinder, field):
+        '''vectorized version of destination, for arrays of 4-momenta (px, py, pz, e)
+        and origins (x, y, z).
+        returns the arrays:
+         - valid: False where the calculation must be done by destination
+         - found: True where there is an intersection point
+         - points: the intersection points
+         - is_looper: always False
+        '''
+        udirs = _unit(p4s[:, :3])
+        ux, uy, uz = udirs.T
+        ox, oy, oz = origins.T
+        theta = np.arctan2(np.sqrt(ux * ux + uy * uy), uz)
+        inside = ~((np.abs(oz) > cylinder.z) | (np.sqrt(ox * ox + oy * oy) > cylinder.rad))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            destz = np.where(uz > 0., cylinder.z, -cylinder.z)
+            length = (destz - oz) / np.cos(theta)
+            points = origins + udirs * length[:, np.newaxis]
+            rdest = np.sqrt(points[:, 0] ** 2 + points[:, 1] ** 2)
+            barrel = rdest > cylinder.rad
+            a = ux * ux + uy * uy
+            b = 2 * (ux * ox + uy * oy)
+            c = (ox * ox + oy * oy) - cylinder.rad ** 2
+            delta = b ** 2 - 4 * a * c
+            kp = (-b + np.sqrt(delta)) / (2 * a)
+            barrel_points = origins + udirs * kp[:, np.newaxis]
+        points = np.where(barrel[:, np.newaxis], barrel_points, points)
+        found = inside & ~(barrel & (delta < 0))
+        valid = ~inside | ((uz != 0) & (length >= 0))
+        return valid, found, points, np.zeros(len(p4s), dtype=bool)
+
 
-        
 class HelixPropagator(Propagator):
-    
-    def propagate_one(self, particle, cylinder, field, debug_info=None):
-        helix = Helix(field, particle.q(), particle.p4(),
-                      particle.vertex)
-        particle.set_path(helix)
+
+    def cache_key(self, cylinder, field):
+        return cylinder.name, cylinder.rad, cylinder.z, field
+
+    def make_path(self, particle, field):
+        return Helix(field, particle.q(), particle.p4(),
+                     particle.vertex)
+
+    def destination(self, particle, helix, cylinder):
+        '''returns the intersection point of the helix and the cylinder, or None,
+        and an Info object telling whether the particle is a looper,
+        or None if the intersection could not be computed.'''
+        destination = None
         is_looper = helix.extreme_point_xy.Mag() < cylinder.rad
         is_positive = particle.p4().Z() > 0.
         if not is_looper:
-            try: 
+            try:
                 xm, ym, xp, yp = circle_intersection(helix.center_xy.X(),
                                                      helix.center_xy.Y(),
                                                      helix.rho,
                                                      cylinder.rad )
             except ValueError:
-                return
+                return None, None
                 # raise PropagationError(particle)
             # particle.points[cylinder.name+'_m'] = Point(xm,ym,0)
             # particle.points[cylinder.name+'_p'] = Point(xp,yp,0)
@@ -85,9 +197,7 @@ class HelixPropagator(Propagator):
             if destination.Z()*helix.udir.Z()<0.:
                 dest_time = helix.time_at_phi(phi_m)
                 destination = helix.point_at_time(dest_time)
-            if abs(destination.Z())<cylinder.z:
-                particle.points[cylinder.name] = destination
-            else:
+            if abs(destination.Z())>=cylinder.z:
                 is_looper = True
         if is_looper:
             # extrapolating to endcap
@@ -95,20 +205,133 @@ class HelixPropagator(Propagator):
             dest_time = helix.time_at_z(destz)
             destination = helix.point_at_time(dest_time)
             # destz = cylinder.z if positive else -cylinder.z
-            particle.points[cylinder.name] = destination
 
-            
         info = Info()
         info.is_positive = is_positive
         info.is_looper = is_looper
+        return destination, info
+
+    def info(self, p4, is_looper):
+        info = Info()
+        info.is_positive = p4[2] > 0.
+        info.is_looper = bool(is_looper)
         return info
-        
+
+    def destinations(self, charges, p4s, origins, cylinder, field):
+        '''vectorized version of destination, see StraightLinePropagator.destinations.
+        is_looper tells whether the particle is a looper, where found is True.'''
+        n = len(p4s)
+        px, py, pz, e = p4s.T
+        ox, oy, oz = origins.T
+        rad = cylinder.rad
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # helix parameters, see path.Helix
+            uz = _unit(p4s[:, :3])[:, 2]
+            p2 = px * px + py * py + pz * pz
+            beta = np.sqrt(p2) / e
+            m2 = e * e - p2
+            mass = np.where(m2 < 0., -np.sqrt(-m2), np.sqrt(m2))
+            gamma = 1. / np.sqrt(1. - beta * beta)
+            rho = np.sqrt(px * px + py * py) / (np.abs(charges) * field) * 1e9 / constants.c
+            vw_factor = 1. / (charges * field) * 1e9 / constants.c
+            vwx, vwy = px * vw_factor, py * vw_factor
+            omega = charges * field * constants.c ** 2 / (mass * gamma * 1e9)
+            vz = beta * constants.c * uz
+            perp = _unit(np.column_stack([-py, px, np.zeros(n)]))
+            cx = ox - charges * perp[:, 0] * rho
+            cy = oy - charges * perp[:, 1] * rho
+            phi0 = np.arctan2(oy - cy, ox - cx)
+            cmag = np.sqrt(cx * cx + cy * cy)
+            centered = (cx == 0.) & (cy == 0.)
+            ex = np.where(centered, rho, cx + cx * (1. / cmag) * rho)
+            ey = np.where(centered, 0., cy + cy * (1. / cmag) * rho)
+            is_looper = np.sqrt(ex * ex + ey * ey) < rad
+
+            def coords_at_time(time):
+                wt = omega * time
+                x = ox + vwy * (1 - np.cos(wt)) + vwx * np.sin(wt)
+                y = oy - vwx * (1 - np.cos(wt)) + vwy * np.sin(wt)
+                z = vz * time + oz
+                return np.column_stack([x, y, z])
+            def time_at_phi(phi):
+                return _delta_phi(phi0, phi) / omega
+
+            # barrel
+            xm, ym, xp, yp, intersect = _circle_intersections(cx, cy, rho, rad)
+            points = coords_at_time(time_at_phi(np.arctan2(yp - cy, xp - cx)))
+            other_side = points[:, 2] * uz < 0.
+            points = np.where(other_side[:, np.newaxis],
+                              coords_at_time(time_at_phi(np.arctan2(ym - cy, xm - cx))),
+                              points)
+            found = is_looper | intersect
+            is_looper |= np.abs(points[:, 2]) >= cylinder.z
+
+            # endcap
+            destz = np.where(uz > 0., cylinder.z, -cylinder.z)
+            endcap_points = coords_at_time((destz - oz) / vz)
+        points = np.where(is_looper[:, np.newaxis], endcap_points, points)
+        valid = ~centered & np.isfinite(omega) & (~found | ~is_looper | (vz != 0.))
+        return valid, found, points, is_looper
+
+
+def _unit(vectors):
+    '''returns the unit vectors of an array of shape (n, 3),
+    null vectors being left unchanged'''
+    mag2 = (vectors ** 2).sum(axis=1)
+    with np.errstate(divide='ignore'):
+        factor = np.where(mag2 > 0., 1. / np.sqrt(mag2), 1.)
+    return vectors * factor[:, np.newaxis]
+
+
+def _delta_phi(phi1, phi2):
+    '''utils.deltar.deltaPhi for angles in [-pi, pi]'''
+    res = phi1 - phi2
+    res = np.where(res > math.pi, res - 2 * math.pi, res)
+    return np.where(res < -math.pi, res + 2 * math.pi, res)
+
+
+def _circle_intersections(x1, y1, r1, r2):
+    '''vectorized version of geotools.circle_intersection.
+    returns xm, ym, xp, yp, and a boolean array which is False where there
+    is no solution.'''
+    switchxy = x1 == 0.
+    x1, y1 = np.where(switchxy, y1, x1), np.where(switchxy, x1, y1)
+    A = (r2**2 - r1**2 + x1**2 + y1**2) / (2*x1)
+    B = y1/x1
+    a = 1 + B**2
+    b = -2*A*B
+    c = A**2 - r2**2
+    delta = b**2 - 4*a*c
+    yp = ( -b + np.sqrt(delta) ) / (2*a)
+    ym = ( -b - np.sqrt(delta) ) / (2*a)
+    xp2 = r2**2 - yp**2
+    xm2 = r2**2 - ym**2
+    solved = (delta >= 0.) & (xp2 >= 0.) & (xm2 >= 0.)
+    xp = np.sqrt(xp2)
+    xp = np.where(np.abs((xp-x1)**2 + (yp-y1)**2 - r1**2) > 1e-9, -xp, xp)
+    xm = np.sqrt(xm2)
+    xm = np.where(np.abs((xm-x1)**2 + (ym-y1)**2 - r1**2) > 1e-9, -xm, xm)
+    xm, ym = np.where(switchxy, ym, xm), np.where(switchxy, xm, ym)
+    xp, yp = np.where(switchxy, yp, xp), np.where(switchxy, xp, yp)
+    return xm, ym, xp, yp, solved
+
+
 straight_line = StraightLinePropagator()
 
-helix = HelixPropagator() 
+helix = HelixPropagator()
 
 def propagator(charge):
     if abs(charge) > 0.5:
         return helix
     else:
-        return straight_line
\ No newline at end of file
+        return straight_line
+
+
+def precompute(particles, cylinders, field):
+    '''fills the propagation cache of the particles for all cylinders,
+    using the straight line or helix propagator depending on the charge,
+    see Propagator.precompute'''
+    neutrals = [ptc for ptc in particles if propagator(ptc.q()) is straight_line]
+    charged = [ptc for ptc in particles if propagator(ptc.q()) is helix]
+    straight_line.precompute(neutrals, cylinders)
+    helix.precompute(charged, cylinders, field)
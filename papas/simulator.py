@@ -1,7 +1,8 @@
 import sys
 import copy
 import shelve
-from heppy.papas.propagator import propagator
+import numpy as np
+from heppy.papas.propagator import propagator, precompute
 from heppy.papas.pfobjects import Cluster, SmearedCluster, SmearedTrack, Track
 from heppy.papas.data.papasevent import  PapasEvent
 from heppy.papas.data.identifier import Identifier
@@ -9,19 +10,47 @@ import heppy.papas.multiple_scattering as mscat
 from heppy.papas.papas_exceptions import SimulationError
 from heppy.utils.pdebug import pdebugger
 import heppy.statistics.rrandom as random
-from heppy.papas.graphtools.DAG import Node
+from heppy.papas.graphtools.history import History
+from heppy.papas.detectors.response import evaluate, ResponseTable
+from ROOT import TVector3
 
 
 class Simulator(object):
+    '''Simulates the particles of an event in the detector.
 
-    def __init__(self, detector, logger=None):
+    In batch mode, the smearing of the tracks and clusters is done
+    at the end of the event, for all tracks and for all clusters at once,
+    see smear_tracks and smear_clusters. The random numbers are drawn
+    in arrays, and the energy resolution and response of the calorimeters
+    are evaluated for arrays of energies and pseudo-rapidities with lookup tables.
+    These tables are made by the simulator, for the functions listed in
+    the tabulated_functions of the detector elements, and are only used
+    for the batch smearing: the detector itself is not modified
+    (see L{Detector.tabulate<heppy.papas.detectors.detector.Detector.tabulate>}).
+    The random numbers are used in a different order than in the default mode,
+    and the response functions are interpolated, so that the results
+    are only statistically equivalent.
+    The simulation is only faster for events with many clusters, by a few percent,
+    as most of the time is spent in the propagation and in the creation
+    of the tracks and clusters, see
+    L{bench_papas_smearing<heppy.benchmarks.bench_papas_smearing>}.
+    '''
+
+    def __init__(self, detector, logger=None, batch=False):
+        '''@param detector: the detector
+           @param logger: optional logger
+           @param batch: if True, the tracks and clusters are smeared at the end of the event
+        '''
         self.verbose = True
+        self.batch = batch
         self.detector = detector
         if logger is None:
             import logging
             logging.basicConfig(level='ERROR')
             logger = logging.getLogger('Simulator')
         self.logger = logger
+        # batch mode: lookup tables of the response functions, see response
+        self._responses = dict()
         self.reset()   
 
     def reset(self):
@@ -36,7 +65,9 @@ class Simulator(object):
         self.true_ecals = dict()    
         self.smeared_tracks = dict()
         self.true_tracks = dict()   
-        self.history = dict()
+        self.history = History()
+        self._track_jobs = []
+        self._cluster_jobs = []
         Cluster.max_energy = 0.
         SmearedCluster.max_energy = 0.
 
@@ -104,7 +135,7 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
         ptc.clusters[cylname] = cluster
         clusters[cluster.uniqueid] = cluster 
         self.update_history(ptc.uniqueid, cluster.uniqueid,)          
-        pdebugger.info(" ".join(("Made", cluster.__str__())))
+        pdebugger.info('Made %s', cluster)
         return cluster
 
     def make_and_store_smeared_cluster(self, cluster, detector, accept=False, acceptance=None):
@@ -118,10 +149,22 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
         @param accept: if set to true, always accept the cluster after smearing
         @param acceptance: optional detedctor object for acceptance.
           if provided, and if accept is False, used in place of detector.acceptance
+
+        In batch mode, the smearing is postponed to the end of the event
+        and None is returned, see smear_clusters.
         '''
-        eres = detector.energy_resolution(cluster.energy, cluster.position.Eta())
-        response = detector.energy_response(cluster.energy, cluster.position.Eta())
+        if self.batch:
+            self._cluster_jobs.append((cluster, detector, accept, acceptance))
+            return None
+        eres = detector.energy_resolution(cluster.energy, cluster.eta())
+        response = detector.energy_response(cluster.energy, cluster.eta())
         energy = cluster.energy * random.gauss(response, eres)
+        return self.store_smeared_cluster(cluster, energy, detector, accept, acceptance)
+
+    def store_smeared_cluster(self, cluster, energy, detector, accept=False, acceptance=None):
+        '''Makes the smeared cluster with the smeared energy, and stores it
+        if it is accepted. Returns the smeared cluster, or None if it is rejected.
+        See make_and_store_smeared_cluster for the parameters.'''
         clusters = self.cluster_collection(cluster.layer, smeared=True)
         smeared_cluster = SmearedCluster(cluster,
                                          energy,
@@ -130,27 +173,25 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
                                          cluster.layer,
                                          len(clusters),
                                          cluster.particle)
-        pdebugger.info(str('Made {}'.format(smeared_cluster)))
+        pdebugger.info('Made %s', smeared_cluster)
         det = acceptance if acceptance else detector
         if det.acceptance(smeared_cluster) or accept:
             clusters[smeared_cluster.uniqueid] = smeared_cluster                      
             self.update_history(cluster.uniqueid, smeared_cluster.uniqueid)            
             return smeared_cluster
         else:
-            pdebugger.info(str('Rejected {}'.format(smeared_cluster)))
+            pdebugger.info('Rejected %s', smeared_cluster)
             return None
         
     def update_history(self, parentid, childid) :
         '''Updates the history adding new nodes if needed and recording parent child relationship'''
-        child = self.history.setdefault(childid, Node(childid)) #creates a new node if it is not there already
-        parent = self.history.setdefault(parentid, Node(parentid))
-        parent.add_child(child)   
+        self.history.add_link(parentid, childid) #creates the new nodes if they are not there already
 
     def make_and_store_track(self, ptc):
         '''creates a new track, adds it into the true_tracks collection and
         updates the history information'''
         track = Track(ptc.p3(), ptc.q(), ptc.path, index=len(self.true_tracks))
-        pdebugger.info(" ".join(("Made", track.__str__())))
+        pdebugger.info('Made %s', track)
         self.true_tracks[track.uniqueid] = track                     
         self.update_history(ptc.uniqueid, track.uniqueid)          
         ptc.set_track(track)
@@ -158,25 +199,100 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
         
     def make_and_store_smeared_track(self, ptc, track,
                                      detector_resolution, detector_acceptance):
-        '''create a new smeared track'''
+        '''create a new smeared track.
+
+        In batch mode, the smearing is postponed to the end of the event
+        and None is returned, see smear_tracks.
+        '''
+        if self.batch:
+            self._track_jobs.append((ptc, track, detector_resolution, detector_acceptance))
+            return None
         #TODO smearing depends on particle type!
         resolution = detector_resolution(ptc)
         scale_factor = random.gauss(1, resolution)
+        return self.store_smeared_track(ptc, track,
+                                        [x * scale_factor for x in track.xyz()],
+                                        detector_acceptance)
+
+    def store_smeared_track(self, ptc, track, p3, detector_acceptance):
+        '''Makes the smeared track with the smeared momentum p3 (px, py, pz),
+        and stores it if it is accepted. Returns the smeared track,
+        or None if it is rejected.'''
         smeared_track = SmearedTrack(track,
-                                     track._p3 * scale_factor,
+                                     TVector3(*p3),
                                      track.charge,
                                      track.path,
                                      index = len(self.smeared_tracks))
-        pdebugger.info(" ".join(("Made", smeared_track.__str__())))
+        pdebugger.info('Made %s', smeared_track)
         if detector_acceptance(smeared_track):
             self.smeared_tracks[smeared_track.uniqueid] = smeared_track
             self.update_history(track.uniqueid, smeared_track.uniqueid )   
             ptc.track_smeared = smeared_track             
             return smeared_track  
         else:
-            pdebugger.info(str('Rejected {}'.format(smeared_track)))
+            pdebugger.info('Rejected %s', smeared_track)
             return None
 
+    def smear_tracks(self):
+        '''Batch mode: smears all the tracks of the event at once.
+
+        The relative resolutions are computed track by track, and the momenta
+        are scaled with numpy. The smeared tracks are then stored as in
+        make_and_store_smeared_track.
+        '''
+        jobs, self._track_jobs = self._track_jobs, []
+        if not jobs:
+            return
+        resolutions = np.array([resolution(ptc) for ptc, track, resolution, acceptance in jobs])
+        scale_factors = 1. + resolutions * random.gauss(0., 1., size=len(jobs))
+        p3s = np.array([track.xyz() for ptc, track, resolution, acceptance in jobs])
+        p3s *= scale_factors[:, np.newaxis]
+        for (ptc, track, resolution, acceptance), p3 in zip(jobs, p3s.tolist()):
+            self.store_smeared_track(ptc, track, p3, acceptance)
+
+    def response(self, element, fname):
+        '''Batch mode: returns the response function fname of the detector element,
+        as a lookup table if the element provides a grid for this function.
+        The tables are made at the first call.'''
+        key = (element, fname)
+        if key not in self._responses:
+            function = getattr(element, fname)
+            grids = element.tabulated_functions()
+            if not isinstance(function, ResponseTable) and fname in grids:
+                function = ResponseTable(function, *grids[fname])
+            self._responses[key] = function
+        return self._responses[key]
+
+    def smear_clusters(self):
+        '''Batch mode: smears all the clusters of the event at once.
+
+        The energy resolution and response are evaluated for the arrays of energies and
+        pseudo-rapidities of the clusters of each detector element (see response), and the energies
+        are smeared with numpy. The smeared clusters are then stored as in
+        make_and_store_smeared_cluster, and added to the clusters_smeared of
+        their particle.
+        '''
+        jobs, self._cluster_jobs = self._cluster_jobs, []
+        if not jobs:
+            return
+        energies = np.array([job[0].energy for job in jobs])
+        etas = np.array([job[0].eta() for job in jobs])
+        resolutions = np.empty(len(jobs))
+        responses = np.empty(len(jobs))
+        elements = [job[1] for job in jobs]
+        for element in set(elements):
+            indices = np.array([i for i, other in enumerate(elements) if other is element])
+            resolutions[indices] = evaluate(self.response(element, 'energy_resolution'),
+                                            energies[indices], etas[indices])
+            responses[indices] = evaluate(self.response(element, 'energy_response'),
+                                          energies[indices], etas[indices])
+        smeared_energies = energies * (responses + resolutions *
+                                       random.gauss(0., 1., size=len(jobs)))
+        for (cluster, detector, accept, acceptance), energy in zip(jobs, smeared_energies.tolist()):
+            smeared = self.store_smeared_cluster(cluster, energy, detector, accept, acceptance)
+            if smeared:
+                cluster.particle.clusters_smeared[smeared.layer] = smeared
+
     def simulate_photon(self, ptc):
         pdebugger.info("Simulating Photon")
         detname = 'ecal'
@@ -287,14 +403,18 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
     def simulate(self, ptcs, history):
         self.reset()
         self.history = history
+        # propagate all particles to all cylinders at once.
+        # the results are cached and used when the particles are simulated
+        precompute(ptcs, self.detector.cylinders(),
+                   self.detector.elements['field'].magnitude)
         # import pdb; pdb.set_trace()
         for ptc in ptcs:
             if ptc.q() and ptc.pt() < 0.2 and abs(ptc.pdgid()) >= 100:
                 # to avoid numerical problems in propagation (and avoid making a particle that is not used)
                 continue
-            pdebugger.info(str('Simulating {}'.format(ptc)))
+            pdebugger.info('Simulating %s', ptc)
             # ptc = pfsimparticle(gen_ptc, len(self.simulated_particles))
-            self.history[ptc.uniqueid] = Node(ptc.uniqueid)
+            self.history.add_node(ptc.uniqueid)
             if ptc.pdgid() == 22:
                 self.simulate_photon(ptc)
             elif abs(ptc.pdgid()) == 11: #check with colin
@@ -309,6 +429,9 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
                 self.simulate_hadron(ptc)
             self.ptcs.append(ptc)
             self.simulated_particles[ptc.uniqueid]= ptc
+        if self.batch:
+            self.smear_tracks()
+            self.smear_clusters()
 
 if __name__ == '__main__':
 
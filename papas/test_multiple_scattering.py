@@ -0,0 +1,93 @@
+import unittest
+import math
+import random
+import logging
+from ROOT import TLorentzVector, TVector3
+from heppy.papas.detectors.CMS import CMS
+from heppy.papas.simulator import Simulator
+from heppy.papas.pfobjects import Particle
+from heppy.papas.propagator import propagator
+from heppy.papas.graphtools.history import History
+from heppy.papas.multiple_scattering import multiple_scattering, multiple_scatterings
+from heppy.papas.detectors.response import ResponseTable
+import heppy.statistics.rrandom as rrandom
+
+
+def make_particles(n, pdgids=(211, -211, 130, 22)):
+    rand = random.Random(0xdead)
+    ptcs = []
+    for i in range(n):
+        pdgid = rand.choice(pdgids)
+        charge = {211: 1, -211: -1}.get(pdgid, 0)
+        tlv = TLorentzVector()
+        tlv.SetPtEtaPhiM(rand.expovariate(1 / 5.) + 1., rand.uniform(-2.5, 2.5),
+                         rand.uniform(-math.pi, math.pi), 0.139)
+        ptcs.append(Particle(tlv, TVector3(0, 0, 0), charge, pdgid, i))
+    return ptcs
+
+
+class TestMultipleScattering(unittest.TestCase):
+
+    def scattered(self, vectorized, n):
+        detector = CMS()
+        ecal = detector.elements['ecal']
+        field = detector.elements['field'].magnitude
+        ptcs = make_particles(n)
+        for ptc in ptcs:
+            propagator(ptc.q()).propagate([ptc], [ecal.volume.inner, ecal.volume.outer],
+                                          field)
+        rrandom.seed(0xbeef)
+        if vectorized:
+            multiple_scatterings(ptcs, ecal, field)
+        else:
+            for ptc in ptcs:
+                multiple_scattering(ptc, ecal, field)
+        return [(ptc.path.p4.X(), ptc.path.p4.Y(), ptc.path.p4.Z(),
+                 ptc.path.origin.X(), ptc.path.origin.Y(), ptc.path.origin.Z())
+                for ptc in ptcs if ptc.q()]
+
+    def test_vectorized(self):
+        if rrandom.backend != 'numpy':
+            return
+        # more charged particles than random numbers in a batch,
+        # see heppy.statistics.random_numpy.BATCH_SIZE
+        for n in [50, 3000]:
+            scalar = self.scattered(False, n)
+            vectorized = self.scattered(True, n)
+            self.assertEqual(len(scalar), len(vectorized))
+            # the paths of the charged particles have been replaced
+            self.assertTrue(sum(origin != (0., 0., 0.) for origin in
+                                (ptc[3:] for ptc in vectorized)) > n / 5)
+            for ptc_scalar, ptc_vectorized in zip(scalar, vectorized):
+                for x_scalar, x_vectorized in zip(ptc_scalar, ptc_vectorized):
+                    self.assertAlmostEqual(x_scalar, x_vectorized, places=9)
+        self.assertTrue(len(scalar) > 1024)
+
+
+class TestBatchSmearing(unittest.TestCase):
+
+    def test_batch(self):
+        detector = CMS()
+        rrandom.seed(0xbeef)
+        simulator = Simulator(detector, logging.getLogger('test_multiple_scattering'),
+                              batch=True)
+        simulator.simulate(make_particles(200), History())
+        self.assertTrue(len(simulator.smeared_tracks) > 50)
+        self.assertTrue(len(simulator.smeared_ecals) > 20)
+        self.assertTrue(len(simulator.smeared_hcals) > 20)
+        for ptc in simulator.ptcs:
+            for layer, smeared in ptc.clusters_smeared.iteritems():
+                self.assertTrue(smeared.uniqueid in simulator.cluster_collection(layer, True))
+        for track in simulator.smeared_tracks.itervalues():
+            ratio = track.p() / track.mother.p()
+            self.assertTrue(0.5 < ratio < 1.5)
+            self.assertAlmostEqual(track.p3().X() / track.mother.p3().X(), ratio, places=9)
+        # the simulator uses lookup tables, the detector is not modified
+        ecal = detector.elements['ecal']
+        self.assertTrue(isinstance(simulator.response(ecal, 'energy_resolution'),
+                                   ResponseTable))
+        self.assertFalse(isinstance(ecal.energy_resolution, ResponseTable))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,9 @@
 import unittest
 
-from path import Helix, ImpactParameter
+from path import Helix, ImpactParameter, impact_parameters
 from heppy.analyzers.ImpactParameterSmearer import smear_IP
 from ROOT import TLorentzVector, TVector3
-from heppy.utils.computeIP import compute_IP
+from heppy.utils.computeIP import compute_IP, compute_IPs
 import numpy as np
 import math
 import copy
@@ -79,6 +79,29 @@ class TestPath(unittest.TestCase):
         self.p4.Vect().Print()
         ip = ImpactParameter(self.helix, self.origin, self.p4.Vect())
         self.assertAlmostEqual(ip.value, self.true_IP, places=5)
+
+    def test_ip_batch(self):
+        '''all helices at once give the same results as one by one'''
+        origin = TVector3(0, 0, 0)
+        helices = []
+        for angle in np.linspace(0, 2 * math.pi, 20):
+            p4 = TLorentzVector()
+            p4.SetPtEtaPhiM(5., angle - math.pi, angle, 0.139)
+            vertex = TVector3(1e-4 * math.cos(angle + 1.),
+                              1e-4 * math.sin(angle + 1.), 2e-4)
+            helices.append(Helix(3.8, 1, p4, vertex))
+        jet_dir = TVector3(1, 1, 0)
+        ips = impact_parameters(helices, origin, jet_dir)
+        ips_nic = compute_IPs(helices, origin, jet_dir)
+        for helix, ip, ip_nic in zip(helices, ips, ips_nic):
+            single = ImpactParameter(helix, origin, jet_dir)
+            self.assertAlmostEqual(ip.value, single.value, places=14)
+            self.assertAlmostEqual(ip_nic, compute_IP(helix, origin, jet_dir),
+                                   places=14)
+            # the distance is minimal at the point of closest approach
+            for dt in [-1e-13, 1e-13]:
+                other = helix.point_at_time(ip.time + dt) - origin
+                self.assertGreater(other.Mag(), ip.vector.Mag())
         
 if __name__ == '__main__':
     unittest.main()
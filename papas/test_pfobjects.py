@@ -0,0 +1,52 @@
+import unittest
+import copy
+from ROOT import TVector3
+from heppy.papas.pfobjects import Cluster, SmearedCluster, MergedCluster, Track, SmearedTrack
+
+
+class TestPFObjects(unittest.TestCase):
+
+    def test_cluster(self):
+        cluster = Cluster(10., TVector3(1., 1., 0.5), 0.1, 'ecal_in')
+        self.assertFalse(hasattr(cluster, '__dict__'))
+        self.assertRaises(AttributeError, setattr, cluster, 'foo', 1)
+        # the TVector3 is created on request only
+        self.assertTrue(cluster._position is None)
+        self.assertAlmostEqual(cluster.eta(), cluster.position.Eta(), places=12)
+        self.assertTrue(cluster.position is cluster.position)
+        self.assertAlmostEqual(cluster.pt, 10. * cluster.position.Unit().Perp(), places=12)
+        cluster.position = TVector3(0., 2., 0.)
+        self.assertEqual(cluster.xyz(), (0., 2., 0.))
+        self.assertEqual(cluster.position.Y(), 2.)
+        smeared = SmearedCluster(cluster, 12., cluster.position, 0.1, 'ecal_in')
+        self.assertEqual(smeared.subtype, 's')
+        self.assertTrue(smeared.mother is cluster)
+
+    def test_merge(self):
+        clusters = [Cluster(20., TVector3(1., 0., 0.), 0.1, 'hcal_in'),
+                    Cluster(10., TVector3(1., 0.3, 0.), 0.1, 'hcal_in')]
+        merged = MergedCluster(clusters)
+        self.assertEqual(merged.energy, 30.)
+        self.assertAlmostEqual(merged.position.Y(), 0.1, places=12)
+        summed = copy.copy(clusters[0])
+        summed += clusters[1]
+        self.assertEqual(summed.xyz(), merged.xyz())
+        self.assertEqual(clusters[0].xyz(), (1., 0., 0.))
+
+    def test_track(self):
+        p3 = TVector3(3., 4., 12.)
+        track = Track(p3, 1, None)
+        self.assertEqual(track.layer, 'tracker')
+        self.assertEqual(track.p(), 13.)
+        self.assertEqual(track.pt(), 5.)
+        self.assertTrue(track._p3 is None)
+        self.assertAlmostEqual(track.eta(), p3.Eta(), places=12)
+        self.assertEqual(track.p3().Z(), 12.)
+        smeared = SmearedTrack(track, p3 * 2., 1, None)
+        self.assertEqual(smeared.p(), 26.)
+        self.assertTrue(smeared.mother is track)
+        self.assertFalse(hasattr(smeared, '__dict__'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,7 @@
 import unittest
 from detectors.geometry import SurfaceCylinder
 from pfobjects import Particle
-from propagator import straight_line, helix
+from propagator import straight_line, helix, precompute
 from vectors import LorentzVector, Point
 
 class TestPropagator(unittest.TestCase):
@@ -80,6 +80,54 @@ class TestPropagator(unittest.TestCase):
                              Point(0., 0., 0.), -1, -211)        
         debug_info = helix.propagate_one(particle, cyl1, field)
 
+    def test_precompute(self):
+        '''the points computed with numpy are the same as the ones
+        computed particle by particle, and are added in the same order'''
+        cylinders = [SurfaceCylinder('cyl1', 1., 2.),
+                     SurfaceCylinder('cyl2', 2., 1.),
+                     SurfaceCylinder('cyl3', 3., 3.)]
+        field = 3.8
+        def particles():
+            return [
+                Particle(LorentzVector(2., 0, 1, 5), Point(0., 0., 0.), -1, -211),
+                Particle(LorentzVector(0.3, 0.2, -1, 5), Point(0., 0.1, 0.), 1, 211),
+                Particle(LorentzVector(20., 5., 30., 50), Point(0., 0., 0.), 1, 211),
+                Particle(LorentzVector(1, 0, 1, 2.), Point(0., 0., 0.), 0, 22),
+                Particle(LorentzVector(0, 0.5, -1, 2.), Point(0, 0.5, 0), 0, 22),
+                Particle(LorentzVector(0, 0, -1, 2.), Point(0, 0, 2.5), 0, 22),
+            ]
+        ptcs = particles()
+        precompute(ptcs, cylinders, field)
+        for ptc, ref in zip(ptcs, particles()):
+            self.assertEqual(len(ptc.propagated), len(cylinders))
+            for cylinder in reversed(cylinders):
+                propagator = helix if ptc.q() else straight_line
+                info = propagator.propagate_one(ptc, cylinder, field)
+                ref_info = propagator.propagate_one(ref, cylinder, field)
+                if ref_info is not None:
+                    self.assertEqual(info.is_looper, ref_info.is_looper)
+            self.assertEqual(ptc.points.keys(), ref.points.keys())
+            for name, point in ptc.points.iteritems():
+                self.assertAlmostEqual((point - ref.points[name]).Mag(), 0., 9)
+
+    def test_path_replaced(self):
+        '''the propagation results are not kept when the path is replaced'''
+        cyl1 = SurfaceCylinder('cyl1', 1., 2.)
+        cyl2 = SurfaceCylinder('cyl2', 2., 1.)
+        field = 3.8
+        particle = Particle(LorentzVector(2., 0, 1, 5), Point(0., 0., 0.), -1, -211)
+        precompute([particle], [cyl1, cyl2], field)
+        helix.propagate_one(particle, cyl1, field)
+        # the cache is kept when the first path is set
+        self.assertEqual(len(particle.propagated), 2)
+        old_path = particle.path
+        new_path = helix.make_path(particle, field)
+        particle.set_path(new_path, option='w')
+        self.assertEqual(len(particle.propagated), 0)
+        helix.propagate_one(particle, cyl2, field)
+        self.assertEqual(particle.points.keys(), ['vertex', 'cyl2'])
+        self.assertTrue('cyl2' not in old_path.points)
+
         
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,154 @@
+'''Vectorized combinatorics for building resonances from particles.
+
+The 4-momenta of the particles are read once, and the invariants of all
+combinations of k particles (e.g. mass or pt of pairs or triplets) are
+computed with numpy. Constraints are applied to the combinations and
+only the k best ones are kept, before any
+L{Resonance<heppy.particles.tlv.resonance.Resonance>} is created.
+
+Example: keep the 5 opposite-charge, same-flavour pairs of leptons with a mass
+closest to the Z mass::
+
+    combs = Combinations(leptons, 2)
+    combs.select(combs.charges() == 0)
+    combs.select(combs.same_flavour())
+    best = combs.best(np.abs(combs.m() - 91.2), 5)
+    zeds = [Resonance2(leg1, leg2, 23) for leg1, leg2 in best]
+'''
+
+import itertools
+import numpy as np
+
+from heppy.particles.particlearray import ParticleArray
+
+
+def p4_array(particles):
+    '''returns an array of shape (n, 4) with the px, py, pz, e
+    of the particles.'''
+    if isinstance(particles, ParticleArray):
+        return np.column_stack([particles.px, particles.py,
+                                particles.pz, particles.e])
+    size = len(particles)
+    return np.fromiter((coord
+                        for ptc in particles
+                        for p4 in [ptc.p4()]
+                        for coord in (p4.Px(), p4.Py(), p4.Pz(), p4.E())),
+                       float, 4 * size).reshape(size, 4)
+
+
+def combination_indices(n, k):
+    '''returns an array of shape (ncombinations, k), with the indices of
+    all combinations of k elements among n, in the order of
+    itertools.combinations.'''
+    if k == 2:
+        first, second = np.triu_indices(n, 1)
+        return np.column_stack([first, second])
+    ncomb = 0 if n < k else \
+        int(round(np.prod(np.arange(n - k + 1, n + 1, dtype=float)) /
+                  np.prod(np.arange(1, k + 1, dtype=float))))
+    indices = np.fromiter(itertools.chain.from_iterable(
+        itertools.combinations(range(n), k)), int, ncomb * k)
+    return indices.reshape(ncomb, k)
+
+
+class Combinations(object):
+    '''All combinations of k particles among a collection,
+    with their summed 4-momentum.
+
+    The combinations can be filtered with select, and the best ones
+    retrieved with best.
+    '''
+
+    def __init__(self, particles, k):
+        '''particles is a list of particles or a ParticleArray.'''
+        self.particles = particles
+        self.k = k
+        self.indices = combination_indices(len(particles), k)
+        p4s = p4_array(particles)
+        if len(self.indices):
+            self.p4s = p4s[self.indices].sum(axis=1)
+        else:
+            self.p4s = np.zeros((0, 4))
+        self._charges = None
+        self._pdgids = None
+
+    def __len__(self):
+        return len(self.indices)
+
+    def select(self, mask):
+        '''keeps only the combinations for which mask is True.
+        Returns self.'''
+        mask = np.asarray(mask, dtype=bool)
+        self.indices = self.indices[mask]
+        self.p4s = self.p4s[mask]
+        return self
+
+    def _leg_values(self, values):
+        values = np.asarray(values)
+        return values[self.indices] if len(self.indices) \
+            else np.zeros((0, self.k), dtype=values.dtype)
+
+    def leg_charges(self):
+        '''charges of the legs, shape (ncombinations, k)'''
+        if self._charges is None:
+            if isinstance(self.particles, ParticleArray):
+                self._charges = self.particles.charge
+            else:
+                self._charges = np.array([ptc.q() for ptc in self.particles],
+                                         dtype=int)
+        return self._leg_values(self._charges)
+
+    def leg_pdgids(self):
+        '''pdg ids of the legs, shape (ncombinations, k)'''
+        if self._pdgids is None:
+            if isinstance(self.particles, ParticleArray):
+                self._pdgids = self.particles.pdgid
+            else:
+                self._pdgids = np.array([ptc.pdgid() for ptc in self.particles],
+                                        dtype=int)
+        return self._leg_values(self._pdgids)
+
+    def charges(self):
+        '''total charge of each combination'''
+        return self.leg_charges().sum(axis=1)
+
+    def same_flavour(self):
+        '''True for the combinations in which all legs have the same
+        absolute pdg id'''
+        pdgids = np.abs(self.leg_pdgids())
+        return (pdgids == pdgids[:, :1]).all(axis=1)
+
+    def m(self):
+        '''invariant mass of each combination'''
+        p4s = self.p4s
+        m2 = p4s[:, 3] ** 2 - (p4s[:, :3] ** 2).sum(axis=1)
+        return np.sqrt(np.abs(m2))
+
+    def pt(self):
+        '''transverse momentum of each combination'''
+        return np.hypot(self.p4s[:, 0], self.p4s[:, 1])
+
+    def e(self):
+        '''energy of each combination'''
+        return self.p4s[:, 3]
+
+    def best(self, scores, k=None):
+        '''returns the list of the k combinations with the lowest scores,
+        sorted by increasing score.
+        All combinations are returned if k is None.
+        In case of a tie, combinations keep their original order.
+
+        Each combination is given as a tuple of particles.
+        '''
+        scores = np.asarray(scores, dtype=float)
+        candidates = np.arange(len(scores))
+        if k is not None and k < len(scores):
+            # partial selection of the k lowest scores, including
+            # all the combinations tied with the k-th one.
+            kth = np.partition(scores, k - 1)[k - 1]
+            candidates = np.flatnonzero(scores <= kth)
+        order = candidates[np.argsort(scores[candidates], kind='mergesort')]
+        if k is not None:
+            order = order[:k]
+        return [tuple(self.particles[i] for i in self.indices[index])
+                for index in order]
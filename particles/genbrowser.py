@@ -1,7 +1,14 @@
 import copy
+from heppy.particles.pdgcodes import hasBottom, hasCharm
 
 class GenBrowser(object):
     """Browser for gen particle history."""
+
+    ancestor_predicates = {
+        'b' : lambda ptc: hasBottom(ptc.pdgid()),
+        'c' : lambda ptc: hasCharm(ptc.pdgid()),
+        'tau' : lambda ptc: abs(ptc.pdgid()) == 15
+        }
     
     def __init__(self, particles, vertices):
         """
@@ -20,6 +27,11 @@ class GenBrowser(object):
         for v in vertices:
             self.vertices[v] = v
         self.particles = particles
+        self._ancestors = dict()
+        self._descendants = dict()
+        self._order = None
+        self._nordered = 0
+        self._flags = dict()
         for ptc in particles:
             ptc.daughters = []
             ptc.mothers = []
@@ -54,22 +66,115 @@ class GenBrowser(object):
                 
     def ancestors(self, particle):
         """Returns the list of ancestors for a given particle, 
-        that is mothers, grandmothers, etc."""
-        result = []
-        for mother in particle.mothers:
-            result.append(mother)
-            result.extend(self.ancestors(mother))
+        that is mothers, grandmothers, etc.
+
+        Each ancestor appears once. The result is cached,
+        do not modify the returned list."""
+        result = self._ancestors.get(particle, None)
+        if result is None:
+            result = self._walk(particle, 'mothers')
+            self._ancestors[particle] = result
         return result
 
     def descendants(self, particle):
         """Returns the list of descendants for a given particle, 
-        that is daughters, granddaughters, etc."""
+        that is daughters, granddaughters, etc.
+
+        Each descendant appears once. The result is cached,
+        do not modify the returned list."""
+        result = self._descendants.get(particle, None)
+        if result is None:
+            result = self._walk(particle, 'daughters')
+            self._descendants[particle] = result
+        return result
+
+    def _walk(self, particle, direction):
+        """Iterative breadth-first search of the ancestors 
+        (direction='mothers') or descendants (direction='daughters').
+        """
         result = []
-        for daughter in particle.daughters:
-            result.append(daughter)
-            result.extend(self.descendants(daughter))
+        seen = set()
+        queue = [particle]
+        for ptc in queue:
+            # queue grows during the loop
+            for relative in getattr(ptc, direction):
+                if relative not in seen:
+                    seen.add(relative)
+                    result.append(relative)
+                    queue.append(relative)
         return result
 
+    def topological_order(self):
+        """Returns the particles sorted so that each particle comes
+        after its mothers.
 
+        Particles in a cycle of the history, or descending from 
+        such particles, if any, come last, in an arbitrary order.
+        """
+        if self._order is None:
+            nmothers = dict((ptc, len(ptc.mothers)) for ptc in self.particles)
+            order = [ptc for ptc in self.particles if not ptc.mothers]
+            for ptc in order:
+                # order grows during the loop
+                for daughter in ptc.daughters:
+                    nmothers[daughter] -= 1
+                    if nmothers[daughter] == 0:
+                        order.append(daughter)
+            self._nordered = len(order)
+            if len(order) < len(self.particles):
+                ordered = set(order)
+                order.extend(ptc for ptc in self.particles
+                             if ptc not in ordered)
+            self._order = order
+        return self._order
+
+    def flag_ancestry(self, name, predicate):
+        """Computes, for all particles, if at least one of their ancestors
+        satisfies predicate, a function taking a particle as argument. 
 
+        This is done in a single pass over the history, 
+        in topological order. 
+        The flags are then available through L{has_ancestor}.
 
+        Example::
+
+          browser.flag_ancestry('c', lambda ptc: hasCharm(ptc.pdgid()))
+          charm_products = [ptc for ptc in particles
+                            if browser.has_ancestor(ptc, 'c')]
+        """
+        order = self.topological_order()
+        # True if the particle or one of its ancestors satisfies predicate
+        inherited = dict()
+        flags = dict()
+        for ptc in order[:self._nordered]:
+            flag = False
+            for mother in ptc.mothers:
+                if inherited[mother]:
+                    flag = True
+                    break
+            flags[ptc] = flag
+            inherited[ptc] = flag or predicate(ptc)
+        for ptc in order[self._nordered:]:
+            flags[ptc] = any(predicate(ancestor)
+                             for ancestor in self.ancestors(ptc))
+        self._flags[name] = (predicate, flags)
+
+    def has_ancestor(self, particle, name):
+        """Returns True if the particle has an ancestor satisfying
+        the predicate defined for name in L{flag_ancestry}.
+
+        The flags are computed for all particles at the first call.
+        The following names are predefined:
+         - 'b' : hadron containing a bottom quark 
+         - 'c' : hadron containing a charm quark 
+         - 'tau' : tau lepton 
+        """
+        if name not in self._flags:
+            self.flag_ancestry(name, self.ancestor_predicates[name])
+        predicate, flags = self._flags[name]
+        flag = flags.get(particle, None)
+        if flag is None:
+            # particle not in the browser
+            flag = any(predicate(ancestor)
+                       for ancestor in self.ancestors(particle))
+        return flag
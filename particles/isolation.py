@@ -1,4 +1,7 @@
-from heppy.utils.deltar import deltaR2
+import numpy as np
+
+from heppy.utils.deltar import deltaR2, deltaPhiArray, etaPhiArrays, \
+    EtaPhiIndex
 
 class Area(object):
     '''Base Area interface.'''
@@ -10,6 +13,50 @@ class Area(object):
         '''
         pass
 
+    def max_radius(self):
+        '''returns the maximum distance between the centre of the area
+        and a point inside the area, or None if it is not known.'''
+        return None
+
+    def is_inside_array(self, etas1, phis1, etas2, phis2):
+        '''vectorized is_inside: returns a boolean array telling whether each
+        point (etas2, phis2) is inside the area centred on the corresponding
+        point (etas1, phis1).
+
+        Override this method for speed.
+        '''
+        return np.array([bool(self.is_inside(e1, p1, e2, p2))
+                         for e1, p1, e2, p2 in zip(etas1, phis1, etas2, phis2)],
+                        dtype=bool)
+
+    def select(self, eta, phi, particles):
+        '''returns the particles inside the area centred on (eta, phi).
+
+        particles can be a list, or an EtaPhiIndex built with use_theta=False,
+        which is then used to only test the particles close to (eta, phi).
+        '''
+        particles = preselect(eta, phi, particles, [self])
+        return [ptc for ptc in particles
+                if self.is_inside(eta, phi, ptc.eta(), ptc.phi())]
+
+
+def preselect(eta, phi, particles, areas):
+    '''returns the particles that can be in one of the areas
+    centred on (eta, phi).
+    
+    If particles is an EtaPhiIndex in eta (and not theta) and the areas are
+    bounded, only the particles within the largest area radius are returned.
+    Otherwise, all particles are returned.
+    '''
+    if not isinstance(particles, EtaPhiIndex) or particles.use_theta:
+        return particles
+    radii = [area.max_radius() for area in areas]
+    if not radii or None in radii:
+        return particles
+    # small margin as the index and the areas may round differently
+    return particles.in_cone(eta, phi, max(radii) + 1e-9, 0.)
+
+
 class EtaPhiCircle(Area):
     '''Circle in (eta, phi) space.
     When running on a lepton collider, eta is replaced by theta. 
@@ -23,6 +70,14 @@ class EtaPhiCircle(Area):
         dR2 = deltaR2(*args)
         return dR2 < self._R2
 
+    def max_radius(self):
+        return self.R
+
+    def is_inside_array(self, etas1, phis1, etas2, phis2):
+        de = np.subtract(etas1, etas2)
+        dp = deltaPhiArray(phis1, phis2)
+        return de * de + dp * dp < self._R2
+
 
 class IsolationInfo(object):
     '''Holds the results of an isolation calculation.'''
@@ -101,9 +156,12 @@ class IsolationComputer(object):
         
     def compute(self, lepton, particles):
         '''Compute the isolation for lepton, using particles.
+        particles can be an EtaPhiIndex built with use_theta=False.
         returns an IsolationInfo.
         '''
         isolation = IsolationInfo(self.label, lepton)
+        particles = preselect(lepton.eta(), lepton.phi(),
+                              particles, self.on_areas)
         for ptc in particles:
             if ptc is lepton:
                 continue
@@ -126,4 +184,120 @@ class IsolationComputer(object):
             if is_on:
                 isolation.add_particle(ptc)        
         return isolation
-    
+
+    def accept_array(self, lep_etas, lep_phis, etas, phis, pts, es):
+        '''vectorized selection of the particles considered in the isolation.
+        All arguments are arrays of the same length, describing
+        (lepton, particle) pairs.
+        Returns a boolean array telling whether each particle is
+        considered in the isolation of the corresponding lepton.
+        '''
+        accepted = (es >= self.e_thresh) & (pts >= self.pt_thresh)
+        is_on = np.zeros(len(accepted), dtype=bool)
+        for area in self.on_areas:
+            is_on |= area.is_inside_array(lep_etas, lep_phis, etas, phis)
+        accepted &= is_on
+        for area in self.off_areas:
+            accepted &= ~area.is_inside_array(lep_etas, lep_phis, etas, phis)
+        return accepted
+
+
+class IsolationEngine(object):
+    '''Computes the isolation of several leptons, for several particle
+    categories and several isolation definitions, in a single pass.
+
+    The particles are categorized and their coordinates extracted only once.
+    The (lepton, particle) pairs that can be in an on area are found
+    with an EtaPhiIndex, and each isolation definition is then
+    evaluated on all pairs at once.
+    '''
+
+    def __init__(self, computers, categories, categorize):
+        '''Creates the isolation engine.
+
+        computers : dictionary {name: IsolationComputer}, describing the
+                    isolation definitions (areas and thresholds)
+        categories: list of particle categories
+        categorize: function returning the category of a particle.
+                    particles in none of the categories are ignored.
+        '''
+        self.computers = computers
+        self.categories = categories
+        self.categorize = categorize
+        radii = [area.max_radius()
+                 for computer in computers.values()
+                 for area in computer.on_areas]
+        self.max_radius = None
+        if radii and None not in radii:
+            # small margin as the index and the areas may round differently
+            self.max_radius = max(radii) + 1e-9
+
+    def compute(self, leptons, particles):
+        '''Computes the isolation of leptons with respect to particles.
+
+        Returns a list with, for each lepton, a dictionary
+        {(name, category): IsolationInfo}.
+        The labels of the IsolationInfo are the computer labels.
+        '''
+        results = [dict() for lepton in leptons]
+        for lepton, result in zip(leptons, results):
+            for name, computer in self.computers.iteritems():
+                for category in self.categories:
+                    result[(name, category)] = IsolationInfo(computer.label,
+                                                             lepton)
+        if len(leptons) == 0 or len(particles) == 0:
+            return results
+        lep_etas, lep_phis = etaPhiArrays(leptons, use_theta=False)
+        if self.max_radius is not None:
+            index = EtaPhiIndex(particles, use_theta=False)
+            ilep, iptc, _ = index.pairs_within(lep_etas, lep_phis,
+                                               self.max_radius)
+            particles = index.particles
+            etas, phis = index.etas, index.phis
+        else:
+            particles = list(particles)
+            etas, phis = etaPhiArrays(particles, use_theta=False)
+            ilep = np.repeat(np.arange(len(leptons)), len(particles))
+            iptc = np.tile(np.arange(len(particles)), len(leptons))
+        # a lepton is not used in its own isolation
+        ptc_indices = dict((id(ptc), i) for i, ptc in enumerate(particles))
+        itself = np.array([ptc_indices.get(id(lepton), -1) for lepton in leptons])
+        keep = iptc != itself[ilep]
+        ilep, iptc = ilep[keep], iptc[keep]
+        # particles are processed in the order of the collection
+        order = np.lexsort((iptc, ilep))
+        ilep, iptc = ilep[order], iptc[order]
+        # categories and kinematics are only needed for particles in pairs
+        ncat = len(self.categories)
+        cat_indices = dict((cat, i) for i, cat in enumerate(self.categories))
+        ptc_categories = -np.ones(len(particles), dtype=int)
+        pts = np.zeros(len(particles))
+        es = np.zeros(len(particles))
+        for i in np.unique(iptc):
+            ptc = particles[i]
+            ptc_categories[i] = cat_indices.get(self.categorize(ptc), -1)
+            pts[i] = ptc.pt()
+            es[i] = ptc.e()
+        in_category = ptc_categories[iptc] >= 0
+        ilep, iptc = ilep[in_category], iptc[in_category]
+        for name, computer in self.computers.iteritems():
+            accepted = computer.accept_array(lep_etas[ilep], lep_phis[ilep],
+                                             etas[iptc], phis[iptc],
+                                             pts[iptc], es[iptc])
+            sel_lep, sel_ptc = ilep[accepted], iptc[accepted]
+            keys = sel_lep * ncat + ptc_categories[sel_ptc]
+            nkeys = len(leptons) * ncat
+            sumpts = np.bincount(keys, weights=pts[sel_ptc], minlength=nkeys)
+            sumes = np.bincount(keys, weights=es[sel_ptc], minlength=nkeys)
+            nums = np.bincount(keys, minlength=nkeys)
+            for key in np.unique(keys):
+                ilepton, icat = divmod(key, ncat)
+                info = results[ilepton][(name, self.categories[icat])]
+                info.sumpt = float(sumpts[key])
+                info.sume = float(sumes[key])
+                info.num = int(nums[key])
+            for key, iparticle in zip(keys, sel_ptc):
+                ilepton, icat = divmod(key, ncat)
+                info = results[ilepton][(name, self.categories[icat])]
+                info.particles.append(particles[iparticle])
+        return results
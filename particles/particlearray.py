@@ -0,0 +1,265 @@
+'''Columnar (struct of arrays) collection of particles.'''
+
+import math
+import numpy as np
+
+from heppy.configuration import Collider
+
+
+class ParticleArray(object):
+    '''Collection of particles stored as numpy arrays, one per column.
+
+    The basic columns are px, py, pz, e, pdgid, charge, and status.
+    Extra columns can be added, e.g. for isolation or b tagging variables.
+    Kinematic quantities are computed for all particles at once,
+    and selections, sorting and sums are done without creating any
+    particle object.
+
+    Example::
+
+        ptcs = ParticleArray.from_particles(event.rec_particles)
+        leptons = ptcs[(ptcs.e() > 5.) & np.in1d(np.abs(ptcs.pdgid), [11, 13])]
+        leptons = leptons.sorted(reverse=True)
+        zed_p4 = leptons[:2].sum_p4()
+
+    Indexing with an integer returns a particle object, of type
+    L{heppy.particles.tlv.particle.Particle}, created when first requested
+    (or the original particle if the array was built with from_particles).
+    The same particle object is returned for a given particle
+    even in selections of the array.
+    Modifying this particle object does not modify the array.
+
+    Indexing with a slice, a boolean mask, or an array of indices
+    returns a new ParticleArray.
+    Indexing with a string returns the column with this name.
+    '''
+
+    base_columns = ['px', 'py', 'pz', 'e', 'pdgid', 'charge', 'status']
+
+    def __init__(self, px=(), py=(), pz=(), e=(),
+                 pdgid=None, charge=None, status=None, **extra):
+        '''Creates the array from the momentum and energy arrays.
+
+        pdgid and charge are 0 by default, and status 1.
+        Extra columns can be given as keyword arguments.
+        '''
+        px = np.asarray(px, dtype=float)
+        size = len(px)
+        if pdgid is None:
+            pdgid = np.zeros(size, dtype=int)
+        if charge is None:
+            charge = np.zeros(size, dtype=int)
+        if status is None:
+            status = np.ones(size, dtype=int)
+        self._columns = dict(
+            px=px,
+            py=np.asarray(py, dtype=float),
+            pz=np.asarray(pz, dtype=float),
+            e=np.asarray(e, dtype=float),
+            pdgid=np.asarray(pdgid, dtype=int),
+            charge=np.asarray(charge, dtype=int),
+            status=np.asarray(status, dtype=int)
+        )
+        for name, values in extra.iteritems():
+            self._columns[name] = np.asarray(values)
+        for name, values in self._columns.iteritems():
+            if len(values) != size:
+                raise ValueError(
+                    'column {} has length {}, expected {}'.format(
+                        name, len(values), size)
+                )
+        # row numbers in the particle cache, shared by all selections
+        self._rows = np.arange(size)
+        self._cache = dict()
+
+    @classmethod
+    def from_particles(cls, particles, extra=None):
+        '''Builds the array from a list of particles.
+
+        extra is a dictionary {column name: function(particle)} used
+        to fill extra columns.
+        The particles are kept, and returned when indexing the array.
+        '''
+        particles = list(particles)
+        size = len(particles)
+        p4s = np.fromiter((coord
+                           for ptc in particles
+                           for p4 in [ptc.p4()]
+                           for coord in (p4.Px(), p4.Py(), p4.Pz(), p4.E())),
+                          float, 4 * size).reshape(size, 4)
+        columns = dict()
+        if extra:
+            for name, func in extra.iteritems():
+                columns[name] = [func(ptc) for ptc in particles]
+        array = cls(p4s[:, 0], p4s[:, 1], p4s[:, 2], p4s[:, 3],
+                    pdgid=[ptc.pdgid() for ptc in particles],
+                    charge=[ptc.q() for ptc in particles],
+                    status=[ptc.status() for ptc in particles],
+                    **columns)
+        array._cache = dict(enumerate(particles))
+        return array
+
+    def _subset(self, selection):
+        '''returns a new array with the particles in selection,
+        sharing the particle cache.'''
+        result = type(self).__new__(type(self))
+        result._columns = dict((name, values[selection])
+                               for name, values in self._columns.iteritems())
+        result._rows = self._rows[selection]
+        result._cache = self._cache
+        return result
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getattr__(self, name):
+        '''columns can be accessed as attributes, e.g. array.pdgid'''
+        columns = self.__dict__.get('_columns', dict())
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    def __getitem__(self, key):
+        if isinstance(key, basestring):
+            return self._columns[key]
+        if isinstance(key, (int, long, np.integer)):
+            return self.particle(key)
+        return self._subset(key)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.particle(i)
+
+    def columns(self):
+        '''returns the list of column names'''
+        return self._columns.keys()
+
+    def add_column(self, name, values):
+        '''adds or replaces a column'''
+        values = np.asarray(values)
+        if len(values) != len(self):
+            raise ValueError(
+                'column {} has length {}, expected {}'.format(
+                    name, len(values), len(self))
+            )
+        self._columns[name] = values
+
+    def particle(self, index):
+        '''returns the particle object at index, creating it if needed.'''
+        row = self._rows[index]
+        ptc = self._cache.get(row, None)
+        if ptc is None:
+            from heppy.particles.tlv.particle import Particle
+            from ROOT import TLorentzVector
+            cols = self._columns
+            tlv = TLorentzVector(cols['px'][index], cols['py'][index],
+                                 cols['pz'][index], cols['e'][index])
+            ptc = Particle(int(cols['pdgid'][index]),
+                           int(cols['charge'][index]),
+                           tlv,
+                           int(cols['status'][index]))
+            for name, values in cols.iteritems():
+                if name not in self.base_columns:
+                    setattr(ptc, name, values[index])
+            self._cache[row] = ptc
+        return ptc
+
+    def to_list(self):
+        '''returns the list of particle objects'''
+        return list(self)
+
+    # kinematics, see heppy.particles.p4.P4
+
+    def pt(self):
+        '''transverse momenta'''
+        return np.hypot(self._columns['px'], self._columns['py'])
+
+    def p(self):
+        '''momenta'''
+        pt = self.pt()
+        return np.hypot(pt, self._columns['pz'])
+
+    def q(self):
+        '''charges'''
+        return self._columns['charge']
+
+    def m(self):
+        '''masses'''
+        cols = self._columns
+        m2 = cols['e'] ** 2 - cols['px'] ** 2 - cols['py'] ** 2 - cols['pz'] ** 2
+        return np.sqrt(np.abs(m2))
+
+    def phi(self):
+        '''azimuthal angles'''
+        return np.arctan2(self._columns['py'], self._columns['px'])
+
+    def eta(self):
+        '''pseudo-rapidities, +-inf for particles along the beam axis'''
+        pt = self.pt()
+        pz = self._columns['pz']
+        along_beam = pt < 1e-9
+        with np.errstate(divide='ignore', invalid='ignore'):
+            eta = np.arcsinh(pz / pt)
+        eta[along_beam] = np.where(pz[along_beam] > 0.,
+                                   float('inf'), -float('inf'))
+        return eta
+
+    def theta(self):
+        '''angles with respect to the transverse plane'''
+        return math.pi / 2 - np.arctan2(self.pt(), self._columns['pz'])
+
+    def sort_key(self):
+        '''energy for lepton colliders, pt otherwise, as in P4.sort_key'''
+        if Collider.BEAMS == 'ee':
+            return self._columns['e']
+        else:
+            return self.pt()
+
+    def argsort(self, key=None, reverse=False):
+        '''returns the indices sorting the array according to key, an
+        array or a column name. The default key is given by sort_key.'''
+        if key is None:
+            key = self.sort_key()
+        elif isinstance(key, basestring):
+            key = self._columns[key]
+        if reverse:
+            key = -np.asarray(key)
+        return np.argsort(key, kind='mergesort')
+
+    def sorted(self, key=None, reverse=False):
+        '''returns a sorted copy of the array, see argsort.
+        As for lists of particles, array.sorted(reverse=True) puts
+        the most energetic (ee) or highest pt (pp) particles first.'''
+        return self[self.argsort(key, reverse)]
+
+    def select(self, mask_func):
+        '''returns a new array with the particles for which mask_func is True.
+
+        mask_func takes the array as argument and returns a boolean array,
+        e.g.::
+
+          def is_lepton(ptcs):
+              return (ptcs.e() > 5.) & np.in1d(np.abs(ptcs.pdgid), [11, 13])
+        '''
+        return self[np.asarray(mask_func(self), dtype=bool)]
+
+    def sum_p4s(self):
+        '''returns the total px, py, pz, e'''
+        cols = self._columns
+        return (cols['px'].sum(), cols['py'].sum(),
+                cols['pz'].sum(), cols['e'].sum())
+
+    def sum_p4(self):
+        '''returns the total 4-momentum as a TLorentzVector'''
+        from ROOT import TLorentzVector
+        return TLorentzVector(*self.sum_p4s())
+
+    def __str__(self):
+        return '{classname} : {size} particles, columns {columns}'.format(
+            classname=self.__class__.__name__,
+            size=len(self),
+            columns=sorted(self.columns())
+        )
+
+    def __repr__(self):
+        return str(self)
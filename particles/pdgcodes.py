@@ -76,3 +76,24 @@ def hasBottom(pid):
     else:
         return False
     
+
+
+def hasCharm(pid):
+    '''returns True if it's a composite particle containing a charm quark
+     {
+        if( extraBits(pid) > 0 ) { return false; }
+        if( fundamentalID(pid) > 0 ) { return false; }
+        if( digit(nq3,pid) == 4 || digit(nq2,pid) == 4 || digit(nq1,pid) == 4 ) { return true; }
+        return false;
+    }
+    '''
+    if extraBits(pid) > 0:
+        return False
+    elif fundamentalId(pid) > 0:
+        return False
+    elif digit(nq3,pid) == 4 or \
+        digit(nq2,pid) == 4 or \
+        digit(nq1,pid) == 4 :
+        return True
+    else:
+        return False
@@ -0,0 +1,74 @@
+import unittest
+import itertools
+import math
+import numpy as np
+
+from heppy.particles.combinatorics import Combinations, combination_indices
+from heppy.particles.tlv.lorentzvector import LorentzVector
+
+
+class Particle(object):
+
+    def __init__(self, pdgid, charge, p4):
+        self._pdgid = pdgid
+        self._charge = charge
+        self._p4 = p4
+
+    def pdgid(self):
+        return self._pdgid
+
+    def q(self):
+        return self._charge
+
+    def p4(self):
+        return self._p4
+
+
+class TestCombinatorics(unittest.TestCase):
+
+    def setUp(self):
+        self.ptcs = []
+        for pdgid, charge, px, py, pz in [(11, -1, 10, 0, 0),
+                                          (-11, 1, -10, 0, 0),
+                                          (13, -1, 0, 40, 0),
+                                          (-13, 1, 0, -45, 0),
+                                          (211, 1, 3, 3, 3)]:
+            p4 = LorentzVector()
+            p4.SetXYZM(px, py, pz, 0.)
+            self.ptcs.append(Particle(pdgid, charge, p4))
+
+    def test_indices(self):
+        for k in [2, 3]:
+            self.assertEqual(
+                [tuple(comb) for comb in combination_indices(6, k)],
+                list(itertools.combinations(range(6), k))
+            )
+        self.assertEqual(len(combination_indices(2, 3)), 0)
+
+    def test_pairs(self):
+        pairs = Combinations(self.ptcs, 2)
+        self.assertEqual(len(pairs), 10)
+        for (i, j), mass in zip(pairs.indices, pairs.m()):
+            p4 = self.ptcs[i].p4() + self.ptcs[j].p4()
+            self.assertAlmostEqual(mass, p4.M())
+        pairs.select(pairs.charges() == 0)
+        pairs.select(pairs.same_flavour())
+        best = pairs.best(np.abs(pairs.m() - 91.), 1)
+        self.assertEqual(best, [(self.ptcs[2], self.ptcs[3])])
+        # all pairs, sorted
+        self.assertEqual(pairs.best(np.abs(pairs.m() - 91.)),
+                         [(self.ptcs[2], self.ptcs[3]),
+                          (self.ptcs[0], self.ptcs[1])])
+
+    def test_triplets(self):
+        triplets = Combinations(self.ptcs, 3)
+        self.assertEqual(len(triplets), 10)
+        best = triplets.best(-triplets.pt(), 1)[0]
+        ptmax = max((a.p4() + b.p4() + c.p4()).Pt()
+                    for a, b, c in itertools.combinations(self.ptcs, 3))
+        p4 = best[0].p4() + best[1].p4() + best[2].p4()
+        self.assertAlmostEqual(p4.Pt(), ptmax)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,8 +3,9 @@ from genbrowser import GenBrowser
 
 class Particle(object):
 
-    def __init__(self, id, start, end):
+    def __init__(self, id, start, end, pdgid=211):
         self.id = id
+        self._pdgid = pdgid
         self.start = start
         self.end = end
         # self.mothers = []
@@ -16,6 +17,9 @@ class Particle(object):
     def end_vertex(self):
         return self.end
 
+    def pdgid(self):
+        return self._pdgid
+
     def __str__(self):
         return 'particle {i}: \tstart {s}, \tend {e}'.format(
             i=self.id,
@@ -72,6 +76,56 @@ class TestGenBrowser(unittest.TestCase):
         self.assertItemsEqual( browser.ancestors(ps[4]), [ps[2], ps[0], ps[5]]) 
         self.assertItemsEqual( browser.descendants(ps[0]), ps[1:5]) 
 
+    def test_flags(self):
+        vs = map(Vertex, range(3))
+        ps = [
+            Particle(0, None, vs[0], 23),
+            Particle(1, vs[0], vs[1], 511),
+            Particle(2, vs[0], vs[2], 15),
+            Particle(3, vs[1], None, 211),
+            Particle(4, vs[1], None, 421),
+            Particle(5, vs[2], None, 211),
+            ]
+        browser = GenBrowser(ps, vs)
+        from_b = [browser.has_ancestor(ptc, 'b') for ptc in ps]
+        self.assertEqual(from_b, [False, False, False, True, True, False])
+        from_tau = [browser.has_ancestor(ptc, 'tau') for ptc in ps]
+        self.assertEqual(from_tau, [False, False, False, False, False, True])
+        browser.flag_ancestry('z', lambda ptc: ptc.pdgid() == 23)
+        from_z = [browser.has_ancestor(ptc, 'z') for ptc in ps]
+        self.assertEqual(from_z, [False] + [True] * 5)
+        order = browser.topological_order()
+        for ptc in ps:
+            for mother in ptc.mothers:
+                self.assertTrue(order.index(mother) < order.index(ptc))
+
+    def test_long_chain(self):
+        nvertices = 5000
+        vs = map(Vertex, range(nvertices))
+        ps = [Particle(0, None, vs[0], 511)]
+        for i in range(1, nvertices):
+            ps.append(Particle(i, vs[i-1], vs[i]))
+        ps.append(Particle(nvertices, vs[-1], None))
+        browser = GenBrowser(ps, vs)
+        ancestors = browser.ancestors(ps[-1])
+        self.assertEqual(ancestors, ps[-2::-1])
+        self.assertTrue(browser.ancestors(ps[-1]) is ancestors)
+        self.assertTrue(browser.has_ancestor(ps[-1], 'b'))
+        self.assertEqual(len(browser.descendants(ps[0])), nvertices)
+
+    def test_cycle(self):
+        vs = map(Vertex, range(2))
+        ps = [
+            Particle(0, None, vs[0], 511),
+            Particle(1, vs[0], vs[1]),
+            Particle(2, vs[1], vs[0]),
+            Particle(3, vs[1], None)
+            ]
+        browser = GenBrowser(ps, vs)
+        self.assertItemsEqual(browser.ancestors(ps[3]), ps[:3])
+        self.assertTrue(browser.has_ancestor(ps[3], 'b'))
+        self.assertEqual(len(browser.topological_order()), 4)
+
 
 
 if __name__ == '__main__':
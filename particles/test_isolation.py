@@ -45,6 +45,35 @@ class TestIsolation(unittest.TestCase):
         iso = computer.compute(lepton, [ptc])
         self.assertEqual(iso.sumpt, 0.)
 
+    def test_engine(self):
+        p4 = TLorentzVector()
+        p4.SetPtEtaPhiM(10, 0, 0, 0.105)
+        lepton = Particle(13, 1, p4)
+        ptcs = [lepton]
+        for pdgid, charge, eta in [(211, 1, 0.1), (22, 0, 0.2),
+                                   (22, 0, 0.35), (211, -1, 1.)]:
+            p4 = TLorentzVector()
+            p4.SetPtEtaPhiM(1, eta, 0, 0)
+            ptcs.append(Particle(pdgid, charge, p4))
+        computers = {
+            'r04': IsolationComputer([EtaPhiCircle(0.4)]),
+            'r03': IsolationComputer([EtaPhiCircle(0.3)], [EtaPhiCircle(0.15)])
+            }
+        engine = IsolationEngine(computers, [211, 22],
+                                 lambda ptc: abs(ptc.pdgid()))
+        result = engine.compute([lepton], ptcs)[0]
+        for name, computer in computers.iteritems():
+            for pdgid in [211, 22]:
+                sel_ptcs = [ptc for ptc in ptcs if abs(ptc.pdgid()) == pdgid]
+                iso = computer.compute(lepton, sel_ptcs)
+                self.assertEqual(result[(name, pdgid)].particles, iso.particles)
+                self.assertAlmostEqual(result[(name, pdgid)].sumpt, iso.sumpt)
+                self.assertAlmostEqual(result[(name, pdgid)].sume, iso.sume)
+                self.assertEqual(result[(name, pdgid)].num, iso.num)
+        self.assertEqual(result[('r04', 22)].num, 2)
+        self.assertEqual(result[('r03', 22)].num, 1)
+        self.assertEqual(result[('r03', 211)].num, 0)
+        
         
 if __name__ == '__main__':
     unittest.main()
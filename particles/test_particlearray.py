@@ -0,0 +1,78 @@
+import unittest
+import math
+import numpy as np
+
+from heppy.particles.particlearray import ParticleArray
+from heppy.configuration import Collider
+
+
+class TestParticleArray(unittest.TestCase):
+
+    def setUp(self):
+        self.ptcs = ParticleArray(
+            px=[1., 0., 3., 0.],
+            py=[0., 2., 4., 0.],
+            pz=[0., 2., 0., 5.],
+            e=[2., 3., 6., 5.],
+            pdgid=[11, 22, 211, 22],
+            charge=[-1, 0, 1, 0],
+            btag=[0.1, 0.2, 0.9, 0.]
+        )
+
+    def test_kinematics(self):
+        ptcs = self.ptcs
+        self.assertEqual(len(ptcs), 4)
+        np.testing.assert_allclose(ptcs.pt(), [1., 2., 5., 0.])
+        np.testing.assert_allclose(ptcs.phi()[:3],
+                                   [0., math.pi / 2, math.atan2(4, 3)])
+        np.testing.assert_allclose(ptcs.eta()[:3],
+                                   [0., math.asinh(1.), 0.])
+        self.assertEqual(ptcs.eta()[3], float('inf'))
+        np.testing.assert_allclose(ptcs.theta()[:3], [0., math.pi / 4, 0.])
+        np.testing.assert_allclose(ptcs.m(),
+                                   [math.sqrt(3.), 1., math.sqrt(11.), 0.])
+
+    def test_selection(self):
+        ptcs = self.ptcs
+        photons = ptcs[ptcs.pdgid == 22]
+        self.assertEqual(len(photons), 2)
+        np.testing.assert_allclose(photons.e, [3., 5.])
+        np.testing.assert_allclose(photons['btag'], [0.2, 0.])
+        charged = ptcs.select(lambda ptcs: ptcs.q() != 0)
+        self.assertEqual(list(charged.pdgid), [11, 211])
+        self.assertEqual(ptcs.sum_p4s(), (4., 6., 7., 16.))
+
+    def test_sort(self):
+        Collider.BEAMS = 'ee'
+        self.assertEqual(list(self.ptcs.sorted(reverse=True).e),
+                         [6., 5., 3., 2.])
+        Collider.BEAMS = 'pp'
+        self.assertEqual(list(self.ptcs.sorted(reverse=True).pdgid),
+                         [211, 22, 11, 22])
+        self.assertEqual(list(self.ptcs.sorted('btag').pdgid),
+                         [22, 11, 22, 211])
+
+    def test_particles(self):
+        from ROOT import TLorentzVector
+        from heppy.particles.tlv.particle import Particle
+        ptc = self.ptcs[2]
+        self.assertTrue(isinstance(ptc, Particle))
+        self.assertEqual(ptc.pdgid(), 211)
+        self.assertAlmostEqual(ptc.pt(), 5.)
+        self.assertEqual(ptc.btag, 0.9)
+        # the same object is returned, also in selections
+        self.assertTrue(self.ptcs[2] is ptc)
+        self.assertTrue(self.ptcs[self.ptcs.q() > 0][0] is ptc)
+        # from existing particles
+        tlv = TLorentzVector()
+        tlv.SetPtEtaPhiM(10, 1, 2, 0.1)
+        muon = Particle(13, 1, tlv)
+        ptcs = ParticleArray.from_particles([muon], {'iso': lambda ptc: 0.3})
+        self.assertTrue(ptcs[0] is muon)
+        self.assertAlmostEqual(ptcs.pt()[0], 10.)
+        self.assertAlmostEqual(ptcs.eta()[0], 1.)
+        self.assertEqual(ptcs.iso[0], 0.3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,531 @@
+'''Pure python implementation of the ROOT TVector3 and TLorentzVector
+interfaces used in heppy.
+
+These classes can be used in place of the ROOT ones in
+L{heppy.particles.tlv.particle.Particle} and derived classes, e.g.::
+
+    from heppy.particles.tlv.lorentzvector import LorentzVector
+    ptc = Particle(211, 1, LorentzVector(1., 2., 3., 10.))
+
+They do not depend on ROOT, and avoid the cost of calling
+ROOT from python. Derived quantities (pt, eta, phi, mass, ...)
+are computed when first requested and cached until the vector is modified.
+
+Arithmetic operations accept ROOT TLorentzVector and TVector3 objects
+as operands, and the result is always a pure python object.
+'''
+
+import math
+
+
+def _xyz(vec):
+    '''returns the x, y, z components of a 3-vector, python or ROOT'''
+    return vec.X(), vec.Y(), vec.Z()
+
+
+def _xyzt(vec):
+    '''returns the x, y, z, t components of a 4-vector, python or ROOT'''
+    return vec.X(), vec.Y(), vec.Z(), vec.T()
+
+
+def _eta(x, y, z):
+    '''pseudo-rapidity, with the ROOT convention for vectors along z.'''
+    mag = math.sqrt(x * x + y * y + z * z)
+    if mag == 0.:
+        cos_theta = 1.
+    else:
+        cos_theta = z / mag
+    if cos_theta * cos_theta < 1.:
+        return -0.5 * math.log((1. - cos_theta) / (1. + cos_theta))
+    if z == 0.:
+        return 0.
+    elif z > 0.:
+        return 10e10
+    else:
+        return -10e10
+
+
+def _phi(x, y):
+    if x == 0. and y == 0.:
+        return 0.
+    return math.atan2(y, x)
+
+
+def _theta(x, y, z):
+    if x == 0. and y == 0. and z == 0.:
+        return 0.
+    return math.atan2(math.sqrt(x * x + y * y), z)
+
+
+def _angle(x1, y1, z1, x2, y2, z2):
+    norm = math.sqrt((x1 * x1 + y1 * y1 + z1 * z1) *
+                     (x2 * x2 + y2 * y2 + z2 * z2))
+    if norm <= 0.:
+        return 0.
+    arg = (x1 * x2 + y1 * y2 + z1 * z2) / norm
+    return math.acos(max(-1., min(1., arg)))
+
+
+class Vector3(object):
+    '''3-vector, with the interface of ROOT TVector3.'''
+
+    __slots__ = ('_x', '_y', '_z')
+
+    def __init__(self, *args):
+        '''Vector3(), Vector3(x, y, z), or Vector3(other 3-vector)'''
+        if len(args) == 0:
+            self._x = self._y = self._z = 0.
+        elif len(args) == 1:
+            self._x, self._y, self._z = _xyz(args[0])
+        else:
+            x, y, z = args
+            self._x, self._y, self._z = float(x), float(y), float(z)
+
+    def X(self):
+        return self._x
+
+    def Y(self):
+        return self._y
+
+    def Z(self):
+        return self._z
+
+    x = Px = X
+    y = Py = Y
+    z = Pz = Z
+
+    def SetXYZ(self, x, y, z):
+        self._x, self._y, self._z = float(x), float(y), float(z)
+
+    def SetX(self, x):
+        self._x = float(x)
+
+    def SetY(self, y):
+        self._y = float(y)
+
+    def SetZ(self, z):
+        self._z = float(z)
+
+    def SetMagThetaPhi(self, mag, theta, phi):
+        amag = abs(mag)
+        self._x = amag * math.sin(theta) * math.cos(phi)
+        self._y = amag * math.sin(theta) * math.sin(phi)
+        self._z = amag * math.cos(theta)
+
+    def SetMag(self, mag):
+        factor = self.Mag()
+        if factor != 0.:
+            factor = mag / factor
+            self._x *= factor
+            self._y *= factor
+            self._z *= factor
+
+    def Mag2(self):
+        return self._x * self._x + self._y * self._y + self._z * self._z
+
+    def Mag(self):
+        return math.sqrt(self.Mag2())
+
+    def Perp2(self):
+        return self._x * self._x + self._y * self._y
+
+    def Perp(self):
+        return math.sqrt(self.Perp2())
+
+    Pt = Perp
+
+    def Phi(self):
+        return _phi(self._x, self._y)
+
+    def Theta(self):
+        return _theta(self._x, self._y, self._z)
+
+    def CosTheta(self):
+        mag = self.Mag()
+        return 1. if mag == 0. else self._z / mag
+
+    def Eta(self):
+        return _eta(self._x, self._y, self._z)
+
+    PseudoRapidity = Eta
+
+    def Unit(self):
+        mag = self.Mag()
+        if mag == 0.:
+            return Vector3(self)
+        return Vector3(self._x / mag, self._y / mag, self._z / mag)
+
+    def Dot(self, other):
+        x, y, z = _xyz(other)
+        return self._x * x + self._y * y + self._z * z
+
+    def Cross(self, other):
+        x, y, z = _xyz(other)
+        return Vector3(self._y * z - self._z * y,
+                       self._z * x - self._x * z,
+                       self._x * y - self._y * x)
+
+    def Angle(self, other):
+        return _angle(self._x, self._y, self._z, *_xyz(other))
+
+    def __add__(self, other):
+        x, y, z = _xyz(other)
+        return Vector3(self._x + x, self._y + y, self._z + z)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        x, y, z = _xyz(other)
+        return Vector3(self._x - x, self._y - y, self._z - z)
+
+    def __rsub__(self, other):
+        x, y, z = _xyz(other)
+        return Vector3(x - self._x, y - self._y, z - self._z)
+
+    def __iadd__(self, other):
+        x, y, z = _xyz(other)
+        self._x += x
+        self._y += y
+        self._z += z
+        return self
+
+    def __isub__(self, other):
+        x, y, z = _xyz(other)
+        self._x -= x
+        self._y -= y
+        self._z -= z
+        return self
+
+    def __neg__(self):
+        return Vector3(-self._x, -self._y, -self._z)
+
+    def __mul__(self, other):
+        '''dot product with a vector, or product with a number'''
+        if hasattr(other, 'Z'):
+            return self.Dot(other)
+        return Vector3(self._x * other, self._y * other, self._z * other)
+
+    __rmul__ = __mul__
+
+    def __div__(self, number):
+        return Vector3(self._x / number, self._y / number, self._z / number)
+
+    __truediv__ = __div__
+
+    def __eq__(self, other):
+        try:
+            return (self._x, self._y, self._z) == _xyz(other)
+        except AttributeError:
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (Vector3, (self._x, self._y, self._z))
+
+    def __str__(self):
+        return '({x}, {y}, {z})'.format(x=self._x, y=self._y, z=self._z)
+
+    __repr__ = __str__
+
+
+class LorentzVector(object):
+    '''4-vector, with the interface of ROOT TLorentzVector.'''
+
+    __slots__ = ('_x', '_y', '_z', '_t', '_pt', '_eta', '_phi', '_m')
+
+    def __init__(self, *args):
+        '''LorentzVector(), LorentzVector(px, py, pz, e),
+        LorentzVector(3-vector, e) or LorentzVector(other 4-vector)'''
+        if len(args) == 0:
+            self._x = self._y = self._z = self._t = 0.
+        elif len(args) == 1:
+            self._x, self._y, self._z, self._t = _xyzt(args[0])
+        elif len(args) == 2:
+            self._x, self._y, self._z = _xyz(args[0])
+            self._t = float(args[1])
+        else:
+            x, y, z, t = args
+            self._x, self._y, self._z, self._t = \
+                float(x), float(y), float(z), float(t)
+        self._invalidate()
+
+    def _invalidate(self):
+        '''resets the cached quantities, to be called after any
+        modification'''
+        self._pt = self._eta = self._phi = self._m = None
+
+    # components
+
+    def X(self):
+        return self._x
+
+    def Y(self):
+        return self._y
+
+    def Z(self):
+        return self._z
+
+    def T(self):
+        return self._t
+
+    Px = X
+    Py = Y
+    Pz = Z
+    E = Energy = T
+
+    def Vect(self):
+        return Vector3(self._x, self._y, self._z)
+
+    # setters
+
+    def SetPxPyPzE(self, px, py, pz, e):
+        self._x, self._y, self._z, self._t = \
+            float(px), float(py), float(pz), float(e)
+        self._invalidate()
+
+    SetXYZT = SetPxPyPzE
+
+    def SetXYZM(self, x, y, z, m):
+        if m >= 0.:
+            e = math.sqrt(x * x + y * y + z * z + m * m)
+        else:
+            e = math.sqrt(max(x * x + y * y + z * z - m * m, 0.))
+        self.SetPxPyPzE(x, y, z, e)
+
+    def SetPtEtaPhiM(self, pt, eta, phi, m):
+        pt = abs(pt)
+        self.SetXYZM(pt * math.cos(phi), pt * math.sin(phi),
+                     pt * math.sinh(eta), m)
+
+    def SetPtEtaPhiE(self, pt, eta, phi, e):
+        pt = abs(pt)
+        self.SetPxPyPzE(pt * math.cos(phi), pt * math.sin(phi),
+                        pt * math.sinh(eta), e)
+
+    def SetVectM(self, vect, m):
+        x, y, z = _xyz(vect)
+        self.SetXYZM(x, y, z, m)
+
+    def SetVect(self, vect):
+        self._x, self._y, self._z = _xyz(vect)
+        self._invalidate()
+
+    def SetE(self, e):
+        self._t = float(e)
+        self._invalidate()
+
+    SetT = SetE
+
+    def SetPx(self, px):
+        self._x = float(px)
+        self._invalidate()
+
+    def SetPy(self, py):
+        self._y = float(py)
+        self._invalidate()
+
+    def SetPz(self, pz):
+        self._z = float(pz)
+        self._invalidate()
+
+    def SetTheta(self, theta):
+        '''sets theta, keeping the magnitude of the momentum and phi'''
+        vect = self.Vect()
+        vect.SetMagThetaPhi(vect.Mag(), theta, vect.Phi())
+        self.SetVect(vect)
+
+    def SetPhi(self, phi):
+        '''sets phi, keeping the magnitude of the momentum and theta'''
+        vect = self.Vect()
+        vect.SetMagThetaPhi(vect.Mag(), vect.Theta(), phi)
+        self.SetVect(vect)
+
+    # derived quantities
+
+    def Pt(self):
+        if self._pt is None:
+            self._pt = math.sqrt(self._x * self._x + self._y * self._y)
+        return self._pt
+
+    Perp = Pt
+
+    def P(self):
+        pt = self.Pt()
+        return math.sqrt(pt * pt + self._z * self._z)
+
+    Rho = P
+
+    def Eta(self):
+        if self._eta is None:
+            self._eta = _eta(self._x, self._y, self._z)
+        return self._eta
+
+    PseudoRapidity = Eta
+
+    def Phi(self):
+        if self._phi is None:
+            self._phi = _phi(self._x, self._y)
+        return self._phi
+
+    def Theta(self):
+        return _theta(self._x, self._y, self._z)
+
+    def CosTheta(self):
+        p = self.P()
+        return 1. if p == 0. else self._z / p
+
+    def M2(self):
+        return self._t * self._t - \
+            (self._x * self._x + self._y * self._y + self._z * self._z)
+
+    Mag2 = M2
+
+    def M(self):
+        if self._m is None:
+            mm = self.M2()
+            self._m = -math.sqrt(-mm) if mm < 0. else math.sqrt(mm)
+        return self._m
+
+    Mag = M
+
+    def Et(self):
+        p = self.P()
+        return 0. if p == 0. else self._t * self.Pt() / p
+
+    def Rapidity(self):
+        return 0.5 * math.log((self._t + self._z) / (self._t - self._z))
+
+    def Beta(self):
+        return self.P() / self._t
+
+    def Gamma(self):
+        beta = self.Beta()
+        return 1. / math.sqrt(1. - beta * beta)
+
+    def BoostVector(self):
+        return Vector3(self._x / self._t, self._y / self._t, self._z / self._t)
+
+    def Boost(self, *args):
+        '''Boost(3-vector) or Boost(bx, by, bz), as in ROOT'''
+        if len(args) == 1:
+            bx, by, bz = _xyz(args[0])
+        else:
+            bx, by, bz = args
+        b2 = bx * bx + by * by + bz * bz
+        gamma = 1. / math.sqrt(1. - b2)
+        bp = bx * self._x + by * self._y + bz * self._z
+        gamma2 = (gamma - 1.) / b2 if b2 > 0. else 0.
+        self._x += gamma2 * bp * bx + gamma * bx * self._t
+        self._y += gamma2 * bp * by + gamma * by * self._t
+        self._z += gamma2 * bp * bz + gamma * bz * self._t
+        self._t = gamma * (self._t + bp)
+        self._invalidate()
+
+    def Angle(self, vect):
+        '''angle between the momentum and vect'''
+        return _angle(self._x, self._y, self._z, *_xyz(vect))
+
+    def DeltaPhi(self, other):
+        dphi = self.Phi() - other.Phi()
+        while dphi >= math.pi:
+            dphi -= 2 * math.pi
+        while dphi < -math.pi:
+            dphi += 2 * math.pi
+        return dphi
+
+    def DeltaR(self, other):
+        deta = self.Eta() - other.Eta()
+        dphi = self.DeltaPhi(other)
+        return math.sqrt(deta * deta + dphi * dphi)
+
+    def Dot(self, other):
+        x, y, z, t = _xyzt(other)
+        return self._t * t - (self._x * x + self._y * y + self._z * z)
+
+    # arithmetics
+
+    def __add__(self, other):
+        x, y, z, t = _xyzt(other)
+        return LorentzVector(self._x + x, self._y + y,
+                             self._z + z, self._t + t)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        x, y, z, t = _xyzt(other)
+        return LorentzVector(self._x - x, self._y - y,
+                             self._z - z, self._t - t)
+
+    def __rsub__(self, other):
+        x, y, z, t = _xyzt(other)
+        return LorentzVector(x - self._x, y - self._y,
+                             z - self._z, t - self._t)
+
+    def __iadd__(self, other):
+        x, y, z, t = _xyzt(other)
+        self._x += x
+        self._y += y
+        self._z += z
+        self._t += t
+        self._invalidate()
+        return self
+
+    def __isub__(self, other):
+        x, y, z, t = _xyzt(other)
+        self._x -= x
+        self._y -= y
+        self._z -= z
+        self._t -= t
+        self._invalidate()
+        return self
+
+    def __neg__(self):
+        return LorentzVector(-self._x, -self._y, -self._z, -self._t)
+
+    def __mul__(self, other):
+        '''Minkowski product with a 4-vector, or product with a number'''
+        if hasattr(other, 'T'):
+            return self.Dot(other)
+        return LorentzVector(self._x * other, self._y * other,
+                             self._z * other, self._t * other)
+
+    __rmul__ = __mul__
+
+    def __imul__(self, number):
+        self._x *= number
+        self._y *= number
+        self._z *= number
+        self._t *= number
+        self._invalidate()
+        return self
+
+    def __eq__(self, other):
+        try:
+            return (self._x, self._y, self._z, self._t) == _xyzt(other)
+        except AttributeError:
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (LorentzVector, (self._x, self._y, self._z, self._t))
+
+    def __str__(self):
+        return '({x}, {y}, {z}, {t})'.format(x=self._x, y=self._y,
+                                             z=self._z, t=self._t)
+
+    __repr__ = __str__
+
+
+def new_like(p4, *args):
+    '''returns a new 4-vector of the same type as p4
+    (ROOT TLorentzVector or LorentzVector), built from args.
+    Used to combine 4-vectors without changing backend.'''
+    return type(p4)(*args)
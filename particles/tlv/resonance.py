@@ -1,6 +1,7 @@
 from heppy.particles.tlv.particle import Particle
 from ROOT import TLorentzVector, TVector3
 from rootobj import RootObj
+from lorentzvector import new_like
 import math
 
 class Resonance(Particle, RootObj):
@@ -10,11 +11,14 @@ class Resonance(Particle, RootObj):
     - q(): returns charge
     - p4(): returns 4-momentum TLorentzVector
     - e(): returns energy
+
+    The 4-momentum of the resonance is of the same type as the one
+    of the legs (ROOT TLorentzVector or python LorentzVector).
     """
     
     def __init__(self, legs, pid):
         self.legs = legs
-        tlv = TLorentzVector()
+        tlv = new_like(legs[0].p4()) if legs else TLorentzVector()
         charge = 0
         for leg in legs:
             charge += leg.q()
@@ -0,0 +1,90 @@
+import unittest
+import math
+import copy
+
+from lorentzvector import LorentzVector, Vector3
+
+
+class TestLorentzVector(unittest.TestCase):
+
+    def test_kinematics(self):
+        tlv = LorentzVector()
+        tlv.SetPtEtaPhiM(10., 1.5, -2., 0.105)
+        self.assertAlmostEqual(tlv.Pt(), 10.)
+        self.assertAlmostEqual(tlv.Eta(), 1.5)
+        self.assertAlmostEqual(tlv.Phi(), -2.)
+        self.assertAlmostEqual(tlv.M(), 0.105)
+        self.assertAlmostEqual(tlv.Theta(), 2 * math.atan(math.exp(-1.5)))
+        self.assertAlmostEqual(tlv.E(), math.sqrt(tlv.P()**2 + 0.105**2))
+        along_z = LorentzVector(0, 0, 1, 2)
+        self.assertEqual(along_z.Eta(), 10e10)
+        self.assertEqual(along_z.Phi(), 0.)
+
+    def test_cache(self):
+        '''cached quantities are updated when the vector is modified'''
+        tlv = LorentzVector(3, 4, 0, 10)
+        self.assertEqual(tlv.Pt(), 5.)
+        tlv += LorentzVector(3, 4, 0, 10)
+        self.assertEqual(tlv.Pt(), 10.)
+        self.assertEqual(tlv.E(), 20.)
+        tlv.SetPxPyPzE(1, 0, 0, 1)
+        self.assertEqual(tlv.Pt(), 1.)
+        self.assertEqual(tlv.M(), 0.)
+        tlv *= -1
+        self.assertEqual(tlv.Px(), -1.)
+        self.assertEqual(abs(tlv.Phi()), math.pi)
+
+    def test_boost(self):
+        mass = 91.
+        tlv = LorentzVector(0, mass / 2., 0, mass / 2.)
+        tlv += LorentzVector(0, -mass / 2., 0, mass / 2.)
+        lab = Vector3()
+        lab.SetMagThetaPhi(30., 1., 0.1)
+        p4_lab = LorentzVector()
+        p4_lab.SetVectM(lab, mass)
+        boosted = copy.deepcopy(tlv)
+        boosted.Boost(p4_lab.BoostVector())
+        self.assertAlmostEqual(boosted.Vect().Mag(), 30., 8)
+        self.assertAlmostEqual(boosted.M(), mass, 8)
+        self.assertAlmostEqual(tlv.M(), mass, 8)
+
+    def test_vector3(self):
+        v1 = Vector3(1, 0, 0)
+        v2 = Vector3(0, 2, 0)
+        self.assertEqual(v1.Cross(v2), Vector3(0, 0, 2))
+        self.assertAlmostEqual(v1.Angle(v2), math.pi / 2)
+        self.assertEqual(v2.Unit().Mag(), 1.)
+        self.assertEqual(v1 * v2, 0.)
+        self.assertEqual((v1 + v2).z(), 0.)
+
+    def test_root(self):
+        '''same results as ROOT'''
+        from ROOT import TLorentzVector
+        ptlv = LorentzVector(1., 2., 3., 7.)
+        rtlv = TLorentzVector(1., 2., 3., 7.)
+        for method in ['Pt', 'P', 'Eta', 'Phi', 'Theta', 'M', 'Rapidity']:
+            self.assertAlmostEqual(getattr(ptlv, method)(),
+                                   getattr(rtlv, method)())
+        ptlv += rtlv
+        self.assertEqual(ptlv, LorentzVector(2., 4., 6., 14.))
+        ptlv.Boost(rtlv.BoostVector())
+        rtlv2 = TLorentzVector(2., 4., 6., 14.)
+        rtlv2.Boost(rtlv.BoostVector())
+        self.assertAlmostEqual(ptlv.E(), rtlv2.E())
+
+    def test_resonance(self):
+        from heppy.particles.tlv.particle import Particle
+        from heppy.particles.tlv.resonance import Resonance2
+        ptc1 = Particle(11, -1, LorentzVector(1, 0, 0, 1))
+        ptc2 = Particle(-11, 1, LorentzVector(2, 0, 0, 2))
+        reso = Resonance2(ptc1, ptc2, 23)
+        self.assertTrue(isinstance(reso.p4(), LorentzVector))
+        self.assertEqual(reso.p4(), LorentzVector(3, 0, 0, 3))
+        self.assertEqual(reso.e(), 3.)
+        reso.boost(Vector3(0, 0.5, 0))
+        self.assertAlmostEqual(reso.e(), 3. / math.sqrt(0.75))
+        self.assertAlmostEqual(ptc1.e(), 1. / math.sqrt(0.75))
+
+
+if __name__ == '__main__':
+    unittest.main()
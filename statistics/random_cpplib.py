@@ -1,16 +1,26 @@
 #will remove this once ROOT random is set up and working in cpp
+import numpy as np
 from ROOT import gSystem
 gSystem.Load("libpapascpp") #check with Colin if this is OK or if should be made to execute just once
 from ROOT import  randomgen
 
-def expovariate (a):
+def expovariate (a, size=None):
+    if size is not None:
+        return np.array([expovariate(a) for i in xrange(size)])
     return randomgen.RandExponential(a).next()
 
-def uniform (a, b):
+def uniform (a, b, size=None):
+    if size is not None:
+        return np.array([uniform(a, b) for i in xrange(size)])
     return randomgen.RandUniform(a, b).next()
 
-def gauss (a, b):
+def gauss (a, b, size=None):
+    if size is not None:
+        return np.array([gauss(a, b) for i in xrange(size)])
     return randomgen.RandNormal(a, b).next()
 
 def seed (s):
-    randomgen.RandUniform(0, 1).setSeed(s)
\ No newline at end of file
+    randomgen.RandUniform(0, 1).setSeed(s)
+
+def set_stream (component, analyzer, event):
+    pass
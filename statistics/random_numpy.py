@@ -0,0 +1,150 @@
+'''Random numbers from numpy, drawn in batches, with independent streams.
+
+The numbers are drawn from numpy RandomState objects, in batches of
+BATCH_SIZE numbers, and are then given one by one, which is much
+faster than drawing them one at a time.
+
+Each stream is identified by a key, from which the seed of its RandomState
+is derived with a hash: for example, the stream of a given analyzer for a given
+event of a component is identified by
+(seed, component name, analyzer name, event), the event being identified
+by its input file and its index in this file, see
+L{Looper._stream_key<heppy.framework.looper.Looper._stream_key>}.
+The random numbers obtained in an event therefore do not depend on the events
+processed before, nor on the way a run is split into several jobs or processes,
+and two components do not get the same numbers.
+See set_stream, which is called by the L{Looper<heppy.framework.looper.Looper>}
+before running each analyzer on each event.
+
+Example::
+
+    import heppy.statistics.random_numpy as random
+    random.seed(0xdeadbeef)
+    random.set_stream('ZH', 'smearer', 42)
+    x = random.gauss(0, 1)
+    xs = random.gauss(0, 1, size=100) # numpy array
+'''
+
+import hashlib
+import numpy as np
+
+#: number of random numbers drawn at once
+BATCH_SIZE = 1024
+
+
+def seed_array(key):
+    '''returns an array of 8 32-bit integers derived from the key
+    with the sha256 hash, to be used as a RandomState seed.
+    @param key: tuple of integers and strings
+    '''
+    digest = hashlib.sha256('/'.join(str(item) for item in key)).digest()
+    return np.frombuffer(digest, dtype=np.uint32)
+
+
+class RandomStream(object):
+    '''Random numbers from numpy RandomStates, drawn in batches.
+
+    The uniform, gaussian and exponential numbers are drawn from separate
+    RandomStates, seeded from the key and the name of the distribution,
+    and created at the first draw. The n-th number of a given distribution
+    therefore does not depend on the numbers drawn in the other distributions,
+    nor on the sizes of the draws.
+    '''
+
+    _methods = {'uniform': 'random_sample',
+                'normal': 'standard_normal',
+                'exponential': 'standard_exponential'}
+
+    def __init__(self, key, batch_size=BATCH_SIZE):
+        '''constructor.
+        @param key: tuple of integers and strings identifying the stream
+        @param batch_size: number of random numbers drawn at once
+        '''
+        self.key = key
+        self.batch_size = batch_size
+        self._states = dict()
+        self._buffers = dict()
+
+    def _refill(self, kind, size):
+        '''draws a new batch of kind, keeping the numbers not used yet.'''
+        state = self._states.get(kind)
+        if state is None:
+            state = np.random.RandomState(seed_array(tuple(self.key) + (kind,)))
+            self._states[kind] = state
+        buf, pos = self._buffers.get(kind, (np.empty(0), 0))
+        draw = getattr(state, self._methods[kind])
+        buf = np.concatenate([buf[pos:], draw(max(self.batch_size, size))])
+        self._buffers[kind] = (buf, 0)
+        return buf
+
+    def _next(self, kind):
+        '''returns one standard random number of kind'''
+        buf, pos = self._buffers.get(kind, (None, 0))
+        if buf is None or pos == len(buf):
+            buf, pos = self._refill(kind, 1), 0
+        self._buffers[kind] = (buf, pos + 1)
+        return float(buf[pos])
+
+    def _take(self, kind, size):
+        '''returns an array of size standard random numbers of kind'''
+        buf, pos = self._buffers.get(kind, (None, 0))
+        if buf is None or pos + size > len(buf):
+            buf, pos = self._refill(kind, size), 0
+        self._buffers[kind] = (buf, pos + size)
+        return buf[pos:pos + size]
+
+    def uniform(self, a, b, size=None):
+        if size is None:
+            return a + (b - a) * self._next('uniform')
+        return a + (b - a) * self._take('uniform', size)
+
+    def gauss(self, mu, sigma, size=None):
+        if size is None:
+            return mu + sigma * self._next('normal')
+        return mu + sigma * self._take('normal', size)
+
+    def expovariate(self, lambd, size=None):
+        if size is None:
+            return self._next('exponential') / lambd
+        return self._take('exponential', size) / lambd
+
+
+_seed = 0
+_stream = RandomStream((_seed,))
+
+
+def expovariate(a, size=None):
+    '''exponential distribution with mean 1/a.
+    If size is given, returns a numpy array of size numbers.'''
+    return _stream.expovariate(a, size)
+
+
+def uniform(a, b, size=None):
+    '''uniform distribution between a and b.
+    If size is given, returns a numpy array of size numbers.'''
+    return _stream.uniform(a, b, size)
+
+
+def gauss(a, b, size=None):
+    '''gaussian distribution with mean a and width b.
+    If size is given, returns a numpy array of size numbers.'''
+    return _stream.gauss(a, b, size)
+
+
+def seed(s):
+    '''sets the global seed, and uses the default stream of this seed'''
+    global _seed, _stream
+    _seed = s
+    _stream = RandomStream((s,))
+
+
+def set_stream(component, analyzer, event):
+    '''uses the stream of the analyzer for the event of the component,
+    derived from the global seed.
+    @param component: name of the component, ie the dataset
+    @param analyzer: name of the analyzer
+    @param event: identifier of the event in the component, eg its index,
+      or (input file name, index of the event in the file) as in the Looper
+    '''
+    global _stream
+    _stream = RandomStream((_seed, component, analyzer, event))
@@ -1,19 +1,31 @@
+'''Random numbers from a single global ROOT TRandom.
 
+This backend gives the same random numbers as the previous versions of heppy,
+and can be used for validation. The random numbers obtained in an event depend
+on the events processed before: set_stream does nothing.
+'''
+import numpy as np
 from ROOT import TRandom
 
 rootrandom = TRandom()
 
-def expovariate (a):
+def expovariate (a, size=None):
+    if size is not None:
+        return np.array([expovariate(a) for i in xrange(size)])
     x=rootrandom.Exp(1./a)
     #pdebugger.info( x)
     return x
 
-def uniform (a, b):
+def uniform (a, b, size=None):
+    if size is not None:
+        return np.array([uniform(a, b) for i in xrange(size)])
     x=rootrandom.Uniform(a, b)
     #pdebugger.info( x)
     return x
 
-def gauss (a, b):
+def gauss (a, b, size=None):
+    if size is not None:
+        return np.array([gauss(a, b) for i in xrange(size)])
     x= rootrandom.Gaus(a,b)
     #pdebugger.info( x)
     return x
@@ -21,3 +33,6 @@ def gauss (a, b):
 def seed (s):
     global rootrandom
     rootrandom = TRandom(s)
+
+def set_stream (component, analyzer, event):
+    pass
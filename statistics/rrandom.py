@@ -1,5 +1,48 @@
-#todo make depend on Heppy Configuration
+'''Random numbers for heppy and papas.
 
-from random_root import *
-#from random import *
-#from random_cpplib import *
+Usage::
+
+    import heppy.statistics.rrandom as random
+    random.seed(0xdeadbeef)
+    x = random.gauss(0, 1)
+
+The random numbers are provided by one of the following backends:
+ - 'numpy' : L{random_numpy<heppy.statistics.random_numpy>}, batched numpy
+   random numbers, with an independent stream for each analyzer and each event
+ - 'root' : L{random_root<heppy.statistics.random_root>}, a single ROOT TRandom,
+   as in the previous versions of heppy, for validation
+ - 'cpplib' : L{random_cpplib<heppy.statistics.random_cpplib>},
+   the random generator of papascpp, for comparisons with papascpp
+
+The default backend is set by heppy.configuration.Random.BACKEND,
+and can be changed with set_backend.
+'''
+
+import importlib
+from heppy.configuration import Random
+
+BACKENDS = {
+    'numpy': 'heppy.statistics.random_numpy',
+    'root': 'heppy.statistics.random_root',
+    'cpplib': 'heppy.statistics.random_cpplib',
+}
+
+_FUNCTIONS = ['expovariate', 'uniform', 'gauss', 'seed', 'set_stream']
+
+
+def set_backend(name=None):
+    '''selects the backend, by default the one of heppy.configuration.Random.BACKEND.
+    The functions of this module are replaced by the ones of the backend.
+    '''
+    if name is None:
+        name = Random.BACKEND
+    if name not in BACKENDS:
+        raise ValueError('unknown random backend {}, choose among {}'.format(
+            name, sorted(BACKENDS.keys())))
+    module = importlib.import_module(BACKENDS[name])
+    globals().update((fname, getattr(module, fname)) for fname in _FUNCTIONS)
+    global backend
+    backend = name
+
+
+set_backend()
@@ -1,8 +1,55 @@
 import unittest
+import os
+import shutil
+import tempfile
 import logging
 logging.getLogger().setLevel(logging.ERROR)
 
+import numpy as np
 import rrandom as random
+import random_numpy
+import heppy.framework.config as cfg
+from heppy.framework.analyzer import Analyzer
+from heppy.framework.looper import Looper
+
+
+class Entries(object):
+    '''events backend without indexing, like LCIO'''
+
+    def __init__(self, files, tree_name=None):
+        self.nentries = 10
+
+    def __len__(self):
+        return self.nentries
+
+    def __iter__(self):
+        return iter(range(self.nentries))
+
+
+class FileEntries(object):
+    '''indexable events backend, with 5 entries in each file'''
+
+    def __init__(self, files, tree_name=None):
+        self.files = files
+
+    def __len__(self):
+        return 5 * len(self.files)
+
+    def __getitem__(self, index):
+        return index
+
+    def file_and_entry(self, index):
+        return self.files[index / 5], index % 5
+
+
+class Gauss(Analyzer):
+    '''draws a gaussian random number in each event'''
+
+    numbers = []
+
+    def process(self, event):
+        self.numbers.append(random.gauss(0, 1))
+
 
 class TestRandom(unittest.TestCase):
 
@@ -43,6 +90,119 @@ class TestRandom(unittest.TestCase):
         #newseeded should be different to seeded
         self.assertFalse(b0==c0)
 
+    def test_streams(self):
+        '''the numbers of an event do not depend on the events processed before'''
+        random_numpy.seed(0xdeadbeef)
+        random_numpy.set_stream('ZH', 'smearer', 3)
+        a = [random_numpy.gauss(0, 1) for i in range(3000)]
+        random_numpy.set_stream('ZH', 'smearer', 2)
+        b = random_numpy.gauss(0, 1)
+        random_numpy.set_stream('ZH', 'smearer', 3)
+        self.assertEqual([random_numpy.gauss(0, 1) for i in range(3000)], a)
+        random_numpy.set_stream('ZH', 'smearer', 2)
+        self.assertEqual(random_numpy.gauss(0, 1), b)
+        self.assertNotEqual(a[0], b)
+        # other component, or other seed
+        random_numpy.set_stream('ZH', 'gun', 3)
+        self.assertNotEqual(random_numpy.gauss(0, 1), a[0])
+        random_numpy.seed(999999)
+        random_numpy.set_stream('ZH', 'smearer', 3)
+        self.assertNotEqual(random_numpy.gauss(0, 1), a[0])
+
+    def test_components(self):
+        '''two components run with the same seed get different numbers'''
+        random_numpy.seed(0xdeadbeef)
+        random_numpy.set_stream('ZH', 'smearer', 3)
+        a = random_numpy.gauss(0, 1)
+        random_numpy.set_stream('ZZ', 'smearer', 3)
+        self.assertNotEqual(random_numpy.gauss(0, 1), a)
+
+    def numbers(self, component, first_event=0, events_class=Entries):
+        '''runs a looper on component, and returns the numbers drawn in each event'''
+        Gauss.numbers = []
+        config = cfg.Config(components=[component], sequence=self.sequence,
+                            services=[], events_class=events_class)
+        looper = Looper(os.path.join(self.outdir, 'looper'), config,
+                        firstEvent=first_event, timeReport=False, quiet=True)
+        looper.loop()
+        for handler in looper.logger.handlers[:]:
+            handler.close()
+            looper.logger.removeHandler(handler)
+        return Gauss.numbers
+
+    def test_split_run(self):
+        '''the numbers of an event do not depend on the way the run is split,
+        for an events backend without indexing'''
+        if random.backend != 'numpy':
+            return
+        self.outdir = tempfile.mkdtemp()
+        self.sequence = cfg.Sequence([cfg.Analyzer(Gauss)])
+        try:
+            random.seed(0xdeadbeef)
+            zh = cfg.Component('ZH', files=['dummy.root'])
+            whole = self.numbers(zh, 0)
+            self.assertEqual(len(set(whole)), 10)
+            # second job of the run, starting at entry 4
+            self.assertEqual(self.numbers(zh, 4), whole[4:])
+            zz = cfg.Component('ZZ', files=['dummy.root'])
+            self.assertFalse(set(self.numbers(zz, 0)) & set(whole))
+        finally:
+            shutil.rmtree(self.outdir)
+
+    def test_interleaved(self):
+        '''the numbers of a distribution do not depend on the draws
+        in the other distributions, nor on the sizes of the draws'''
+        random_numpy.seed(0xdeadbeef)
+        random_numpy.set_stream('ZH', 'smearer', 0)
+        gausses = random_numpy.gauss(0, 1, size=3000).tolist()
+        uniforms = random_numpy.uniform(0, 1, size=3000).tolist()
+        random_numpy.set_stream('ZH', 'smearer', 0)
+        drawn = [random_numpy.gauss(0, 1)]
+        # large draw of another kind in between, several refills
+        self.assertEqual(random_numpy.uniform(0, 1, size=2500).tolist(), uniforms[:2500])
+        drawn.extend(random_numpy.gauss(0, 1) for i in range(10))
+        drawn.extend(random_numpy.gauss(0, 1, size=2000).tolist())
+        self.assertEqual(random_numpy.uniform(0, 1), uniforms[2500])
+        drawn.extend(random_numpy.gauss(0, 1) for i in range(989))
+        self.assertEqual(drawn, gausses)
+
+    def test_split_component(self):
+        '''the numbers of an event do not depend on the splitting of the component
+        in chunks of files'''
+        if random.backend != 'numpy':
+            return
+        self.outdir = tempfile.mkdtemp()
+        self.sequence = cfg.Sequence([cfg.Analyzer(Gauss)])
+        try:
+            random.seed(0xdeadbeef)
+            files = ['file_{}.root'.format(i) for i in range(4)]
+            zh = cfg.Component('ZH', files=files)
+            whole = self.numbers(zh, events_class=FileEntries)
+            self.assertEqual(len(set(whole)), 20)
+            zh.splitFactor = 2
+            chunks = cfg.split([zh])
+            self.assertEqual([chunk.files for chunk in chunks], [files[:2], files[2:]])
+            split = []
+            for chunk in chunks:
+                split.extend(self.numbers(chunk, events_class=FileEntries))
+            self.assertEqual(split, whole)
+        finally:
+            shutil.rmtree(self.outdir)
+
+    def test_arrays(self):
+        '''arrays of numbers are the same as the numbers drawn one by one'''
+        random_numpy.set_stream('ZH', 'smearer', 0)
+        singles = [random_numpy.uniform(1, 2) for i in range(1000)]
+        singles += [random_numpy.expovariate(2.) for i in range(10)]
+        random_numpy.set_stream('ZH', 'smearer', 0)
+        uniforms = np.concatenate([random_numpy.uniform(1, 2, size=10),
+                                   random_numpy.uniform(1, 2, size=990)])
+        exps = random_numpy.expovariate(2., size=10)
+        self.assertTrue(np.allclose(uniforms, singles[:1000], rtol=1e-15))
+        self.assertTrue(np.allclose(exps, singles[1000:], rtol=1e-15))
+        self.assertTrue(np.all((uniforms >= 1) & (uniforms < 2)))
+        self.assertAlmostEqual(random_numpy.gauss(1, 3, size=100000).mean(), 1, places=1)
+
 
 if __name__ == '__main__':
 
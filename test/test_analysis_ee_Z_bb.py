@@ -21,12 +21,15 @@ if context.name == 'fcc':
     class TestAnalysis_ee_Z_bb(unittest.TestCase):
 
         def setUp(self):
+            # the reference results were obtained with the ROOT random numbers
+            random.set_backend('root')
             random.seed(0xdeadbeef)
             self.outdir = tempfile.mkdtemp()
             import logging
             logging.disable(logging.CRITICAL)
 
         def tearDown(self):
+            random.set_backend()
             shutil.rmtree(self.outdir)
             logging.disable(logging.NOTSET)
 
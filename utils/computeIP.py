@@ -1,7 +1,7 @@
 import math
 from ROOT import TVector3, TLorentzVector
-from scipy.optimize import minimize_scalar
 from numpy import sign
+from heppy.papas.path import closest_approach_times
 
 class straight_line(object):
     """Simple class describing a straight line, based on ROOT TVector3 class.
@@ -44,7 +44,7 @@ def velocity_at_time(helix, time):
     return TVector3(v_x, v_y, v_z)
 
 
-def compute_IP_wrt_direction(helix, primary_vertex, jet_direction, debug = False):
+def compute_IP_wrt_direction(helix, primary_vertex, jet_direction, debug = False, time = None):
     """Given a helix object, compute the impact parameter with respect to a given direction, as illustrated in the following note:
     D. Brown, M. Frank, Tagging b hadrons using impact parameters, ALEPH note 92-135.
 
@@ -61,6 +61,10 @@ def compute_IP_wrt_direction(helix, primary_vertex, jet_direction, debug = False
 
     In the code you can find a few comments with the names of the variables
     used in the ALEPH note.
+
+    The time of minimum approach to the jet direction is computed with
+    heppy.papas.path.closest_approach_times, unless it is given as the time argument
+    (see compute_IPs_wrt_direction).
     """
     helix.primary_vertex = primary_vertex    # primary_vertex = v
     helix.jet_direction = jet_direction      # jet_direction = j
@@ -71,14 +75,9 @@ def compute_IP_wrt_direction(helix, primary_vertex, jet_direction, debug = False
         jet_track_vector = helix.jet_line.distance_from_point(helix_point)
         return jet_track_vector.Mag()
 
-    helix.min_approach = minimize_scalar(jet_track_distance,
-                                        bracket = None,
-                                        bounds = [-1e-11, 1e-11],
-                                        args=(),
-                                        method='bounded',
-                                        tol=None,
-                                        options={'disp': 0, 'maxiter': 1e5, 'xatol': 1e-20} )
-    helix.min_approach_time = helix.min_approach.x
+    if time is None:
+        time = closest_approach_times([helix], primary_vertex, jet_direction)[0]
+    helix.min_approach_time = time
 
     if debug:
         print
@@ -133,7 +132,15 @@ def compute_IP_wrt_direction(helix, primary_vertex, jet_direction, debug = False
         print
 
 
-def compute_IP(helix, primary_vertex, jet_direction):
+def compute_IPs_wrt_direction(helices, primary_vertex, jet_direction, debug = False):
+    """Same as compute_IP_wrt_direction for a list of helices,
+    the times of minimum approach being computed for all helices at once."""
+    times = closest_approach_times(helices, primary_vertex, jet_direction)
+    for helix, time in zip(helices, times):
+        compute_IP_wrt_direction(helix, primary_vertex, jet_direction, debug, time)
+
+
+def compute_IP(helix, primary_vertex, jet_direction, time = None):
     """ Given a helix object and a primary vertex, compute the impact parameter
     with respect to the primary vertex.
 
@@ -144,31 +151,37 @@ def compute_IP(helix, primary_vertex, jet_direction):
     The function returns the vector IP (pointing from the primary vertex to the
     helix point of closest approach), the sign and the IP (that is the magnitude
     of the vector IP with the proper sign) as attributes of the helix object.
+
+    The time of closest approach is computed with
+    heppy.papas.path.closest_approach_times, unless it is given as the time argument
+    (see compute_IPs).
     """
     helix.primary_vertex = primary_vertex
     helix.jet_direction = jet_direction.Unit()
 
-    def pr_vertex_track_distance(time):
-        helix_point = helix.point_at_time(time)
-        pr_vertex_track_vector = helix_point - helix.primary_vertex
-        return pr_vertex_track_vector.Mag()
-
-    helix.min_approach = minimize_scalar(pr_vertex_track_distance,
-                                        bracket = None,
-                                        bounds = [-5e-9, 5e-9],
-                                        args=(),
-                                        method='bounded',
-                                        tol=None,
-                                        options={'disp': 0, 'maxiter': 1e5, 'xatol': 1e-20} )
-    helix.min_approach_time = helix.min_approach.x
+    if time is None:
+        time = closest_approach_times([helix], primary_vertex)[0]
+    helix.min_approach_time = time
 
     helix.vector_impact_parameter = helix.point_at_time(helix.min_approach_time) - helix.primary_vertex
     helix.ip_proj_jet_axis = helix.jet_direction.Dot( helix.vector_impact_parameter )
     helix.sign_impact_parameter = sign( helix.ip_proj_jet_axis )
+    if helix.sign_impact_parameter == 0:
+        # IP exactly perpendicular to the jet direction, as in ImpactParameter
+        helix.sign_impact_parameter = 1
     helix.impact_parameter = helix.vector_impact_parameter.Mag() * helix.sign_impact_parameter
     return helix.impact_parameter
 
 
+def compute_IPs(helices, primary_vertex, jet_direction):
+    """Same as compute_IP for a list of helices, the times of closest
+    approach being computed for all helices at once.
+    Returns the list of impact parameters."""
+    times = closest_approach_times(helices, primary_vertex)
+    return [compute_IP(helix, primary_vertex, jet_direction, time)
+            for helix, time in zip(helices, times)]
+
+
 from ROOT import TCanvas, TGraph, TLine
 class vertex_displayer(object):
     """Debug class for displaying vertices, tracks and impact parameters on the transverse plane, based on ROOT classes.
@@ -3,7 +3,9 @@
 
 import math
 import copy
+import numpy as np
 import heppy.configuration
+from heppy.particles.particlearray import ParticleArray
 
 DEFAULT_DRMAX = 0.3
 DEFAULT_DRMIN = 1e-5
@@ -34,18 +36,239 @@ def deltaPhi( p1, p2):
     return res
 
 
+def etaPhiArrays(ptcs, use_theta=None):
+    '''Returns two numpy arrays with the eta and phi coordinates of ptcs.
+
+    The coordinates are extracted only once, so that all the distances
+    between two collections can then be computed in numpy.
+    As in deltaR2, theta is used in place of eta for lepton colliders.
+    This can be forced with use_theta.
+    '''
+    if use_theta is None:
+        use_theta = heppy.configuration.Collider.BEAMS == 'ee'
+    if isinstance(ptcs, ParticleArray):
+        etas = ptcs.theta() if use_theta else ptcs.eta()
+        return etas, ptcs.phi()
+    n = len(ptcs)
+    if use_theta:
+        etas = np.fromiter((ptc.theta() for ptc in ptcs), float, n)
+    else:
+        etas = np.fromiter((ptc.eta() for ptc in ptcs), float, n)
+    phis = np.fromiter((ptc.phi() for ptc in ptcs), float, n)
+    return etas, phis
+
+
+def deltaPhiArray(p1, p2):
+    '''Vectorized deltaPhi, works on numpy arrays or scalars.
+    The result is in [-pi, pi[.'''
+    res = np.subtract(p1, p2)
+    return np.mod(res + math.pi, 2 * math.pi) - math.pi
+
+
+def deltaR2Arrays(etas1, phis1, etas2, phis2):
+    '''Returns the matrix of squared delta R between the points
+    (etas1, phis1) and (etas2, phis2),
+    of shape (len(etas1), len(etas2)).'''
+    with np.errstate(invalid='ignore'):
+        de = np.subtract.outer(etas1, etas2)
+        dp = deltaPhiArray(np.asarray(phis1)[:, np.newaxis],
+                           np.asarray(phis2)[np.newaxis, :])
+        dR2 = de * de + dp * dp
+    # infinite pseudo-rapidities lead to nan, never matched.
+    dR2[np.isnan(dR2)] = float('+inf')
+    return dR2
+
+
+def deltaR2Matrix(ptcs, others, use_theta=None):
+    '''Returns the matrix of squared delta R between the particles in ptcs
+    and the particles in others, of shape (len(ptcs), len(others)).'''
+    etas1, phis1 = etaPhiArrays(ptcs, use_theta)
+    etas2, phis2 = etaPhiArrays(others, use_theta)
+    return deltaR2Arrays(etas1, phis1, etas2, phis2)
+
+
+class EtaPhiIndex(object):
+    '''Spatial index of a particle collection in (eta, phi) space,
+    for fast cone and nearest neighbour queries.
+
+    The particles are binned in phi, with bins of width larger than
+    cell_size, and sorted by eta within each bin. A query of radius R
+    only looks at the bins within R in phi, taking into account the
+    periodicity, and at the eta window [eta-R, eta+R] in each of these bins.
+    All queries are vectorized over the pivots.
+
+    As in deltaR2, theta is used in place of eta for lepton colliders.
+    This can be forced with use_theta.
+
+    The index behaves like the list of particles it was built from, and
+    can be passed in place of this list to inConeCollection, bestMatch,
+    matchObjectCollection, cleanObjectCollection, and to the isolation areas.
+    '''
+
+    def __init__(self, particles, cell_size=0.4, use_theta=None):
+        if use_theta is None:
+            use_theta = heppy.configuration.Collider.BEAMS == 'ee'
+        self.use_theta = use_theta
+        if not isinstance(particles, ParticleArray):
+            particles = list(particles)
+        self.particles = particles
+        self.etas, self.phis = etaPhiArrays(self.particles, use_theta)
+        self.nphibins = max(1, int(2 * math.pi / cell_size))
+        self.phi_width = 2 * math.pi / self.nphibins
+        # particles with an infinite or undefined eta are never in a cone
+        finite = np.flatnonzero(np.isfinite(self.etas))
+        etas = self.etas[finite]
+        if len(etas):
+            self._eta_min = etas.min()
+            self._eta_span = etas.max() - self._eta_min + 1.
+        else:
+            self._eta_min, self._eta_span = 0., 1.
+        phibins = self._phibin(self.phis[finite])
+        order = np.lexsort((etas, phibins))
+        self._sorted = finite[order]
+        self._sorted_etas = etas[order]
+        self._sorted_phis = self.phis[finite][order]
+        self._keys = self._key(phibins[order], self._sorted_etas)
+    
+    def __len__(self):
+        return len(self.particles)
+
+    def __iter__(self):
+        return iter(self.particles)
+
+    def __getitem__(self, index):
+        return self.particles[index]
+
+    def coordinates(self, ptcs):
+        '''Returns the eta and phi arrays of ptcs, with the coordinate
+        convention of this index.'''
+        return etaPhiArrays(ptcs, self.use_theta)
+
+    def _phibin(self, phis):
+        phibins = np.floor((np.mod(phis, 2 * math.pi)) / self.phi_width)
+        return np.minimum(phibins.astype(int), self.nphibins - 1)
+
+    def _key(self, phibins, etas):
+        # the particles are sorted according to this key.
+        # etas outside of the range of the index are clipped
+        # to stay in the phi bin.
+        etas = np.clip(etas - self._eta_min, 0., self._eta_span)
+        return phibins * (self._eta_span + 1.) + etas
+
+    def pairs_within(self, etas, phis, deltaRMax):
+        '''Finds all the (pivot, particle) pairs closer than deltaRMax,
+        where the pivots are the points (etas, phis).
+        
+        Returns three arrays: pivot indices, particle indices in this index,
+        and squared delta R.
+        '''
+        etas = np.atleast_1d(np.asarray(etas, dtype=float))
+        phis = np.atleast_1d(np.asarray(phis, dtype=float))
+        empty = (np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0))
+        if len(self._sorted) == 0 or len(etas) == 0:
+            return empty
+        finite = np.flatnonzero(np.isfinite(etas))
+        pivot_bins = self._phibin(phis[finite])
+        noffsets = int(math.ceil(deltaRMax / self.phi_width))
+        if 2 * noffsets + 1 >= self.nphibins:
+            offsets = range(self.nphibins)
+        else:
+            offsets = range(-noffsets, noffsets + 1)
+        all_pivots, all_ptcs = [], []
+        for offset in offsets:
+            bins = np.mod(pivot_bins + offset, self.nphibins)
+            lo = np.searchsorted(self._keys,
+                                 self._key(bins, etas[finite] - deltaRMax),
+                                 'left')
+            hi = np.searchsorted(self._keys,
+                                 self._key(bins, etas[finite] + deltaRMax),
+                                 'right')
+            counts = hi - lo
+            ntot = counts.sum()
+            if ntot == 0:
+                continue
+            all_pivots.append(np.repeat(finite, counts))
+            all_ptcs.append(np.arange(ntot) -
+                            np.repeat(np.cumsum(counts) - counts, counts) +
+                            np.repeat(lo, counts))
+        if not all_pivots:
+            return empty
+        pivots = np.concatenate(all_pivots)
+        sorted_ptcs = np.concatenate(all_ptcs)
+        de = etas[pivots] - self._sorted_etas[sorted_ptcs]
+        dp = deltaPhiArray(phis[pivots], self._sorted_phis[sorted_ptcs])
+        dR2 = de * de + dp * dp
+        inside = dR2 < deltaRMax ** 2
+        return pivots[inside], self._sorted[sorted_ptcs[inside]], dR2[inside]
+
+    def in_cone(self, eta, phi, deltaRMax, deltaRMin=0.):
+        '''Returns the list of particles with deltaRMin <= delta R < deltaRMax
+        from (eta, phi), in the order of the indexed collection.'''
+        pivots, indices, dR2 = self.pairs_within(eta, phi, deltaRMax)
+        indices = np.sort(indices[dR2 >= deltaRMin ** 2])
+        return [self.particles[i] for i in indices]
+
+    def nearest(self, etas, phis, deltaRMax=None):
+        '''Finds the nearest particle of each pivot (etas, phis),
+        if closer than deltaRMax. If deltaRMax is None, there is no limit.
+        
+        Returns an array of particle indices (-1 if not found) and an array
+        of squared delta R (inf if not found).
+        In case of a tie, the first particle in the collection is chosen.
+        '''
+        etas = np.atleast_1d(np.asarray(etas, dtype=float))
+        phis = np.atleast_1d(np.asarray(phis, dtype=float))
+        best = -np.ones(len(etas), dtype=int)
+        best_dR2 = np.empty(len(etas))
+        best_dR2.fill(float('+inf'))
+        todo = np.flatnonzero(np.isfinite(etas))
+        if len(todo) == 0 or len(self._sorted) == 0:
+            return best, best_dR2
+        if deltaRMax is None:
+            # starting with a small cone, increased until a particle is found.
+            # rmax is enough to cover the whole index from all pivots
+            eta_max = self._eta_min + self._eta_span
+            rmax = np.maximum(np.abs(etas[todo] - self._eta_min),
+                              np.abs(etas[todo] - eta_max)).max() + 2 * math.pi
+            radius = min(self.phi_width, rmax)
+        else:
+            rmax = radius = deltaRMax
+        while len(todo):
+            pivots, indices, dR2 = self.pairs_within(etas[todo], phis[todo],
+                                                     radius)
+            if len(pivots):
+                # sorting by pivot, then dR2, then particle index
+                order = np.lexsort((indices, dR2, pivots))
+                pivots, indices, dR2 = pivots[order], indices[order], dR2[order]
+                first = np.ones(len(pivots), dtype=bool)
+                first[1:] = pivots[1:] != pivots[:-1]
+                found = todo[pivots[first]]
+                best[found] = indices[first]
+                best_dR2[found] = dR2[first]
+            if radius >= rmax:
+                break
+            # the nearest particle of a pivot is necessarily within
+            # the radius of the search if one was found
+            todo = todo[best[todo] < 0]
+            radius = min(2 * radius, rmax)
+        return best, best_dR2
+
+
 def inConeCollection(pivot, particles,
                      deltaRMax = DEFAULT_DRMAX,
                      deltaRMin = DEFAULT_DRMIN):
-    '''Returns the list of particles that are less than deltaRMax away from pivot.'''
-    dR2Max = deltaRMax ** 2
-    dR2Min = deltaRMin ** 2
-    results = []
-    for ptc in particles:
-        dR2 = deltaR2(pivot, ptc)
-        if dR2Min <= dR2 < dR2Max:
-            results.append(ptc)
-    return results
+    '''Returns the list of particles that are less than deltaRMax away from pivot.
+    particles can be an EtaPhiIndex.'''
+    if isinstance(particles, EtaPhiIndex):
+        etas, phis = particles.coordinates([pivot])
+        return particles.in_cone(etas, phis, deltaRMax, deltaRMin)
+    if not isinstance(particles, ParticleArray):
+        particles = list(particles)
+    if len(particles) == 0:
+        return []
+    dR2 = deltaR2Matrix([pivot], particles)[0]
+    inside = (dR2 >= deltaRMin ** 2) & (dR2 < deltaRMax ** 2)
+    return [particles[i] for i in np.flatnonzero(inside)]
 
 
 def cleanObjectCollection(ptcs, masks, deltaRMax=DEFAULT_DRMAX):
@@ -57,22 +280,24 @@ def cleanObjectCollection(ptcs, masks, deltaRMax=DEFAULT_DRMAX):
     particle in masks.
     
     The matching is done within a cone of size deltaRMin.
+    masks can be an EtaPhiIndex.
     '''
     if len(ptcs)==0 or len(masks)==0:
         return ptcs, []
-    dR2Max = deltaRMax ** 2
+    if isinstance(masks, EtaPhiIndex):
+        dirty = np.zeros(len(ptcs), dtype=bool)
+        etas, phis = masks.coordinates(ptcs)
+        pivots, _, _ = masks.pairs_within(etas, phis, deltaRMax)
+        dirty[pivots] = True
+    else:
+        dirty = (deltaR2Matrix(ptcs, masks) < deltaRMax ** 2).any(axis=1)
     clean_ptcs = []
     dirty_ptcs = []
-    for ptc in ptcs:
-        ok = True 
-        for mask in masks:
-            dR2 = deltaR2(ptc, mask)
-            if dR2 < dR2Max:
-                ok = False
-        if ok:
-            clean_ptcs.append( ptc )
-        else:
+    for ptc, is_dirty in zip(ptcs, dirty):
+        if is_dirty:
             dirty_ptcs.append( ptc )
+        else:
+            clean_ptcs.append( ptc )
     return clean_ptcs, dirty_ptcs
 
 
@@ -82,85 +307,84 @@ def cleanObjectCollection2(ptcs, masks, deltaRMax=DEFAULT_DRMAX):
     
     The matching is done within a cone of size deltaRMin.
     
-    The algorithm is different than in cleanObjectCollection, but the results are the same.
-    Another difference with respect to cleanObjectCollection is that the list of dirty
-    objects is not returned as well. 
+    The results are the same as in cleanObjectCollection, but
+    the list of dirty objects is not returned.
     '''
     if len(ptcs)==0:
         return ptcs
-    dR2Max = deltaRMax ** 2
-    clean_ptcs = copy.copy( ptcs )
-    for mask in masks:
-        tooClose = []
-        for idx, ptc in enumerate(clean_ptcs):
-            dR2 = deltaR2(ptc, mask)
-            if dR2 < dR2Max:
-                tooClose.append( idx )
-        nRemoved = 0
-        for idx in tooClose:
-            # yes, everytime an object is removed, the list of objects is updated
-            # so need to update the index accordingly.
-            # example: to remove : ele 1 and 2
-            #  first, ele 1 is removed
-            #  -> ele 2 is now at index 1
-            # one should again remove the element at index 1
-            idx -= nRemoved
-            del clean_ptcs[idx]
-            nRemoved += 1 
-    return clean_ptcs
+    if len(masks)==0:
+        return copy.copy(ptcs)
+    return cleanObjectCollection(ptcs, masks, deltaRMax)[0]
 
 
 def bestMatch(ptc, matchCollection):
     '''Return the best match to ptc in matchCollection,
     which is the closest ptc in delta R,
     together with the squared distance dR2 between ptc
-    and the match.'''
-    deltaR2Min = float('+inf')
-    bm = None
-    for match in matchCollection:
-        dR2 = deltaR2(ptc, match)
-        if dR2 < deltaR2Min:
-            deltaR2Min = dR2
-            bm = match
-    return bm, deltaR2Min
+    and the match.
+    matchCollection can be an EtaPhiIndex.'''
+    if isinstance(matchCollection, EtaPhiIndex):
+        etas, phis = matchCollection.coordinates([ptc])
+        best, best_dR2 = matchCollection.nearest(etas, phis)
+        if best[0] < 0:
+            return None, float('+inf')
+        return matchCollection[best[0]], best_dR2[0]
+    if not isinstance(matchCollection, ParticleArray):
+        matchCollection = list(matchCollection)
+    if len(matchCollection) == 0:
+        return None, float('+inf')
+    dR2 = deltaR2Matrix([ptc], matchCollection)[0]
+    index = dR2.argmin()
+    if dR2[index] == float('+inf'):
+        return None, float('+inf')
+    return matchCollection[index], dR2[index]
+
+
+def _filterMask(ptcs, matchCollection, filter_func):
+    '''Returns a boolean matrix telling whether filter_func accepts
+    each (ptc, match) pair.'''
+    return np.array([[bool(filter_func(ptc, match)) for match in matchCollection]
+                     for ptc in ptcs], dtype=bool).reshape(len(ptcs),
+                                                           len(matchCollection))
 
 
 def matchObjectCollection(ptcs, matchCollection,
-                          deltaRMax=DEFAULT_DRMAX, filter = lambda x,y : True):
+                          deltaRMax=DEFAULT_DRMAX, filter=None):
+    '''Association of each element of ptcs to the closest element of
+    matchCollection, if closer than deltaRMax.
+    Several elements of ptcs can be matched to the same element of matchCollection.
+    Returns a dictionary {ptc: match}, where match is None if no match is found.
+    filter(ptc, match) can be used to accept only some pairs.
+    matchCollection can be an EtaPhiIndex.
+    '''
     pairs = {}
     if len(ptcs)==0:
         return pairs
     if len(matchCollection)==0:
         return dict( list(zip(ptcs, [None]*len(ptcs))) )
+    if isinstance(matchCollection, EtaPhiIndex) and filter is None:
+        etas, phis = matchCollection.coordinates(ptcs)
+        best, best_dR2 = matchCollection.nearest(etas, phis, deltaRMax)
+    else:
+        dR2 = deltaR2Matrix(ptcs, matchCollection)
+        if filter is not None:
+            dR2[~_filterMask(ptcs, matchCollection, filter)] = float('+inf')
+        best = dR2.argmin(axis=1)
+        best_dR2 = dR2[np.arange(len(ptcs)), best]
     dR2Max = deltaRMax ** 2
-    for ptc in ptcs:
-        bm, dr2 = bestMatch( ptc, [mob for mob in matchCollection if filter(object,mob)] )
+    for ptc, index, dr2 in zip(ptcs, best, best_dR2):
         if dr2 < dR2Max:
-            pairs[ptc] = bm
+            pairs[ptc] = matchCollection[index]
         else:
             pairs[ptc] = None            
     return pairs
 
 
-def matchObjectCollection2(ptcs, matchCollection,
-                           deltaRMax=DEFAULT_DRMAX):
-    '''Univoque association of an element from matchCollection to an element of ptcs.
-    Returns a list of tuples [(ptc, matched_to_ptc), ...].
-    particles in ptcs and matchCollection get the "matched" attribute,
-    true is they are part of a matched tuple.
-    By default, the matching is true only if delta R is smaller than 0.3.
+def _uniqueMatch(ptcs, matchCollection, dR2, deltaRMax):
+    '''Greedy univoque association based on the dR2 matrix, shared by
+    matchObjectCollection2 and matchObjectCollection3.
+    Pairs are considered by increasing distance.
     '''
-
-    pairs = {}
-    if len(ptcs)==0:
-        return pairs
-    if len(matchCollection)==0:
-        return dict( list(zip(ptcs, [None]*len(ptcs))) )
-    # build all possible combinations
-    allPairs = [(deltaR2(ptc, match), (ptc, match))
-                for ptc in ptcs for match in matchCollection]
-    allPairs.sort ()
-
     # to flag already matched objects
     # FIXME this variable remains appended to the object, I do not like it
     for ptc in ptcs:
@@ -168,11 +392,16 @@ def matchObjectCollection2(ptcs, matchCollection,
     for match in matchCollection:
         match.matched = False
 
+    pairs = {}
     dR2Max = deltaRMax ** 2
-    for dR2, (ptc, match) in allPairs:
-        if dR2 > dR2Max:
-            break
-        if dR2 < dR2Max and ptc.matched == False and match.matched == False:
+    flat = dR2.ravel()
+    candidates = np.flatnonzero(flat < dR2Max)
+    candidates = candidates[flat[candidates].argsort(kind='mergesort')]
+    nmatches = len(matchCollection)
+    for index in candidates:
+        ptc = ptcs[index // nmatches]
+        match = matchCollection[index % nmatches]
+        if ptc.matched == False and match.matched == False:
             ptc.matched = True
             match.matched = True
             pairs[ptc] = match
@@ -186,9 +415,8 @@ def matchObjectCollection2(ptcs, matchCollection,
     # one could remove it with delattr (object, attrname)
 
 
-def matchObjectCollection3(ptcs, matchCollection,
-                           deltaRMax=DEFAULT_DRMAX,
-                           filter_func=None):
+def matchObjectCollection2(ptcs, matchCollection,
+                           deltaRMax=DEFAULT_DRMAX):
     '''Univoque association of an element from matchCollection to an element of ptcs.
     Returns a list of tuples [(ptc, matched_to_ptc), ...].
     particles in ptcs and matchCollection get the "matched" attribute,
@@ -196,46 +424,33 @@ def matchObjectCollection3(ptcs, matchCollection,
     By default, the matching is true only if delta R is smaller than 0.3.
     '''
 
-    if filter_func is None:
-        filter_func = lambda x,y : True
     pairs = {}
     if len(ptcs)==0:
         return pairs
     if len(matchCollection)==0:
-        return dict( zip(ptcs, [None]*len(ptcs)) )
-    # build all possible combinations
-
-    ptc_coords = [ (o.eta(),o.phi(),o) for o in ptcs ]
-    matched_coords = [ (o.eta(),o.phi(),o) for o in matchCollection ]
-    allPairs = [(deltaR2 (oeta, ophi, meta, mphi), (ptc, match))
-                for (oeta,ophi,ptc) in ptc_coords
-                for (meta,mphi,match) in matched_coords
-                if abs(oeta-meta)<=deltaRMax and filter_func(ptc,match) ]
-    #allPairs = [(deltaR2 (object.eta(), object.phi(), match.eta(), match.phi()), (object, match)) for object in objects for match in matchCollection if filter(object,match) ]
-    allPairs.sort ()
-    #
-    # to flag already matched objects
-    # FIXME this variable remains appended to the object, I do not like it
-
-    for ptc in ptcs:
-        ptc.matched = False
-    for match in matchCollection:
-        match.matched = False
-        
-    dR2Max = deltaRMax ** 2
-    for dR2, (ptc, match) in allPairs:
-        if dR2 > dR2Max:
-            break
-        if dR2 < dR2Max and ptc.matched == False and match.matched == False:
-            ptc.matched = True
-            match.matched = True
-            pairs[ptc] = match
+        return dict( list(zip(ptcs, [None]*len(ptcs))) )
+    dR2 = deltaR2Matrix(ptcs, matchCollection)
+    return _uniqueMatch(ptcs, matchCollection, dR2, deltaRMax)
 
-    for ptc in ptcs:
-        if ptc.matched == False:
-            pairs[ptc] = None
 
-    return pairs
-    # by now, the matched attribute remains in the objects, for future usage
-    # one could remove it with delattr (object, attrname)
+def matchObjectCollection3(ptcs, matchCollection,
+                           deltaRMax=DEFAULT_DRMAX,
+                           filter_func=None):
+    '''Univoque association of an element from matchCollection to an element of ptcs.
+    Returns a list of tuples [(ptc, matched_to_ptc), ...].
+    particles in ptcs and matchCollection get the "matched" attribute,
+    true is they are part of a matched tuple.
+    By default, the matching is true only if delta R is smaller than 0.3.
 
+    Contrary to matchObjectCollection2, eta is always used, and
+    filter_func(ptc, match) can be used to accept only some pairs.
+    '''
+    pairs = {}
+    if len(ptcs)==0:
+        return pairs
+    if len(matchCollection)==0:
+        return dict( zip(ptcs, [None]*len(ptcs)) )
+    dR2 = deltaR2Matrix(ptcs, matchCollection, use_theta=False)
+    if filter_func is not None:
+        dR2[~_filterMask(ptcs, matchCollection, filter_func)] = float('+inf')
+    return _uniqueMatch(ptcs, matchCollection, dR2, deltaRMax)
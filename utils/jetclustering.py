@@ -0,0 +1,265 @@
+'''Sequential recombination jet clustering in python and numpy.
+
+Implements the ee_kt (Durham), kt, anti-kt and Cambridge/Aachen algorithms
+with the E recombination scheme, following the fastjet conventions.
+It is used as a fallback by L{heppy.analyzers.fcc.JetClusterizer}
+when the compiled clustering library is not available.
+
+Example::
+
+    from heppy.utils.jetclustering import ClusterSequence
+    from heppy.particles.combinatorics import p4_array
+    sequence = ClusterSequence(p4_array(particles), 'ee_kt')
+    for jet in sequence.exclusive_jets(2):
+        px, py, pz, e = sequence.p4(jet)
+        jet_particles = [particles[i] for i in sequence.constituents(jet)]
+
+The clustering keeps track, for each pseudojet, of its nearest neighbour
+and of the distance to it. After each recombination, only the distances to
+the new pseudojet, and the nearest neighbours of the pseudojets
+that were pointing to the recombined ones, are recomputed.
+This avoids the naive O(N^3) behaviour.
+
+The full clustering history is kept, so that several sets of jets
+(e.g. exclusive jets for several njets, or inclusive jets for
+several ptmin) can be obtained from a single clustering.
+'''
+
+import math
+import numpy as np
+
+#: value of the p parameter of the generalized kt algorithms.
+#: ee_kt is a specific case, with no beam distance.
+ALGORITHMS = {
+    'kt': 1.,
+    'cambridge': 0.,
+    'antikt': -1.,
+    'ee_kt': None
+}
+
+_MAX_RAPIDITY = 1e5
+
+
+class ClusterSequence(object):
+    '''Clusters the input 4-momenta and keeps the clustering history.
+
+    Pseudojets are identified by an integer. The input particles are
+    the pseudojets 0 to n-1, in the order of the input, and each
+    recombination creates a new pseudojet.
+
+    Attributes:
+     - history: list of the clustering steps (d, jet1, jet2, new_jet),
+       in the order in which they were performed. For a recombination with
+       the beam, jet2 and new_jet are -1.
+    '''
+
+    def __init__(self, p4s, algorithm='ee_kt', R=1.):
+        '''Clusters p4s, an array of shape (n, 4) with px, py, pz, e.
+
+        algorithm : 'ee_kt', 'kt', 'antikt', or 'cambridge'
+        R : radius parameter, not used by ee_kt.
+        '''
+        if algorithm not in ALGORITHMS:
+            raise ValueError(
+                'unknown algorithm {}, choose among {}'.format(
+                    algorithm, sorted(ALGORITHMS.keys()))
+            )
+        self.algorithm = algorithm
+        self.R = R
+        self._power = ALGORITHMS[algorithm]
+        p4s = np.asarray(p4s, dtype=float).reshape(-1, 4)
+        self.n = len(p4s)
+        size = max(2 * self.n - 1, 0)
+        self._p4s = np.zeros((size, 4))
+        self._p4s[:self.n] = p4s
+        self._parents = -np.ones((size, 2), dtype=int)
+        self._njets = self.n
+        self.history = []
+        self._cluster()
+
+    # distances
+
+    def _init_quantities(self):
+        size = len(self._p4s)
+        if self._power is None:
+            self._e2 = np.zeros(size)
+            self._directions = np.zeros((size, 3))
+        else:
+            self._kt2p = np.zeros(size)
+            self._rap = np.zeros(size)
+            self._phi = np.zeros(size)
+        for jet in range(self.n):
+            self._set_quantities(jet)
+
+    def _set_quantities(self, jet):
+        px, py, pz, e = self._p4s[jet]
+        if self._power is None:
+            self._e2[jet] = e * e
+            norm = math.sqrt(px * px + py * py + pz * pz)
+            if norm > 0.:
+                self._directions[jet] = (px / norm, py / norm, pz / norm)
+            else:
+                self._directions[jet] = (0., 0., 1.)
+        else:
+            pt2 = max(px * px + py * py, 1e-300)
+            self._kt2p[jet] = pt2 ** self._power
+            self._phi[jet] = math.atan2(py, px)
+            if abs(pz) >= e:
+                rap = _MAX_RAPIDITY
+            else:
+                rap = min(0.5 * math.log((e + pz) / (e - pz)), _MAX_RAPIDITY)
+            self._rap[jet] = math.copysign(rap, pz)
+
+    def _distances(self, jet):
+        '''distances from jet to all pseudojets, inf for inactive ones'''
+        if self._power is None:
+            cos = self._directions.dot(self._directions[jet])
+            dists = 2. * np.minimum(self._e2, self._e2[jet]) * (1. - cos)
+        else:
+            drap = self._rap - self._rap[jet]
+            dphi = np.abs(self._phi - self._phi[jet])
+            dphi = np.where(dphi > math.pi, 2 * math.pi - dphi, dphi)
+            dists = np.minimum(self._kt2p, self._kt2p[jet]) * \
+                (drap * drap + dphi * dphi) / (self.R * self.R)
+        dists[~self._active] = float('+inf')
+        dists[jet] = float('+inf')
+        return dists
+
+    def _update_neighbour(self, jet):
+        dists = self._distances(jet)
+        neighbour = dists.argmin()
+        self._nn[jet] = neighbour
+        self._nn_dist[jet] = dists[neighbour]
+        return dists
+
+    def _beam_distance(self):
+        if self._power is None:
+            beam = np.empty(len(self._p4s))
+            beam.fill(float('+inf'))
+            return beam
+        return self._kt2p
+
+    # clustering
+
+    def _cluster(self):
+        size = len(self._p4s)
+        if size == 0:
+            return
+        self._init_quantities()
+        self._active = np.zeros(size, dtype=bool)
+        self._active[:self.n] = True
+        self._nn = -np.ones(size, dtype=int)
+        self._nn_dist = np.empty(size)
+        self._nn_dist.fill(float('+inf'))
+        for jet in range(self.n):
+            self._update_neighbour(jet)
+        beam = self._beam_distance()
+        nactive = self.n
+        while nactive:
+            candidates = np.where(self._active,
+                                  np.minimum(self._nn_dist, beam),
+                                  float('+inf'))
+            jet = candidates.argmin()
+            dmin = candidates[jet]
+            if dmin == float('+inf'):
+                # ee_kt: a single pseudojet left
+                break
+            if self._nn_dist[jet] <= beam[jet]:
+                other = self._nn[jet]
+                new_jet = self._njets
+                self._njets += 1
+                self._p4s[new_jet] = self._p4s[jet] + self._p4s[other]
+                self._parents[new_jet] = (jet, other)
+                self._set_quantities(new_jet)
+                self._active[[jet, other]] = False
+                self._active[new_jet] = True
+                self.history.append((dmin, jet, other, new_jet))
+                nactive -= 1
+                removed = (jet, other)
+                dists = self._update_neighbour(new_jet)
+                closer = dists < self._nn_dist
+                self._nn[closer] = new_jet
+                self._nn_dist[closer] = dists[closer]
+            else:
+                self._active[jet] = False
+                self.history.append((dmin, jet, -1, -1))
+                nactive -= 1
+                removed = (jet,)
+            for neighbour in np.flatnonzero(self._active &
+                                            np.in1d(self._nn, removed)):
+                self._update_neighbour(neighbour)
+
+    # results
+
+    def p4(self, jet):
+        '''returns px, py, pz, e of a pseudojet'''
+        return tuple(self._p4s[jet])
+
+    def p4s(self, jets):
+        '''returns an array with px, py, pz, e for the pseudojets in jets'''
+        return self._p4s[np.asarray(jets, dtype=int)].reshape(-1, 4)
+
+    def constituents(self, jet):
+        '''returns the sorted indices of the input particles in a pseudojet'''
+        result = []
+        stack = [jet]
+        while stack:
+            current = stack.pop()
+            if current < self.n:
+                result.append(current)
+            else:
+                stack.extend(self._parents[current])
+        return sorted(result)
+
+    def _sorted(self, jets):
+        '''sorting by decreasing energy for ee_kt,
+        by decreasing pt otherwise'''
+        p4s = self.p4s(jets)
+        if self._power is None:
+            keys = p4s[:, 3]
+        else:
+            keys = np.hypot(p4s[:, 0], p4s[:, 1])
+        return [jets[i] for i in np.argsort(-keys, kind='mergesort')]
+
+    def _jets_after(self, nsteps):
+        '''pseudojets alive after the first nsteps steps of the clustering'''
+        alive = set(range(self.n))
+        for d, jet1, jet2, new_jet in self.history[:nsteps]:
+            alive.discard(jet1)
+            alive.discard(jet2)
+            if new_jet >= 0:
+                alive.add(new_jet)
+        return self._sorted(sorted(alive))
+
+    def inclusive_jets(self, ptmin=0.):
+        '''returns the jets with pt >= ptmin recombined with the beam,
+        and, for ee_kt, the last remaining pseudojet.'''
+        jets = [jet1 for d, jet1, jet2, new_jet in self.history if jet2 < 0]
+        jets.extend(self._jets_after(len(self.history)))
+        p4s = self.p4s(jets)
+        pts = np.hypot(p4s[:, 0], p4s[:, 1])
+        return self._sorted([jet for jet, pt in zip(jets, pts) if pt >= ptmin])
+
+    def exclusive_jets(self, njets):
+        '''returns the jets obtained by stopping the clustering
+        when njets pseudojets are left.'''
+        if njets > self.n:
+            raise ValueError(
+                'cannot make {} jets with {} particles'.format(njets, self.n)
+            )
+        return self._jets_after(self.n - njets)
+
+    def exclusive_jets_dcut(self, dcut):
+        '''returns the jets obtained by stopping the clustering
+        when all distances are larger than dcut.'''
+        nsteps = 0
+        for d, jet1, jet2, new_jet in self.history:
+            if d > dcut:
+                break
+            nsteps += 1
+        return self._jets_after(nsteps)
+
+    def exclusive_dmerge(self, njets):
+        '''returns the distance at which the clustering goes from
+        njets + 1 to njets pseudojets.'''
+        return self.history[self.n - njets - 1][0]
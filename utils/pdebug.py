@@ -37,6 +37,17 @@ import sys
        from pdebug import pdebugger
        pdebugger.info("A message")
 
+    The arguments of the message are only formatted if the message is written,
+    so objects should be passed as arguments rather than formatted in the call:
+       pdebugger.info('Made %s', cluster)      # str(cluster) only called if needed
+       pdebugger.info('Made {}'.format(cluster)) # str(cluster) always called
+    The same holds for the analyzer loggers. Use Lazy for messages that
+    need more than str:
+       self.logger.info('%s', Lazy(pprint.pformat, particles))
+
+    In production runs, the info and debug calls of the pdebugger can be
+    removed entirely with compile_out (see below).
+
 '''
 
 #Note the first use of this header should come from the top level of the program
@@ -45,6 +56,39 @@ pdebugger = logging.getLogger('pdebug')
 pdebugger.setLevel(logging.ERROR)
 pdebugger.propagate = False
 
+
+class Lazy(object):
+    '''Message argument computed only when the message is written:
+    str(Lazy(func, *args)) returns str(func(*args)).'''
+
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return str(self.func(*self.args))
+
+
+def _nothing(*args, **kwargs):
+    pass
+
+
+def compile_out():
+    '''replaces the info and debug methods of the pdebugger by a function
+    that does nothing, for production runs: no record is created and
+    the level is not even checked. Restored by compile_in.'''
+    pdebugger.info = _nothing
+    pdebugger.debug = _nothing
+
+
+def compile_in():
+    '''restores the info and debug methods of the pdebugger, see compile_out'''
+    for name in ['info', 'debug']:
+        pdebugger.__dict__.pop(name, None)
+
+
 def set_file(filename = "pdebug.log", mode='w', level ="INFO"):
     #todo add checks
     cf = logging.FileHandler(filename, mode)
@@ -66,6 +66,33 @@ class TestDeltaR(unittest.TestCase):
         in_cone = inConeCollection(ptc0, self.ptcs.values(), 0.201)
         self.assertEqual(len(in_cone), 4)
         
+    #----------------------------------------------------------------------
+    def test_EtaPhiIndex(self):
+        """Test that the index gives the same results as the list,
+        including around phi = pi"""
+        ptcs = self.ptcs.values()
+        index = EtaPhiIndex(ptcs, cell_size=0.3)
+        self.assertEqual(len(index), len(ptcs))
+        for pivot in [self.ptcs[(0, 0)], self.ptcs[(1.2, 2.8)],
+                      self.ptcs[(-3, -3)]]:
+            for radius in [0.01, 0.201, 0.5, 2.]:
+                self.assertEqual(inConeCollection(pivot, index, radius),
+                                 inConeCollection(pivot, ptcs, radius))
+        # across the phi boundary
+        tlv = TLorentzVector()
+        tlv.SetPtEtaPhiM(10, 0, math.pi - 0.05, 0)
+        pivot = Particle(1, 0, tlv)
+        tlv = TLorentzVector()
+        tlv.SetPtEtaPhiM(10, 0, -math.pi + 0.05, 0)
+        other = Particle(1, 0, tlv)
+        index = EtaPhiIndex([self.ptcs[(0, 2.8)], other])
+        match, dR2 = bestMatch(pivot, index)
+        self.assertTrue(match is other)
+        self.assertAlmostEqual(dR2, 0.01)
+        self.assertEqual(inConeCollection(pivot, index, 0.2), [other])
+        pairs = matchObjectCollection([pivot], index, 0.2)
+        self.assertTrue(pairs[pivot] is other)
+
     def test_cleanObjectCollection(self):
         # masking only one particle
         clean, dirty = cleanObjectCollection(self.ptcs.values(),
@@ -73,6 +100,53 @@ class TestDeltaR(unittest.TestCase):
                                              0.01)
         self.assertEqual(dirty, [self.ptcs[0, 0]])
         self.assertEqual(len(clean), len(self.ptcs) - 1 )
+
+    #----------------------------------------------------------------------
+    def test_deltaPhiArray(self):
+        """Test that the vectorized deltaPhi wraps around pi like deltaPhi"""
+        p1 = np.array([math.pi-0.1, 0.3, -3.])
+        p2 = np.array([-math.pi+0.1, -0.2, 3.])
+        dphis = deltaPhiArray(p1, p2)
+        for dphi, phi1, phi2 in zip(dphis, p1, p2):
+            self.assertAlmostEqual(dphi, deltaPhi(phi1, phi2))
+
+    #----------------------------------------------------------------------
+    def test_deltaR2Matrix(self):
+        """Test that the dR2 matrix is consistent with deltaR2"""
+        ptcs = self.ptcs.values()[:20]
+        others = self.ptcs.values()[-15:]
+        dR2 = deltaR2Matrix(ptcs, others)
+        self.assertEqual(dR2.shape, (20, 15))
+        for i, ptc in enumerate(ptcs):
+            for j, other in enumerate(others):
+                self.assertAlmostEqual(dR2[i, j], deltaR2(ptc, other))
+
+    #----------------------------------------------------------------------
+    def test_bestMatch(self):
+        ptc0 = self.ptcs[(0, 0)]
+        others = [self.ptcs[(0.2, 0.)], self.ptcs[(-0.4, 0.)]]
+        match, dR2 = bestMatch(ptc0, others)
+        self.assertTrue(match is others[0])
+        self.assertAlmostEqual(dR2, 0.04)
+        self.assertEqual(bestMatch(ptc0, []), (None, float('+inf')))
+
+    #----------------------------------------------------------------------
+    def test_matchObjectCollection(self):
+        ptc0 = self.ptcs[(0, 0)]
+        ptc1 = self.ptcs[(0.2, 0.)]
+        far = self.ptcs[(2., 2.)]
+        # the two particles are matched to the same one
+        pairs = matchObjectCollection([ptc0, ptc1, far], [ptc1], 0.3)
+        self.assertTrue(pairs[ptc0] is ptc1)
+        self.assertTrue(pairs[ptc1] is ptc1)
+        self.assertTrue(pairs[far] is None)
+        # unique matching: ptc1 is closer to itself
+        pairs = matchObjectCollection2([ptc0, ptc1, far], [ptc1], 0.3)
+        self.assertTrue(pairs[ptc0] is None)
+        self.assertTrue(pairs[ptc1] is ptc1)
+        self.assertTrue(pairs[far] is None)
+        self.assertTrue(ptc1.matched)
+        self.assertFalse(ptc0.matched)
         
         
 if __name__ == '__main__':
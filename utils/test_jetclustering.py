@@ -0,0 +1,75 @@
+import unittest
+import math
+import numpy as np
+
+from heppy.utils.jetclustering import ClusterSequence
+
+
+def p4(pt, eta, phi, m=0.):
+    px, py, pz = pt * math.cos(phi), pt * math.sin(phi), pt * math.sinh(eta)
+    return px, py, pz, math.sqrt(px * px + py * py + pz * pz + m * m)
+
+
+class TestJetClustering(unittest.TestCase):
+
+    def setUp(self):
+        # two back-to-back groups of three particles, and a soft particle
+        self.p4s = np.array([
+            p4(10., 0.1, 0.), p4(5., 0., 0.2), p4(3., 0.2, -0.1),
+            p4(8., -0.1, math.pi), p4(6., 0., math.pi - 0.1),
+            p4(4., 0.1, -math.pi + 0.2),
+            p4(0.5, 2., math.pi / 2)
+        ])
+
+    def test_ee_kt(self):
+        sequence = ClusterSequence(self.p4s, 'ee_kt')
+        self.assertEqual(len(sequence.history), 6)
+        jets = sequence.exclusive_jets(2)
+        self.assertEqual(len(jets), 2)
+        constituents = [sequence.constituents(jet) for jet in jets]
+        self.assertEqual(sorted(constituents[0] + constituents[1]),
+                         range(7))
+        self.assertTrue(set([0, 1, 2]) <= set(constituents[0]))
+        self.assertTrue(set([3, 4, 5]) <= set(constituents[1]))
+        # energy is conserved
+        np.testing.assert_allclose(sequence.p4s(jets).sum(axis=0),
+                                   self.p4s.sum(axis=0))
+        # jets sorted by decreasing energy
+        self.assertTrue(sequence.p4(jets[0])[3] >= sequence.p4(jets[1])[3])
+        self.assertEqual(len(sequence.exclusive_jets(7)), 7)
+        self.assertEqual(len(sequence.exclusive_jets(1)), 1)
+        self.assertRaises(ValueError, sequence.exclusive_jets, 8)
+        # dcut
+        dcut = sequence.exclusive_dmerge(2)
+        self.assertEqual(sequence.exclusive_jets_dcut(dcut), jets)
+        self.assertEqual(len(sequence.exclusive_jets_dcut(dcut * 0.9999)), 3)
+
+    def test_antikt(self):
+        sequence = ClusterSequence(self.p4s, 'antikt', 0.5)
+        jets = sequence.inclusive_jets(ptmin=1.)
+        self.assertEqual(len(jets), 2)
+        self.assertEqual(sequence.constituents(jets[0]), [0, 1, 2])
+        self.assertEqual(sequence.constituents(jets[1]), [3, 4, 5])
+        self.assertAlmostEqual(math.hypot(*sequence.p4(jets[0])[:2]),
+                               math.hypot(*self.p4s[:3, :2].sum(axis=0)))
+        self.assertEqual(len(sequence.inclusive_jets()), 3)
+
+    def test_pp_algorithms(self):
+        for algorithm in ['kt', 'cambridge']:
+            sequence = ClusterSequence(self.p4s, algorithm, 0.5)
+            jets = sequence.inclusive_jets(ptmin=1.)
+            self.assertEqual(
+                sorted(sequence.constituents(jet) for jet in jets),
+                [[0, 1, 2], [3, 4, 5]]
+            )
+            self.assertEqual(len(sequence.exclusive_jets(3)), 3)
+
+    def test_empty(self):
+        sequence = ClusterSequence([], 'ee_kt')
+        self.assertEqual(sequence.inclusive_jets(), [])
+        self.assertEqual(sequence.exclusive_jets(0), [])
+        self.assertRaises(ValueError, ClusterSequence, [], 'foo')
+
+
+if __name__ == '__main__':
+    unittest.main()
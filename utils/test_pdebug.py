@@ -38,6 +38,34 @@ class TestPDebug(unittest.TestCase):
         output = out.getvalue().strip()
         assert output == "error console\nerror console\ninfo console\nerror file\ninfo file"
 
+    def test_lazy_and_compile_out(self):
+        calls = []
+        def message():
+            calls.append(1)
+            return 'computed'
+        out = StringIO()
+        handlers = pdebug.pdebugger.handlers
+        pdebug.pdebugger.handlers = [logging.StreamHandler(out)]
+        try:
+            pdebug.pdebugger.setLevel(logging.ERROR)
+            pdebug.pdebugger.info('%s', pdebug.Lazy(message))
+            self.assertEqual(calls, [])
+            pdebug.pdebugger.setLevel(logging.INFO)
+            pdebug.pdebugger.info('%s', pdebug.Lazy(message))
+            self.assertEqual(calls, [1])
+            pdebug.compile_out()
+            pdebug.pdebugger.info('%s', pdebug.Lazy(message))
+            pdebug.pdebugger.debug('%s', pdebug.Lazy(message))
+            pdebug.pdebugger.error('error')
+            self.assertEqual(calls, [1])
+            pdebug.compile_in()
+            pdebug.pdebugger.info('info')
+            self.assertEqual(out.getvalue(), "computed\nerror\ninfo\n")
+        finally:
+            pdebug.compile_in()
+            pdebug.pdebugger.handlers = handlers
+            pdebug.pdebugger.setLevel(logging.ERROR)
+
 
 if __name__ == '__main__':
 